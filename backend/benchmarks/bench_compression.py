@@ -0,0 +1,159 @@
+"""
+Bytes saved by response compression on typical endpoints, and what it costs.
+
+The payloads are real response bodies: the app runs in-process on an in-memory
+mongomock database seeded from oxys_db_export/ (or --export-dir / BENCH_EXPORT_DIR, e.g.
+the NDJSON output of benchmarks/generate_dataset.py for production-sized lists), and
+each endpoint is fetched uncompressed. Every body is then compressed with the levels
+CompressionMiddleware uses (gzip 5, brotli 4) and, for comparison, the maximum levels.
+
+Print the size table (from backend/):
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --export-dir /tmp/dataset
+
+Time the compression per endpoint and codec (sizes are stored in extra_info):
+    python -m pytest benchmarks/bench_compression.py --benchmark-json=bench-compression.json
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DAY = "2030-03-04"  # hétfő
+
+CODECS = {
+    "gzip-5": lambda body: gzip.compress(body, compresslevel=5, mtime=0),
+    "gzip-9": lambda body: gzip.compress(body, compresslevel=9, mtime=0),
+}
+if brotli is not None:
+    CODECS["br-4"] = lambda body: brotli.compress(body, mode=brotli.MODE_TEXT, quality=4)
+    CODECS["br-11"] = lambda body: brotli.compress(body, mode=brotli.MODE_TEXT, quality=11)
+
+
+async def _fetch_payloads(export_dir: Path) -> dict:
+    import httpx
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+
+    import server
+    from loadtest import load_export
+
+    collections = load_export(export_dir)
+    server.db = AsyncMongoMockClient()["benchmark"]
+    export_db = mongomock.MongoClient()["benchmark"]
+    for name, docs in collections.items():
+        if docs:
+            await server.db[name].insert_many([dict(doc) for doc in docs])
+            export_db[name].insert_many([dict(doc) for doc in docs])
+    server.get_export_db = lambda: export_db
+    server.invalidate_barber_cache()
+
+    barber_id = collections["barbers"][0]["id"]
+    service_id = next(
+        (link["service_id"] for link in collections["barber_services"] if link["barber_id"] == barber_id),
+        collections["services"][0]["id"],
+    )
+    token, _ = server.create_token_pair(barber_id, "Benchmark", "benchmark")
+    endpoints = {
+        "appointments (all)": "/api/appointments",
+        "barber appointments": f"/api/barbers/{barber_id}/appointments",
+        "barbers": "/api/barbers",
+        "services": "/api/services",
+        "barber services ($lookup)": f"/api/barbers/{barber_id}/services",
+        "available slots": f"/api/barbers/{barber_id}/available-slots?date={DAY}&service_id={service_id}",
+        "export": "/__export_db",
+    }
+    payloads = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url in endpoints.items():
+            response = await client.get(
+                url, headers={"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+            )
+            response.raise_for_status()
+            payloads[name] = response.content
+    return payloads
+
+
+def collect_payloads(export_dir: Path) -> dict:
+    return asyncio.run(_fetch_payloads(export_dir))
+
+
+def _export_dir() -> Path:
+    return Path(os.environ.get("BENCH_EXPORT_DIR", BACKEND_DIR.parent / "oxys_db_export"))
+
+
+@pytest.fixture(scope="module")
+def payloads():
+    return collect_payloads(_export_dir())
+
+
+@pytest.mark.parametrize("codec", list(CODECS))
+@pytest.mark.parametrize("endpoint", [
+    "appointments (all)",
+    "barber appointments",
+    "barbers",
+    "services",
+    "barber services ($lookup)",
+    "available slots",
+    "export",
+])
+def test_compress(benchmark, payloads, endpoint, codec):
+    body = payloads[endpoint]
+    compressed = benchmark(CODECS[codec], body)
+    benchmark.extra_info.update({"raw_bytes": len(body), "compressed_bytes": len(compressed)})
+
+
+def print_report(payloads: dict):
+    header = f"{'endpoint':<28}{'raw':>10}"
+    for codec in CODECS:
+        header += f"{codec:>26}"
+    print(header)
+    print(f"{'':<38}" + "".join(f"{'bytes  saved     time':>26}" for _ in CODECS))
+    totals = {codec: 0 for codec in CODECS}
+    for name, body in payloads.items():
+        line = f"{name:<28}{len(body):>10}"
+        for codec, compress in CODECS.items():
+            started = time.perf_counter()
+            rounds = 5
+            for _ in range(rounds):
+                compressed = compress(body)
+            elapsed_ms = (time.perf_counter() - started) / rounds * 1000
+            totals[codec] += len(compressed)
+            saved = 1 - len(compressed) / len(body) if body else 0.0
+            line += f"{len(compressed):>10}{saved:>7.0%}{elapsed_ms:>7.2f}ms"
+        print(line)
+    raw_total = sum(len(body) for body in payloads.values())
+    print(f"{'total':<28}{raw_total:>10}" + "".join(
+        f"{totals[codec]:>10}{1 - totals[codec] / raw_total:>7.0%}{'':>9}" for codec in CODECS
+    ))
+    if brotli is None:
+        print("\n(brotli is not installed: pip install brotli to compare it)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export-dir", type=Path, default=_export_dir(), help="seed data (JSON arrays or NDJSON)")
+    args = parser.parse_args()
+    print_report(collect_payloads(args.export_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Rendering cost of the outbox e-mails (pytest-benchmark).
+
+The templates are compiled once at import (email_templates.py); what the outbox worker
+pays per message is EmailTemplate.render - the text and HTML variants of one context.
+For comparison, `compile_and_render` is the cost a worker would pay if the templates
+were parsed, validated and turned into HTML for every message. Run from backend/:
+
+    python -m pytest benchmarks/bench_email_templates.py
+    python -m pytest benchmarks/bench_email_templates.py --benchmark-json=bench-email.json
+"""
+import sys
+from datetime import date, time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import email_templates  # noqa: E402
+from email_templates import TEMPLATES, EmailContext, EmailTemplate, render_email  # noqa: E402
+
+SOURCES = {
+    "confirmation": (email_templates.CONFIRMATION_SUBJECT, email_templates.CONFIRMATION_SOURCE),
+    "reminder": (email_templates.REMINDER_SUBJECT, email_templates.REMINDER_SOURCE),
+    "cancellation": (email_templates.CANCELLATION_SUBJECT, email_templates.CANCELLATION_SOURCE),
+}
+
+
+@pytest.fixture(params=[False, True], ids=["regular", "after-hours"])
+def context(request):
+    return EmailContext(
+        customer_name="Kovács Anna <anna@example.com>",
+        service_name="Men's Haircut & Beard",
+        barber_name="Bench Barber",
+        appointment_date=date(2030, 3, 4),
+        appointment_time=time(19, 30),
+        duration=45,
+        price=80.0,
+        after_hours_window="19:00-21:00" if request.param else "",
+    )
+
+
+def compile_and_render(kind: str, context: EmailContext):
+    subject, source = SOURCES[kind]
+    return EmailTemplate(kind, subject, source).render(context)
+
+
+def test_sources_match_the_compiled_templates():
+    assert set(SOURCES) == set(TEMPLATES)
+
+
+@pytest.mark.parametrize("kind", sorted(SOURCES))
+def test_same_output(kind, context):
+    assert compile_and_render(kind, context) == render_email(kind, context)
+
+
+@pytest.mark.parametrize("kind", sorted(SOURCES))
+def test_render_precompiled(benchmark, kind, context):
+    benchmark(render_email, kind, context)
+
+
+@pytest.mark.parametrize("kind", sorted(SOURCES))
+def test_compile_and_render(benchmark, kind, context):
+    benchmark(compile_and_render, kind, context)
+
+
+def test_render_from_stored_context(benchmark, context):
+    """The worker's full path: the context comes back from the outbox document"""
+    document = context.to_document()
+    benchmark(lambda: render_email("confirmation", EmailContext(**document)))
@@ -0,0 +1,195 @@
+"""
+Micro-benchmarks for the scheduling primitives (pytest-benchmark).
+
+Covers the slot engine - _compute_slots_for_date, check_barber_availability,
+get_next_after_hours_slot - and the parse_from_mongo / prepare_for_mongo converters,
+over synthetic days with 0-40 appointments and 0-8 breaks. The database is replaced by
+an in-memory stub whose queries complete without suspending, so the coroutines are
+driven to completion directly and only the scheduling code itself is timed. "Today" is
+pinned to a fixed date, so results do not depend on when the suite runs.
+
+The file is not collected by a plain `pytest` run; name it explicitly and store the
+results as JSON to compare runs (from backend/):
+
+    python -m pytest benchmarks/bench_scheduling.py --benchmark-json=bench-scheduling.json
+    python -m pytest benchmarks/bench_scheduling.py --benchmark-autosave
+    python -m pytest benchmarks/bench_scheduling.py --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+import os
+import random
+import sys
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+import server  # noqa: E402
+
+BARBER_ID = "bench-barber"
+SERVICE_ID = "b5a81fce-8d76-4837-a7df-46d658881e1c"  # program utáni foglalásra is jogosult
+SERVICE_DURATION = 45
+DAY = "2030-03-04"  # hétfő
+PINNED_NOW = server.ROMANIAN_TZ.localize(datetime(2030, 3, 1, 8, 0))
+
+APPOINTMENT_COUNTS = [0, 10, 20, 40]
+BREAK_COUNTS = [0, 8]
+
+
+# --- DB stub ---
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, expected in query.items():
+        value = doc.get(key)
+        if not isinstance(expected, dict):
+            if value != expected:
+                return False
+            continue
+        if "$in" in expected and value not in expected["$in"]:
+            return False
+        if "$gte" in expected and (value is None or value < expected["$gte"]):
+            return False
+        if "$lte" in expected and (value is None or value > expected["$lte"]):
+            return False
+    return True
+
+
+class _StubCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    async def to_list(self, length=None):
+        return [dict(doc) for doc in self._docs[:length]]
+
+
+class _StubCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query=None, projection=None):
+        return _StubCursor([doc for doc in self.docs if _matches(doc, query or {})])
+
+    async def find_one(self, query=None, projection=None):
+        for doc in self.docs:
+            if _matches(doc, query or {}):
+                return dict(doc)
+        return None
+
+
+class StubDB:
+    def __init__(self, **collections):
+        self._collections = {name: _StubCollection(docs) for name, docs in collections.items()}
+
+    def __getattr__(self, name):
+        return self._collections.setdefault(name, _StubCollection())
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+# --- szintetikus napok ---
+
+def synthetic_day(appointments: int, breaks: int, seed: int = 0) -> StubDB:
+    """A day with the given number of appointments and breaks on a 15-minute grid (overlaps allowed)"""
+    rng = random.Random(seed * 1000 + appointments * 10 + breaks)
+    grid = [time(hour, minute) for hour in range(9, 21) for minute in (0, 15, 30, 45)]
+    appointment_docs = [
+        {
+            "id": f"appt-{index}",
+            "barber_id": BARBER_ID,
+            "appointment_date": DAY,
+            "appointment_time": rng.choice(grid).strftime("%H:%M:%S"),
+            "duration": rng.choice([30, 45, 60]),
+            "status": rng.choice(["confirmed", "confirmed", "pending", "cancelled"]),
+        }
+        for index in range(appointments)
+    ]
+    break_docs = []
+    for index in range(breaks):
+        start = rng.choice(grid)
+        end = (datetime.combine(date(2030, 3, 4), start) + timedelta(minutes=rng.choice([15, 30, 60]))).time()
+        break_docs.append({
+            "id": f"break-{index}",
+            "barber_id": BARBER_ID,
+            "break_date": DAY,
+            "start_time": start.strftime("%H:%M:%S"),
+            "end_time": end.strftime("%H:%M:%S"),
+            "title": f"Break {index}",
+        })
+    return StubDB(
+        services=[{"id": SERVICE_ID, "name": "Men's Haircut", "duration": SERVICE_DURATION, "base_price": 80.0}],
+        appointments=appointment_docs,
+        barber_breaks=break_docs,
+    )
+
+
+def run_sync(coroutine):
+    """Drive a coroutine that never suspends (the stub DB answers immediately)"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended - the benchmark must not hit real I/O")
+
+
+@pytest.fixture(autouse=True)
+def pinned_clock(monkeypatch):
+    monkeypatch.setattr(server, "get_romanian_now", lambda: PINNED_NOW)
+    monkeypatch.setattr(server, "get_romanian_today", lambda: PINNED_NOW.date())
+
+
+@pytest.fixture(params=[(a, b) for a in APPOINTMENT_COUNTS for b in BREAK_COUNTS], ids=lambda p: f"appts{p[0]}-breaks{p[1]}")
+def day_db(request, monkeypatch):
+    monkeypatch.setattr(server, "db", synthetic_day(*request.param))
+    return request.param
+
+
+# --- slot engine ---
+
+def test_compute_slots_for_date(benchmark, day_db):
+    duration, slots = benchmark(lambda: run_sync(server._compute_slots_for_date(BARBER_ID, DAY, SERVICE_ID)))
+    assert duration == SERVICE_DURATION
+    assert slots
+
+
+def test_check_barber_availability(benchmark, day_db):
+    result = benchmark(lambda: run_sync(server.check_barber_availability(BARBER_ID, DAY, "14:00", SERVICE_DURATION)))
+    assert "available" in result
+
+
+def test_get_next_after_hours_slot(benchmark, day_db):
+    benchmark(lambda: run_sync(server.get_next_after_hours_slot(BARBER_ID, DAY, SERVICE_DURATION)))
+
+
+# --- Mongo konverziók ---
+
+APPOINTMENT_DOCUMENT = {
+    "id": "appt-1",
+    "customer_name": "Test Customer",
+    "customer_email": "customer@example.com",
+    "customer_phone": "+40700000000",
+    "service_id": SERVICE_ID,
+    "service_name": "Men's Haircut",
+    "barber_id": BARBER_ID,
+    "barber_name": "Bench Barber",
+    "appointment_date": DAY,
+    "appointment_time": "14:30:00",
+    "duration": SERVICE_DURATION,
+    "price": 80.0,
+    "status": "confirmed",
+    "created_at": "2030-03-01T08:00:00+00:00",
+}
+
+
+def test_parse_from_mongo(benchmark):
+    result = benchmark(lambda: server.parse_from_mongo(dict(APPOINTMENT_DOCUMENT)))
+    assert result["appointment_time"] == time(14, 30)
+
+
+def test_prepare_for_mongo(benchmark):
+    parsed = server.parse_from_mongo(dict(APPOINTMENT_DOCUMENT))
+    result = benchmark(lambda: server.prepare_for_mongo(dict(parsed)))
+    assert result["appointment_time"] == "14:30:00"
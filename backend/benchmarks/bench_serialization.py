@@ -0,0 +1,113 @@
+"""
+Serialization cost of the appointment list endpoints (pytest-benchmark).
+
+Compares, per 1000 stored appointments, the two ways a list endpoint can turn Mongo
+documents into the response body:
+
+    response_model   the previous path: parse_from_mongo, then FastAPI's response_model
+                     validation + serialization (List[Appointment]) and the stdlib
+                     JSONResponse - exactly what fastapi.routing runs for a route
+    fast path        DocumentDecoder + FastJSONResponse (orjson), see fastjson.py
+
+Both must produce the same bytes; test_same_json checks that. Run from backend/:
+
+    python -m pytest benchmarks/bench_serialization.py --benchmark-group-by=param
+    python -m pytest benchmarks/bench_serialization.py --benchmark-json=bench-serialization.json
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+import server  # noqa: E402
+from fastjson import FastJSONResponse  # noqa: E402
+
+APPOINTMENT_COUNTS = [100, 1000]
+
+
+def stored_appointments(count: int, seed: int = 0) -> list:
+    """Appointment documents as they are stored (ISO strings, reminder bookkeeping included)"""
+    rng = random.Random(seed)
+    created = datetime(2029, 6, 1, tzinfo=timezone.utc)
+    documents = []
+    for index in range(count):
+        document = {
+            "id": f"appt-{index:05d}",
+            "customer_name": f"Customer {index}",
+            "customer_email": f"customer{index}@example.com",
+            "customer_phone": f"+4070000{index:04d}",
+            "service_id": "b5a81fce-8d76-4837-a7df-46d658881e1c",
+            "service_name": "Men's Haircut",
+            "barber_id": "bench-barber",
+            "barber_name": "Bench Barber",
+            "appointment_date": f"2030-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "appointment_time": f"{rng.randint(9, 20):02d}:{rng.choice([0, 15, 30, 45]):02d}:00",
+            "duration": rng.choice([30, 45, 60]),
+            "price": rng.choice([60, 70.0, 80.0]),
+            "status": rng.choice(["confirmed", "completed", "cancelled"]),
+            "created_at": (created + timedelta(minutes=index)).isoformat(),
+        }
+        if index % 3 == 0:
+            document["reminders"] = {"day_before": document["created_at"]}
+        documents.append(document)
+    return documents
+
+
+RESPONSE_FIELD = create_response_field(name="Response_appointments", type_=List[server.Appointment])
+
+
+def run_sync(coroutine):
+    """Drive a coroutine that never suspends (serialize_response of an async endpoint)"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def response_model_path(documents: list) -> bytes:
+    appointments = []
+    for document in documents:
+        appointment = server.parse_from_mongo(dict(document))
+        if isinstance(appointment["created_at"], str):
+            appointment["created_at"] = datetime.fromisoformat(appointment["created_at"])
+        appointments.append(appointment)
+    content = run_sync(serialize_response(field=RESPONSE_FIELD, response_content=appointments, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def fast_path(documents: list) -> bytes:
+    return FastJSONResponse([server.decode_appointment(dict(document)) for document in documents]).body
+
+
+@pytest.fixture(params=APPOINTMENT_COUNTS, ids=lambda count: f"{count}-appointments")
+def documents(request):
+    return stored_appointments(request.param)
+
+
+def test_same_json(documents):
+    assert response_model_path(documents) == fast_path(documents)
+
+
+def test_response_model_path(benchmark, documents):
+    benchmark(response_model_path, documents)
+
+
+def test_fast_path(benchmark, documents):
+    benchmark(fast_path, documents)
+
+
+def test_fast_path_encode_only(benchmark, documents):
+    decoded = [server.decode_appointment(dict(document)) for document in documents]
+    benchmark(lambda: FastJSONResponse(decoded).body)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator.
+
+Produces a production-scale, realistic dataset in the documents' real shapes: barbers,
+services (with hu/ro translations), barber_services pricing, barber_auth, years of
+appointments - past ones completed or cancelled, upcoming ones confirmed, with varied
+durations and the after-hours bookings of the two after-hours services at their
+special price - breaks and contact messages.
+
+The output is a pure function of the seed and the options (ids included; only "today"
+moves, unless --today is given), so two runs with the same arguments give the same
+data. It is written either straight to Mongo with batched bulk inserts, or to one
+NDJSON file per collection (which benchmarks/loadtest.py can seed from).
+
+Usage (from backend/):
+    python benchmarks/generate_dataset.py --out /tmp/oxyss-dataset --years 3 --barbers 6
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/generate_dataset.py --mongo --db-name oxyss_perf --drop
+"""
+import argparse
+import json
+import os
+import random
+import unicodedata
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+import bcrypt
+
+BATCH_SIZE = 5000
+SLOT_MINUTES = 15
+DEFAULT_PASSWORD = "barber123"
+
+# A két program utáni foglalásra jogosult service fix azonosítóval (lásd server.AFTER_HOURS_PRICING)
+AFTER_HOURS_PRICING = {
+    "b5a81fce-8d76-4837-a7df-46d658881e1c": 120.0,
+    "ceae8f66-1620-4c46-9423-45f3ccb4481a": 145.0,
+}
+
+# (name, name_hu, name_ro, duration, base_price, category, popularity)
+SERVICE_CATALOG = [
+    ("Men's Haircut", "Férfi Hajvágás", "Tuns Bărbați", 45, 70.0, "Men", 30),
+    ("BRONZE (Haircut + Beard)", "Férfi BRONZE (Hajvágás + Szakáll)", "BRONZE (Tuns + Barbă)", 60, 95.0, "Men", 20),
+    ("Beard Trim & Style", "Szakáll Igazítás", "Aranjare Barbă", 30, 45.0, "Men", 12),
+    ("Hot Towel Shave", "Borotválás Forró Törölközővel", "Bărbierit cu Prosop Cald", 45, 60.0, "Men", 6),
+    ("Kids Haircut", "Gyermek Hajvágás", "Tuns Copii", 30, 45.0, "Kids", 10),
+    ("Senior Haircut", "Nyugdíjas Hajvágás", "Tuns Seniori", 30, 50.0, "Men", 5),
+    ("Women's Haircut", "Női Hajvágás", "Tuns Femei", 60, 90.0, "Women", 8),
+    ("Hair Wash & Style", "Hajmosás és Styling", "Spălat și Coafat", 30, 40.0, "Men", 4),
+    ("Hair Coloring", "Hajfestés", "Vopsit Păr", 90, 160.0, "Women", 3),
+    ("Mustache Trim", "Bajusz Igazítás", "Aranjare Mustață", 15, 20.0, "Men", 2),
+]
+
+FIRST_NAMES = [
+    "Andrei", "Attila", "Bence", "Csaba", "Dávid", "Elena", "Gábor", "Ioana", "István", "Kinga",
+    "Levente", "Maria", "Mihai", "Noémi", "Orsolya", "Radu", "Réka", "Szabolcs", "Tamás", "Zsolt",
+]
+LAST_NAMES = [
+    "Balogh", "Bartha", "Costea", "Fazakas", "Kovács", "Lukács", "Molnár", "Nagy", "Pop", "Sándor",
+    "Szabó", "Szilágyi", "Tóth", "Ungureanu", "Varga",
+]
+SPECIALTIES = [
+    "Classic cuts", "Fades", "Beard styling", "Hot towel shaves", "Modern styles",
+    "Precision cuts", "Beard trimming", "Hair treatments", "Kids cuts", "Coloring",
+]
+BREAK_TITLES = ["Break", "Lunch", "Doctor", "Training", "Personal"]
+CONTACT_MESSAGES = [
+    "Hello, do you have a free slot on Saturday morning?",
+    "Can I book for two kids at the same time?",
+    "Do you sell the beard oil you used last time?",
+    "Szia! Lehet foglalni jövő hétre is?",
+    "Bună ziua, aveți program și duminica?",
+    "I had to cancel my appointment, can I rebook for next week?",
+]
+
+
+def _ascii(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+
+
+class DatasetGenerator:
+    def __init__(self, seed: int, years: float, barbers: int, future_days: int, utilization: float,
+                 after_hours_rate: float, today: date):
+        self.rng = random.Random(seed)
+        self.end = today + timedelta(days=future_days)
+        self.start = today - timedelta(days=int(years * 365))
+        self.today = today
+        self.barber_count = barbers
+        self.utilization = utilization
+        self.after_hours_rate = after_hours_rate
+        self.customers = [self._customer(index) for index in range(max(200, barbers * 400))]
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _customer(self, index: int) -> dict:
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        handle = _ascii(f"{first}.{last}{index}")
+        return {
+            "customer_name": f"{first} {last}",
+            "customer_email": f"{handle}@example.com",
+            "customer_phone": f"+407{self.rng.randrange(10**8):08d}",
+        }
+
+    def _timestamp(self, day: date, days_before: int = 0) -> str:
+        moment = datetime.combine(day - timedelta(days=days_before), time(8, 0), tzinfo=timezone.utc)
+        return (moment + timedelta(seconds=self.rng.randrange(12 * 3600))).isoformat()
+
+    # --- törzsadatok ---
+
+    def services(self) -> list:
+        # A katalógus első két eleme a két program utáni service, a valódi azonosítójukkal
+        fixed_ids = list(AFTER_HOURS_PRICING)
+        docs = []
+        for position, (name, name_hu, name_ro, duration, price, category, _) in enumerate(SERVICE_CATALOG):
+            docs.append({
+                "id": fixed_ids[position] if position < len(fixed_ids) else self.uuid(),
+                "name": name,
+                "name_hu": name_hu,
+                "name_ro": name_ro,
+                "description": f"{name} at Oxyss Barbershop",
+                "description_hu": f"{name_hu} az Oxyss Barbershopban",
+                "description_ro": f"{name_ro} la Oxyss Barbershop",
+                "duration": duration,
+                "base_price": price,
+                "category": category,
+            })
+        return docs
+
+    def barbers(self) -> list:
+        docs = []
+        for index in range(self.barber_count):
+            name = FIRST_NAMES[index % len(FIRST_NAMES)]
+            description = f"Barber with a passion for {self.rng.choice(SPECIALTIES).lower()}"
+            docs.append({
+                "id": self.uuid(),
+                "name": name,
+                "description": description,
+                "description_hu": description,
+                "description_ro": description,
+                "experience_years": self.rng.randint(1, 25),
+                "specialties": self.rng.sample(SPECIALTIES, 4),
+                "image_url": None,
+                "is_available": True,
+            })
+        return docs
+
+    def barber_services(self, barbers: list, services: list) -> list:
+        docs = []
+        for barber in barbers:
+            for position, service in enumerate(services):
+                # A két fő service-t mindenki kínálja, a többit véletlenszerűen
+                if position >= 2 and self.rng.random() < 0.3:
+                    continue
+                docs.append({
+                    "id": self.uuid(),
+                    "barber_id": barber["id"],
+                    "service_id": service["id"],
+                    "price": round(service["base_price"] * self.rng.choice([0.9, 1.0, 1.0, 1.1, 1.2]), 0),
+                    "is_available": self.rng.random() > 0.05,
+                })
+        return docs
+
+    def barber_auth(self, barbers: list, password: str) -> list:
+        docs = []
+        for barber in barbers:
+            # Determinisztikus bcrypt só a seedből (22 karakter, az utolsó a 4 érvényes egyike)
+            alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+            salt = "".join(self.rng.choice(alphabet) for _ in range(21)) + self.rng.choice(".Oeu")
+            password_hash = bcrypt.hashpw(password.encode(), f"$2b$12${salt}".encode()).decode()
+            docs.append({
+                "id": self.uuid(),
+                "barber_id": barber["id"],
+                "email": f"{_ascii(barber['name'])}{len(docs)}@oxyssbarbershop.com",
+                "password_hash": password_hash,
+                "is_active": True,
+            })
+        return docs
+
+    # --- naptár ---
+
+    def days(self):
+        day = self.start
+        while day <= self.end:
+            if day.weekday() != 6:  # vasárnap zárva
+                yield day
+            day += timedelta(days=1)
+
+    def schedule(self, barbers: list, services: list, barber_services: list):
+        """Yield ("appointments" | "barber_breaks" | "contact_messages", doc) for every day"""
+        offered = {}
+        for barber_service in barber_services:
+            offered.setdefault(barber_service["barber_id"], {})[barber_service["service_id"]] = barber_service
+        services_by_id = {service["id"]: service for service in services}
+        weights = {service["id"]: entry[-1] for service, entry in zip(services, SERVICE_CATALOG)}
+
+        for day in self.days():
+            business_end = time(19, 0) if day.weekday() < 5 else time(13, 0)
+            after_hours_end = time(21, 0) if day.weekday() < 5 else time(15, 0)
+            for barber in barbers:
+                barber_offer = offered.get(barber["id"], {})
+                if not barber_offer or self.rng.random() < 0.04:  # szabadnap
+                    continue
+                busy = []
+                if self.rng.random() < 0.15:
+                    start = self._minutes(time(11, 0)) + SLOT_MINUTES * self.rng.randrange(12)
+                    length = self.rng.choice([30, 45, 60])
+                    busy.append((start, start + length))
+                    yield "barber_breaks", {
+                        "id": self.uuid(),
+                        "barber_id": barber["id"],
+                        "break_date": day.isoformat(),
+                        "start_time": self._clock(start),
+                        "end_time": self._clock(start + length),
+                        "title": self.rng.choice(BREAK_TITLES),
+                        "created_at": self._timestamp(day, self.rng.randrange(1, 14)),
+                    }
+                service_ids = list(barber_offer)
+                service_weights = [weights[service_id] for service_id in service_ids]
+                cursor = self._minutes(time(9, 0))
+                while True:
+                    service = services_by_id[self.rng.choices(service_ids, service_weights)[0]]
+                    end = cursor + service["duration"]
+                    if end > self._minutes(business_end):
+                        break
+                    if any(cursor < busy_end and end > busy_start for busy_start, busy_end in busy):
+                        cursor += SLOT_MINUTES
+                        continue
+                    if self.rng.random() < self.utilization:
+                        busy.append((cursor, end))
+                        yield "appointments", self._appointment(
+                            day, cursor, barber, service, barber_offer[service["id"]]["price"]
+                        )
+                        cursor = end
+                    else:
+                        cursor += SLOT_MINUTES
+                # Program utáni foglalások: hézag nélkül, az ablak elejétől
+                after_hours = [service_id for service_id in AFTER_HOURS_PRICING if service_id in barber_offer]
+                cursor = self._minutes(business_end)
+                while after_hours and self.rng.random() < self.after_hours_rate:
+                    service = services_by_id[self.rng.choice(after_hours)]
+                    if cursor + service["duration"] > self._minutes(after_hours_end):
+                        break
+                    yield "appointments", self._appointment(
+                        day, cursor, barber, service, AFTER_HOURS_PRICING[service["id"]]
+                    )
+                    cursor += service["duration"]
+            for _ in range(self.rng.choices([0, 1, 2], [60, 30, 10])[0]):
+                customer = self.rng.choice(self.customers)
+                yield "contact_messages", {
+                    "id": self.uuid(),
+                    "name": customer["customer_name"],
+                    "email": customer["customer_email"],
+                    "message": self.rng.choice(CONTACT_MESSAGES),
+                    "created_at": self._timestamp(day),
+                }
+
+    def _appointment(self, day: date, start: int, barber: dict, service: dict, price: float) -> dict:
+        if day < self.today:
+            status = self.rng.choices(["completed", "cancelled", "confirmed"], [85, 10, 5])[0]
+        else:
+            status = self.rng.choices(["confirmed", "cancelled"], [92, 8])[0]
+        return {
+            "id": self.uuid(),
+            **self.rng.choice(self.customers),
+            "service_id": service["id"],
+            "service_name": service["name"],
+            "barber_id": barber["id"],
+            "barber_name": barber["name"],
+            "appointment_date": day.isoformat(),
+            "appointment_time": self._clock(start),
+            "duration": service["duration"],
+            "price": price,
+            "status": status,
+            "created_at": self._timestamp(day, self.rng.randrange(0, 21)),
+        }
+
+    @staticmethod
+    def _minutes(value: time) -> int:
+        return value.hour * 60 + value.minute
+
+    @staticmethod
+    def _clock(minutes: int) -> str:
+        return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+    def generate(self, password: str = DEFAULT_PASSWORD):
+        """Yield (collection, doc) pairs, reference data first"""
+        services = self.services()
+        barbers = self.barbers()
+        barber_services = self.barber_services(barbers, services)
+        for name, docs in (
+            ("services", services),
+            ("barbers", barbers),
+            ("barber_services", barber_services),
+            ("barber_auth", self.barber_auth(barbers, password)),
+        ):
+            for doc in docs:
+                yield name, doc
+        yield from self.schedule(barbers, services, barber_services)
+
+
+# --- kimenetek ---
+
+class NDJSONWriter:
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.files = {}
+
+    def write(self, collection: str, doc: dict):
+        if collection not in self.files:
+            self.files[collection] = open(self.directory / f"{collection}.ndjson", "w", encoding="utf-8")
+        self.files[collection].write(json.dumps(doc, ensure_ascii=False) + "\n")
+
+    def close(self):
+        for handle in self.files.values():
+            handle.close()
+
+
+class MongoWriter:
+    def __init__(self, mongo_url: str, db_name: str, drop: bool, batch_size: int = BATCH_SIZE):
+        from pymongo import MongoClient
+
+        self.client = MongoClient(mongo_url)
+        self.db = self.client[db_name]
+        self.batch_size = batch_size
+        self.pending = {}
+        self.drop = drop
+        self.seen = set()
+
+    def write(self, collection: str, doc: dict):
+        if collection not in self.seen:
+            self.seen.add(collection)
+            if self.drop:
+                self.db[collection].drop()
+        batch = self.pending.setdefault(collection, [])
+        batch.append(doc)
+        if len(batch) >= self.batch_size:
+            self._flush(collection)
+
+    def _flush(self, collection: str):
+        batch = self.pending.pop(collection, [])
+        if batch:
+            self.db[collection].insert_many(batch, ordered=False)
+
+    def close(self):
+        for collection in list(self.pending):
+            self._flush(collection)
+        self.client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--years", type=float, default=3.0, help="history length")
+    parser.add_argument("--future-days", type=int, default=60, help="upcoming bookings after today")
+    parser.add_argument("--barbers", type=int, default=6)
+    parser.add_argument("--utilization", type=float, default=0.7, help="chance that a free slot gets booked")
+    parser.add_argument("--after-hours-rate", type=float, default=0.3, help="chance of each further after-hours booking")
+    parser.add_argument("--today", type=date.fromisoformat, default=None, help="pin 'today' (YYYY-MM-DD)")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="password of every generated barber login")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--out", type=Path, help="write <collection>.ndjson files into this directory")
+    output.add_argument("--mongo", action="store_true", help="insert into MONGO_URL / --db-name")
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "oxyss_perf"))
+    parser.add_argument("--drop", action="store_true", help="drop the target collections first")
+    args = parser.parse_args()
+
+    if args.today is None:
+        import pytz
+
+        args.today = datetime.now(pytz.timezone("Europe/Bucharest")).date()
+
+    generator = DatasetGenerator(
+        seed=args.seed,
+        years=args.years,
+        barbers=args.barbers,
+        future_days=args.future_days,
+        utilization=args.utilization,
+        after_hours_rate=args.after_hours_rate,
+        today=args.today,
+    )
+    if args.out:
+        writer = NDJSONWriter(args.out)
+    else:
+        writer = MongoWriter(os.environ["MONGO_URL"], args.db_name, args.drop)
+
+    counts = {}
+    try:
+        for collection, doc in generator.generate(args.password):
+            writer.write(collection, doc)
+            counts[collection] = counts.get(collection, 0) + 1
+    finally:
+        writer.close()
+    for collection, count in counts.items():
+        print(f"{collection:<18} {count:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Booking funnel load test.
+
+Starts the API locally in a child process (uvicorn, one worker) and drives concurrent
+virtual customers through the booking funnel, the same calls Booking.jsx makes:
+
+    POST /api/init-data                              on every page load (a no-op once seeded)
+    GET  /api/booking/bootstrap                      barbers, their services, and the
+                                                     default pair's dates / today's slots
+    GET  /api/barbers/{barber_id}/available-dates    always: the page only paints the
+    GET  /api/barbers/{barber_id}/available-slots    bootstrap's copy while revalidating
+    POST /api/appointments
+    GET  /api/barbers/{barber_id}/available-slots    again after a rejected booking
+
+Every customer picks a random barber, service, bookable day and free slot, then books
+it. Throughput and p50/p95/p99 latency are reported per endpoint; a booking rejected
+because another customer took the slot first is counted as a conflict, not an error.
+
+The database is seeded from oxys_db_export/ (or --export-dir, e.g. the NDJSON output of
+benchmarks/generate_dataset.py) into a scratch database: an in-memory
+mongomock-motor one by default, or a real mongod with --mongo (MONGO_URL, database
+--db-name, whose funnel collections are dropped and re-seeded). E-mail and reminder
+workers are disabled in the child so no SMTP traffic is generated, and so is the rate
+limiter (every virtual customer shares one IP); against --url, start the server with
+RATE_LIMIT_ENABLED=0 or raise RATE_LIMITS.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py --customers 200 --concurrency 20
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/loadtest.py --mongo --customers 1000 --concurrency 50
+    python benchmarks/loadtest.py --url http://localhost:8001 --customers 100    # an already running server
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+
+import pytz
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+EXPORT_DIR = BACKEND_DIR.parent / "oxys_db_export"
+sys.path.insert(0, str(BACKEND_DIR))
+
+SEED_COLLECTIONS = [
+    "barbers",
+    "services",
+    "barber_services",
+    "appointments",
+    "barber_breaks",
+    "barber_auth",
+]
+
+
+def load_export(directory: Path) -> dict:
+    """
+    Read the seed collections - JSON arrays (oxys_db_export) or NDJSON files
+    (benchmarks/generate_dataset.py) - filling the localized fields older exports lack.
+    """
+    collections = {}
+    for name in SEED_COLLECTIONS:
+        path = directory / f"{name}.json"
+        ndjson_path = directory / f"{name}.ndjson"
+        if ndjson_path.exists():
+            with ndjson_path.open(encoding="utf-8") as handle:
+                docs = [json.loads(line) for line in handle if line.strip()]
+        elif path.exists():
+            docs = json.loads(path.read_text(encoding="utf-8"))
+        else:
+            docs = []
+        for doc in docs:
+            doc.pop("_id", None)
+            if name == "barbers":
+                doc.setdefault("description_hu", doc.get("description", ""))
+                doc.setdefault("description_ro", doc.get("description", ""))
+            elif name == "services":
+                for field in ("name", "description"):
+                    doc.setdefault(f"{field}_hu", doc.get(field, ""))
+                    doc.setdefault(f"{field}_ro", doc.get(field, ""))
+        collections[name] = docs
+    return collections
+
+
+async def seed_database(db, directory: Path = EXPORT_DIR):
+    for name, docs in load_export(directory).items():
+        await db[name].drop()
+        if docs:
+            await db[name].insert_many(docs)
+
+
+# --- szerver (gyerekfolyamat) ---
+
+def serve(port: int, use_mongo: bool, db_name: str, export_dir: Path):
+    os.environ["DB_NAME"] = db_name
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["EMAIL_OUTBOX_WORKER"] = "0"
+    os.environ["REMINDER_SCHEDULER"] = "0"
+    # Minden virtuális ügyfél 127.0.0.1-ről jön, egy bucket-be esnének
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.chdir(BACKEND_DIR)
+
+    import uvicorn
+
+    import server
+
+    if not use_mongo:
+        from mongomock_motor import AsyncMongoMockClient
+
+        server.db = AsyncMongoMockClient()[db_name]
+
+    async def main():
+        # A lifespan csak a szerver indulásakor csatlakozna, a seed viszont előtte fut
+        await seed_database(server.connect_database(), export_dir)
+        config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(main())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args) -> tuple:
+    port = _free_port()
+    command = [
+        sys.executable, __file__, "--serve",
+        "--port", str(port),
+        "--db-name", args.db_name,
+        "--export-dir", str(args.export_dir),
+    ]
+    if args.mongo:
+        command.append("--mongo")
+    process = subprocess.Popen(command)
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_ready(client, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await client.get("/readyz")
+            if response.status_code == 200:
+                return
+        except Exception:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("server did not become ready")
+        await asyncio.sleep(0.2)
+
+
+# --- terhelés ---
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception as exc:
+            response, status = None, type(exc).__name__
+        self.latencies[label].append(time.perf_counter() - started)
+        self.statuses[label][status] += 1
+        return response
+
+
+async def fetch_slots(client, recorder: Recorder, barber_id: str, day: str, service_id: str):
+    return await recorder.call(
+        client, "GET /available-slots", "GET",
+        f"/api/barbers/{barber_id}/available-slots",
+        params={"date": day, "service_id": service_id},
+    )
+
+
+async def customer(client, recorder: Recorder, rng: random.Random, today: date, outcomes: dict):
+    response = await recorder.call(client, "POST /init-data", "POST", "/api/init-data")
+    if response is None or response.status_code != 200:
+        outcomes["failed"] += 1
+        return
+    response = await recorder.call(client, "GET /booking/bootstrap", "GET", "/api/booking/bootstrap")
+    if response is None or response.status_code != 200 or not response.json()["barbers"]:
+        outcomes["failed"] += 1
+        return
+    bootstrap = response.json()
+    barber = rng.choice(bootstrap["barbers"])
+
+    services = bootstrap["services_by_barber"].get(barber["id"], [])
+    if not services:
+        outcomes["no_services"] += 1
+        return
+    service = rng.choice(services)
+
+    # Az aktuális hónap, ha már nincs benne szabad nap, a következő. A bootstrap napjait és
+    # slotjait a Booking.jsx csak kirajzolja, a végpontokat mindig újrakéri
+    available_dates = []
+    year, month = today.year, today.month
+    for _ in range(2):
+        response = await recorder.call(
+            client, "GET /available-dates", "GET",
+            f"/api/barbers/{barber['id']}/available-dates",
+            params={"year": year, "month": month, "service_id": service["service_id"]},
+        )
+        if response is None or response.status_code != 200:
+            outcomes["failed"] += 1
+            return
+        available_dates = response.json()["available_dates"]
+        if available_dates:
+            break
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    if not available_dates:
+        outcomes["no_availability"] += 1
+        return
+    day = rng.choice(available_dates)
+
+    response = await fetch_slots(client, recorder, barber["id"], day, service["service_id"])
+    if response is None or response.status_code != 200:
+        outcomes["failed"] += 1
+        return
+    slots = response.json()["slots"]
+    free = [slot for slot in slots if slot["available"]]
+    if not free:
+        outcomes["no_availability"] += 1
+        return
+    slot = rng.choice(free)
+
+    number = rng.randrange(1_000_000)
+    response = await recorder.call(
+        client, "POST /appointments", "POST", "/api/appointments",
+        json={
+            "customer_name": f"Load Test {number}",
+            "customer_email": f"loadtest{number}@example.com",
+            "customer_phone": f"+40700{number:06d}",
+            "service_id": service["service_id"],
+            "service_name": service.get("service_name", ""),
+            "barber_id": barber["id"],
+            "barber_name": barber["name"],
+            "appointment_date": day,
+            "appointment_time": f"{slot['time']}:00",
+        },
+    )
+    if response is not None and response.status_code == 200:
+        outcomes["booked"] += 1
+    elif response is not None and response.status_code == 400:
+        # Közben valaki más foglalta le ugyanazt az időpontot; az oldal újratölti a nap slotjait
+        outcomes["conflict"] += 1
+        await fetch_slots(client, recorder, barber["id"], day, service["service_id"])
+    else:
+        outcomes["failed"] += 1
+
+
+async def run_load(base_url: str, customers: int, concurrency: int, seed: int, today: date):
+    import httpx
+
+    recorder = Recorder()
+    outcomes = defaultdict(int)
+    queue = asyncio.Queue()
+    for index in range(customers):
+        queue.put_nowait(index)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        await wait_until_ready(client)
+
+        async def virtual_customer(worker: int):
+            rng = random.Random(seed * 1_000_003 + worker)
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await customer(client, recorder, rng, today, outcomes)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_customer(worker) for worker in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(recorder, outcomes, elapsed, customers, concurrency)
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(recorder: Recorder, outcomes: dict, elapsed: float, customers: int, concurrency: int) -> dict:
+    endpoints = {}
+    for label, samples in recorder.latencies.items():
+        samples = sorted(samples)
+        statuses = dict(recorder.statuses[label])
+        endpoints[label] = {
+            "requests": len(samples),
+            "rps": len(samples) / elapsed,
+            "p50_ms": statistics.median(samples) * 1000,
+            "p95_ms": _percentile(samples, 0.95) * 1000,
+            "p99_ms": _percentile(samples, 0.99) * 1000,
+            "max_ms": samples[-1] * 1000,
+            "statuses": {str(status): count for status, count in statuses.items()},
+        }
+    total_requests = sum(len(samples) for samples in recorder.latencies.values())
+    return {
+        "customers": customers,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "requests": total_requests,
+        "rps": total_requests / elapsed,
+        "customers_per_s": customers / elapsed,
+        "outcomes": dict(outcomes),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(result: dict):
+    print(
+        f"{result['customers']} customers, concurrency {result['concurrency']}: "
+        f"{result['elapsed_s']:.2f}s, {result['rps']:.1f} req/s, {result['customers_per_s']:.2f} customers/s"
+    )
+    print("outcomes: " + ", ".join(f"{key}={value}" for key, value in sorted(result["outcomes"].items())))
+    print(f"{'endpoint':<26} {'reqs':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for label, stats in result["endpoints"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(stats["statuses"].items()))
+        print(
+            f"{label:<26} {stats['requests']:>6} {stats['rps']:>8.1f} {stats['p50_ms']:>9.1f} "
+            f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}  {statuses}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=100, help="virtual customers to run through the funnel")
+    parser.add_argument("--concurrency", type=int, default=10, help="customers in flight at once")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the customers' choices")
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--mongo", action="store_true", help="use the mongod at MONGO_URL instead of mongomock")
+    parser.add_argument("--db-name", default="oxyss_loadtest", help="scratch database (re-seeded on start)")
+    parser.add_argument("--export-dir", type=Path, default=EXPORT_DIR, help="seed data directory")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.mongo, args.db_name, args.export_dir)
+        return
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server(args)
+    # A szerver romániai idő szerint számolja a "mai" napot
+    today = datetime.now(pytz.timezone("Europe/Bucharest")).date()
+    try:
+        result = asyncio.run(run_load(base_url, args.customers, args.concurrency, args.seed, today))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print_report(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
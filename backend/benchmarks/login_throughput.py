@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Runs N concurrent bcrypt verifications two ways - inline on the event loop (the old
+/auth/login behaviour) and through passwords.verify_password_async - while a probe
+task ticks every few milliseconds, standing in for a cheap public endpoint. The probe
+latency is what a booking request would have seen during the login burst.
+
+Usage (from backend/):
+    python benchmarks/login_throughput.py --logins 20
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from passwords import get_password_hash, verify_password, verify_password_async  # noqa: E402
+
+PROBE_INTERVAL = 0.005
+
+
+async def _probe(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def _blocking_login(password, hashed):
+    return verify_password(password, hashed)
+
+
+async def _run(login_fn, logins: int, password: str, hashed: str):
+    stop = asyncio.Event()
+    samples = []
+    probe = asyncio.create_task(_probe(stop, samples))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login_fn(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    assert all(results)
+
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+    return {
+        "logins_per_s": logins / elapsed,
+        "elapsed_s": elapsed,
+        "probe_p50_ms": statistics.median(samples) * 1000 if samples else 0.0,
+        "probe_p99_ms": p99 * 1000,
+        "probe_max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def _print(label, result):
+    print(
+        f"{label:<10} {result['logins_per_s']:8.2f} logins/s  "
+        f"elapsed {result['elapsed_s']:6.2f}s  "
+        f"loop lag p50 {result['probe_p50_ms']:7.2f}ms  "
+        f"p99 {result['probe_p99_ms']:7.2f}ms  "
+        f"max {result['probe_max_ms']:7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20, help="concurrent logins per run")
+    args = parser.parse_args()
+
+    password = "barber123"
+    hashed = get_password_hash(password)
+
+    _print("blocking", asyncio.run(_run(_blocking_login, args.logins, password, hashed)))
+    _print("pooled", asyncio.run(_run(verify_password_async, args.logins, password, hashed)))
+
+
+if __name__ == "__main__":
+    main()
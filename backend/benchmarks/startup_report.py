@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Cold start report.
+
+Fly stops idle machines (auto_stop_machines, min_machines_running = 0), so the first
+customer after a quiet period waits for the interpreter to start, `server` to be
+imported and uvicorn to answer. This script measures both parts in fresh processes:
+
+    import   `python -X importtime -c "import server"`, total and the slowest
+             packages server imports (cumulative time)
+    first    spawn `uvicorn server:app` and time the first 200 from GET /healthz
+    response
+
+The app does no network I/O at import (the Mongo clients are created in the lifespan /
+on first use), so neither number depends on Mongo being reachable.
+
+Usage (from backend/):
+    python benchmarks/startup_report.py
+    python benchmarks/startup_report.py --runs 5 --top 20 --json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "startup_report")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def measure_import() -> dict:
+    """Import `server` in a fresh interpreter; returns the total and the cumulative time (ms) of each package it imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packages = defaultdict(float)
+    children = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(fields[1]) / 1000
+        except ValueError:
+            continue  # fejléc
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((name.strip().split(".")[0], cumulative))
+        elif depth == 0:
+            # A gyerekek a szülő előtt szerepelnek: a server közvetlen importjai (a cumulative
+            # a függőségeiket is tartalmazza), a site stb. importjait eldobjuk
+            if name.strip() == "server":
+                total = cumulative
+                for package, package_cumulative in children:
+                    packages[package] += package_cumulative
+            children = []
+    return {"total_ms": total, "packages": dict(packages)}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(timeout: float = 30.0, path: str = "/healthz") -> float:
+    """Spawn uvicorn and return the seconds until the first 200 response"""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env=_child_env(),
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"no response from uvicorn within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def build_report(runs: int, top: int) -> dict:
+    imports = [measure_import() for _ in range(runs)]
+    first_responses = [measure_first_response() * 1000 for _ in range(runs)]
+    packages = defaultdict(list)
+    for run in imports:
+        for package, cumulative in run["packages"].items():
+            packages[package].append(cumulative)
+    slowest = sorted(
+        ((package, statistics.median(times)) for package, times in packages.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        "runs": runs,
+        "import_ms": round(statistics.median(run["total_ms"] for run in imports), 1),
+        "first_response_ms": round(statistics.median(first_responses), 1),
+        "first_response_max_ms": round(max(first_responses), 1),
+        "slowest_imports": [{"module": package, "cumulative_ms": round(ms, 1)} for package, ms in slowest],
+    }
+
+
+def print_report(report: dict):
+    print(f"Cold start ({report['runs']} run(s), median)")
+    print(f"  import server      {report['import_ms']:8.1f} ms")
+    print(f"  first response     {report['first_response_ms']:8.1f} ms  (max {report['first_response_max_ms']:.1f} ms)")
+    print()
+    print("Slowest imports of server (cumulative)")
+    for entry in report["slowest_imports"]:
+        print(f"  {entry['module']:<28} {entry['cumulative_ms']:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per measurement (median is reported)")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest packages to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = build_report(args.runs, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
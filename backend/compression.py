@@ -0,0 +1,197 @@
+"""
+Response compression (gzip, and brotli when the `brotli` package is installed).
+
+CompressionMiddleware compresses a response only when all of these hold:
+
+    - the client accepts it (Accept-Encoding; brotli is preferred over gzip)
+    - the Content-Type is in COMPRESSIBLE_TYPES (JSON, text, JS, SVG...), so images and
+      other already compressed bodies are never touched
+    - the body is at least COMPRESSION_MIN_SIZE bytes (default 1024): below roughly one
+      packet, compressing saves nothing on the wire and only costs CPU
+    - the response is not already encoded, is not a 204 / 304 and has a body
+
+Levels are chosen for throughput rather than ratio (GZIP_LEVEL 5, BROTLI_QUALITY 4);
+on our JSON the higher levels save a few extra percent for several times the CPU, see
+benchmarks/bench_compression.py. Bodies above COMPRESSION_THREAD_MIN_SIZE (64 KiB) are
+compressed in a worker thread so large lists and exports do not stall the event loop.
+Eligible responses get `Vary: Accept-Encoding` so shared caches keep the encodings apart.
+
+Most responses are sent in one body message and are compressed in one go; streamed
+responses (more_body) are compressed chunk by chunk with a streaming compressor.
+COMPRESSION_ENABLED=0 turns the middleware into a pass-through.
+"""
+import gzip
+import os
+import zlib
+from typing import Optional
+
+import anyio
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # opcionális függőség
+    brotli = None
+
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+# Efölött a tömörítés szálban fut (a zlib / brotli elengedi a GIL-t): egy 1-2 MB-os export
+# gzip-je ~25 ms, ennyi ideig nem állhat az event loop
+COMPRESSION_THREAD_MIN_SIZE = int(os.environ.get("COMPRESSION_THREAD_MIN_SIZE", 64 * 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+})
+
+
+def accepted_encoding(accept_encoding: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding header value, or None"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    if brotli_available and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.finish
+        else:
+            # wbits=31: gzip fejléc és lábléc
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._flush = self._compressor.flush
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compress(chunk)
+
+    def finish(self) -> bytes:
+        return self._flush()
+
+
+def _mark_encoded(headers: MutableHeaders, encoding: str):
+    headers["Content-Encoding"] = encoding
+    # Más reprezentáció, más (erős) ETag - az etags.matches mindkét alakot elfogadja
+    etag = headers.get("etag")
+    if etag and etag.endswith('"') and not etag.startswith("W/"):
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+
+
+def _is_compressible(headers: MutableHeaders) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, enabled: bool = COMPRESSION_ENABLED):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                encoding = accepted_encoding(value.decode("latin-1"))
+                break
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if message["status"] in (204, 304) or not _is_compressible(headers):
+                    passthrough = True
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None:
+                    passthrough = True
+                    await send(message)
+                    return
+                # A fejlécek az első body üzenetig várnak: a méret dönti el, tömörítünk-e
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(scope=start_message)
+
+            if compressor is None:
+                if not more_body:
+                    if len(body) < self.minimum_size:
+                        passthrough = True
+                        await send(start_message)
+                        await send(message)
+                        return
+                    if len(body) >= COMPRESSION_THREAD_MIN_SIZE:
+                        compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+                    else:
+                        compressed = compress(body, encoding)
+                    _mark_encoded(headers, encoding)
+                    headers["Content-Length"] = str(len(compressed))
+                    passthrough = True
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                # Streamelt válasz: darabonként tömörítve, a hossz nem ismert előre
+                compressor = _StreamCompressor(encoding)
+                _mark_encoded(headers, encoding)
+                del headers["Content-Length"]
+                await send(start_message)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,157 @@
+"""
+Per-request MongoDB round-trip accounting and slow query log.
+
+A pymongo CommandListener is attached to the Motor client. DBStatsMiddleware puts a
+fresh RequestDBStats object into a context variable for every HTTP request; Motor runs
+pymongo in executor threads with a copy of the caller's context, so the listener finds
+that same object and adds each command's round-trip time to it. The totals go back to
+the client as X-DB-Calls / X-DB-Time (milliseconds) response headers.
+
+Every command slower than DB_SLOW_QUERY_MS is logged together with its filter shape
+(values replaced by "?"), e.g. find appointments {"barber_id": "?", "appointment_date": "?"}.
+"""
+import json
+import logging
+import os
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", 100))
+
+# Parancsonként az a kulcs, ami alatt a szűrő található
+_FILTER_KEYS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline",
+}
+
+
+class RequestDBStats:
+    __slots__ = ("calls", "time", "_lock")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0  # seconds
+        self._lock = threading.Lock()
+
+    def record(self, duration: float):
+        # Egy kérés parancsai párhuzamosan is futhatnak (több executor szálon)
+        with self._lock:
+            self.calls += 1
+            self.time += duration
+
+
+_current_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("db_stats", default=None)
+
+
+def current_db_stats() -> Optional[RequestDBStats]:
+    return _current_stats.get()
+
+
+def start_db_stats() -> RequestDBStats:
+    """Start a fresh accounting scope in the current context (a request, a test block)"""
+    stats = RequestDBStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def query_shape(value):
+    """Replace every literal in a filter with "?", keeping keys and operators"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], dict):
+            return [query_shape(item) for item in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def command_shape(command_name: str, command) -> str:
+    if command_name in _FILTER_KEYS:
+        target = command.get(_FILTER_KEYS[command_name], {})
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        target = statements[0].get("q", {})
+    else:
+        return ""
+    return json.dumps(query_shape(target), default=str, ensure_ascii=False)
+
+
+class DBCommandListener(monitoring.CommandListener):
+    def __init__(self, slow_query_ms: float = DB_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                _current_stats.get(),
+                event.database_name,
+                event.command,
+            )
+
+    def _finished(self, event, failed: bool):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        stats, database_name, command = pending
+        duration = event.duration_micros / 1_000_000
+        if stats is not None:
+            stats.record(duration)
+        if duration * 1000 >= self.slow_query_ms:
+            collection = command.get(event.command_name, "")
+            logger.warning(
+                "Slow MongoDB command: %s %s.%s %.1fms%s shape=%s",
+                event.command_name,
+                database_name,
+                collection if isinstance(collection, str) else "",
+                duration * 1000,
+                " (failed)" if failed else "",
+                command_shape(event.command_name, command),
+            )
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+
+command_listener = DBCommandListener()
+
+
+class DBStatsMiddleware:
+    """Adds X-DB-Calls / X-DB-Time to every HTTP response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDBStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Calls", str(stats.calls))
+                headers.append("X-DB-Time", f"{stats.time * 1000:.3f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
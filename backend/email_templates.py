@@ -0,0 +1,405 @@
+"""
+Trilingual (RO / HU / EN) e-mail templates.
+
+Every template is written once as plain text with `{field}` placeholders. At import time
+each one is compiled into a plain-text and an HTML variant: the source is split into
+lines, the HTML markup is derived from the line structure (headings, bullet lists,
+paragraphs), and the placeholders are validated against EmailContext so a typo fails at
+startup instead of in the outbox worker. Rendering is then a list of str.format_map calls.
+
+A line starting with "@flag " is only emitted when that context flag is truthy
+(e.g. the after-hours note).
+
+The cancellation template is compiled (and validated) like the others, but nothing
+queues it: cancelling an appointment does not e-mail the customer.
+"""
+import html
+from dataclasses import dataclass
+from datetime import date, time
+from string import Formatter
+from typing import Dict, NamedTuple, Optional, Union
+
+SEPARATOR = "------------------------------------------------------------"
+
+CONFIRMATION_SUBJECT = "Confirmare / Visszaigazolás / Confirmation – Oxyss Style"
+REMINDER_SUBJECT = "Reamintire / Emlékeztető / Reminder – Oxyss Style"
+CANCELLATION_SUBJECT = "Anulare / Lemondás / Cancellation – Oxyss Style"
+
+CONFIRMATION_SOURCE = """\
+🇷🇴 Confirmare Programare – Oxyss Style
+
+Dragă {customer_name},
+
+Îți mulțumim că ai efectuat o programare la Oxyss Style!
+
+Detaliile programării tale:
+
+• Serviciu: {service_name}
+• Stilist: {barber_name}
+• Dată: {appointment_date}
+• Ora: {appointment_time}
+• Durată estimată: {duration} minute
+• Preț: {price} RON
+@after_hours • Notă: Programare în afara programului normal ({after_hours_window})
+
+Dacă dorești să modifici sau să anulezi programarea, ne poți contacta la:
+Telefon: +40 74 116 1016
+
+Te așteptăm cu drag în salonul nostru!
+
+Cu respect,
+{barber_name} și echipa Oxyss Style
+
+------------------------------------------------------------
+
+🇭🇺 Foglalás visszaigazolása – Oxyss Style
+
+Kedves {customer_name},
+
+Köszönjük, hogy időpontot foglalt az Oxyss Style szalonba!
+
+Az alábbiakban megtalálod a foglalásod részleteit:
+
+• Szolgáltatás: {service_name}
+• Fodrász: {barber_name}
+• Dátum: {appointment_date}
+• Időpont: {appointment_time}
+• Várható időtartam: {duration} perc
+• Ár: {price} RON
+@after_hours • Megjegyzés: Program utáni időpont ({after_hours_window})
+
+Amennyiben módosítanád vagy lemondanád az időpontot, kérjük vedd fel velünk a kapcsolatot:
+Telefon: +40 74 116 1016
+
+Várunk szeretettel az Oxyss Style szalonban!
+
+Üdvözlettel,
+{barber_name} és az Oxyss Style csapat
+
+------------------------------------------------------------
+
+🇬🇧 Appointment Confirmation – Oxyss Style
+
+Dear {customer_name},
+
+Thank you for booking an appointment at Oxyss Style!
+
+Here are the details of your appointment:
+
+• Service: {service_name}
+• Hair Stylist: {barber_name}
+• Date: {appointment_date}
+• Time: {appointment_time}
+• Estimated duration: {duration} minutes
+• Price: {price} RON
+@after_hours • Note: After-hours appointment ({after_hours_window})
+
+If you need to modify or cancel your appointment, feel free to contact us:
+Phone: +40 74 116 1016
+
+We look forward to welcoming you at Oxyss Style!
+
+Best regards,
+{barber_name} and the Oxyss Style Team
+"""
+
+REMINDER_SOURCE = """\
+🇷🇴 Reamintire Programare – Oxyss Style
+
+Dragă {customer_name},
+
+Îți reamintim că ai o programare la Oxyss Style {reminder_when_ro}.
+
+• Serviciu: {service_name}
+• Stilist: {barber_name}
+• Dată: {appointment_date}
+• Ora: {appointment_time}
+@after_hours • Notă: Programare în afara programului normal ({after_hours_window})
+
+Dacă nu poți ajunge, te rugăm să ne anunți la:
+Telefon: +40 74 116 1016
+
+Cu respect,
+{barber_name} și echipa Oxyss Style
+
+------------------------------------------------------------
+
+🇭🇺 Emlékeztető – Oxyss Style
+
+Kedves {customer_name},
+
+Emlékeztetünk, hogy {reminder_when_hu} időpontod van az Oxyss Style szalonban.
+
+• Szolgáltatás: {service_name}
+• Fodrász: {barber_name}
+• Dátum: {appointment_date}
+• Időpont: {appointment_time}
+@after_hours • Megjegyzés: Program utáni időpont ({after_hours_window})
+
+Ha mégsem tudsz jönni, kérjük jelezd nekünk:
+Telefon: +40 74 116 1016
+
+Üdvözlettel,
+{barber_name} és az Oxyss Style csapat
+
+------------------------------------------------------------
+
+🇬🇧 Appointment Reminder – Oxyss Style
+
+Dear {customer_name},
+
+This is a reminder of your appointment at Oxyss Style {reminder_when_en}.
+
+• Service: {service_name}
+• Hair Stylist: {barber_name}
+• Date: {appointment_date}
+• Time: {appointment_time}
+@after_hours • Note: After-hours appointment ({after_hours_window})
+
+If you can't make it, please let us know:
+Phone: +40 74 116 1016
+
+Best regards,
+{barber_name} and the Oxyss Style Team
+"""
+
+CANCELLATION_SOURCE = """\
+🇷🇴 Programare Anulată – Oxyss Style
+
+Dragă {customer_name},
+
+Programarea ta la Oxyss Style a fost anulată.
+
+• Serviciu: {service_name}
+• Stilist: {barber_name}
+• Dată: {appointment_date}
+• Ora: {appointment_time}
+
+Dacă dorești o nouă programare, ne poți contacta la:
+Telefon: +40 74 116 1016
+
+Cu respect,
+Echipa Oxyss Style
+
+------------------------------------------------------------
+
+🇭🇺 Időpont lemondva – Oxyss Style
+
+Kedves {customer_name},
+
+Az Oxyss Style szalonba foglalt időpontod lemondásra került.
+
+• Szolgáltatás: {service_name}
+• Fodrász: {barber_name}
+• Dátum: {appointment_date}
+• Időpont: {appointment_time}
+
+Ha új időpontot szeretnél, keress minket bizalommal:
+Telefon: +40 74 116 1016
+
+Üdvözlettel,
+Az Oxyss Style csapat
+
+------------------------------------------------------------
+
+🇬🇧 Appointment Cancelled – Oxyss Style
+
+Dear {customer_name},
+
+Your appointment at Oxyss Style has been cancelled.
+
+• Service: {service_name}
+• Hair Stylist: {barber_name}
+• Date: {appointment_date}
+• Time: {appointment_time}
+
+If you would like to book a new appointment, feel free to contact us:
+Phone: +40 74 116 1016
+
+Best regards,
+The Oxyss Style Team
+"""
+
+REMINDER_WHEN = {
+    "day_before": {"ro": "mâine", "hu": "holnap", "en": "tomorrow"},
+    "hour_before": {"ro": "în aproximativ o oră", "hu": "körülbelül egy óra múlva", "en": "in about an hour"},
+}
+
+
+@dataclass(frozen=True)
+class EmailContext:
+    """Everything a template may reference; built from an appointment"""
+    customer_name: str
+    service_name: str
+    barber_name: str
+    appointment_date: Union[date, str]
+    appointment_time: Union[time, str]
+    duration: Optional[int] = None
+    price: Optional[float] = None
+    after_hours_window: str = ""  # pl. "19:00-21:00", üres ha nem program utáni foglalás
+    reminder: str = "day_before"  # day_before | hour_before
+
+    @classmethod
+    def from_appointment(cls, appointment, after_hours_window: str = "", reminder: str = "day_before"):
+        """Accepts an Appointment model or a raw appointment document from Mongo"""
+        if not isinstance(appointment, dict):
+            appointment = appointment.model_dump()
+        return cls(
+            customer_name=appointment["customer_name"],
+            service_name=appointment["service_name"],
+            barber_name=appointment["barber_name"],
+            appointment_date=appointment["appointment_date"],
+            appointment_time=appointment["appointment_time"],
+            duration=appointment.get("duration"),
+            price=appointment.get("price"),
+            after_hours_window=after_hours_window,
+            reminder=reminder,
+        )
+
+    def to_document(self) -> dict:
+        """Plain, BSON-friendly form for storing the context in the outbox"""
+        values = self.values()
+        return {
+            "customer_name": self.customer_name,
+            "service_name": self.service_name,
+            "barber_name": self.barber_name,
+            "appointment_date": values["appointment_date"],
+            "appointment_time": values["appointment_time"],
+            "duration": self.duration,
+            "price": self.price,
+            "after_hours_window": self.after_hours_window,
+            "reminder": self.reminder,
+        }
+
+    def values(self) -> Dict[str, str]:
+        appointment_time = self.appointment_time
+        if isinstance(appointment_time, time):
+            appointment_time = appointment_time.strftime("%H:%M")
+        else:
+            appointment_time = appointment_time[:5]
+        when = REMINDER_WHEN[self.reminder]
+        return {
+            "customer_name": self.customer_name,
+            "service_name": self.service_name,
+            "barber_name": self.barber_name,
+            "appointment_date": str(self.appointment_date),
+            "appointment_time": appointment_time,
+            "duration": str(self.duration),
+            "price": str(self.price),
+            "after_hours": "1" if self.after_hours_window else "",
+            "after_hours_window": self.after_hours_window,
+            "reminder_when_ro": when["ro"],
+            "reminder_when_hu": when["hu"],
+            "reminder_when_en": when["en"],
+        }
+
+
+CONTEXT_FIELDS = frozenset(
+    EmailContext(customer_name="", service_name="", barber_name="", appointment_date="", appointment_time="").values()
+)
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    text: str
+    html: str
+
+
+class CompiledTemplate:
+    """A list of (condition, format string) lines, joined after rendering"""
+
+    __slots__ = ("lines", "joiner", "escape")
+
+    def __init__(self, lines, joiner: str, escape: bool):
+        self.lines = lines
+        self.joiner = joiner
+        self.escape = escape
+
+    def render(self, values: Dict[str, str]) -> str:
+        if self.escape:
+            values = {key: html.escape(value) for key, value in values.items()}
+        return self.joiner.join(
+            line.format_map(values)
+            for condition, line in self.lines
+            if condition is None or values[condition]
+        )
+
+
+def _split_condition(line: str):
+    if line.startswith("@"):
+        condition, _, rest = line[1:].partition(" ")
+        return condition, rest
+    return None, line
+
+
+def _validate(name: str, line: str):
+    for _, field, _, _ in Formatter().parse(line):
+        if field is not None and field not in CONTEXT_FIELDS:
+            raise ValueError(f"Template {name!r} references unknown field {{{field}}}")
+
+
+def _compile_text(name: str, source: str) -> CompiledTemplate:
+    lines = []
+    for raw in source.splitlines():
+        condition, line = _split_condition(raw)
+        if condition is not None and condition not in CONTEXT_FIELDS:
+            raise ValueError(f"Template {name!r} uses unknown condition @{condition}")
+        _validate(name, line)
+        lines.append((condition, line))
+    return CompiledTemplate(lines, "\n", escape=False)
+
+
+def _compile_html(name: str, source: str) -> CompiledTemplate:
+    """
+    Derive the HTML layout from the text structure: the first block of each language
+    section is its heading, bullet lines become a list, the separator becomes <hr>,
+    and every other block becomes a paragraph with <br> line breaks.
+    """
+    lines = [(None, '<div style="font-family: Arial, sans-serif; line-height: 1.5;">')]
+    for section_index, section in enumerate(source.strip().split(SEPARATOR)):
+        if section_index:
+            lines.append((None, "<hr>"))
+        blocks = [block.strip("\n").splitlines() for block in section.strip().split("\n\n") if block.strip()]
+        for block_index, block in enumerate(blocks):
+            parsed = [_split_condition(raw) for raw in block]
+            for _, line in parsed:
+                _validate(name, line)
+            escaped = [(condition, html.escape(line, quote=False)) for condition, line in parsed]
+            if block_index == 0:
+                lines.append((None, "<h2>" + "<br>".join(line for _, line in escaped) + "</h2>"))
+            elif all(line.startswith("• ") for _, line in escaped):
+                lines.append((None, "<ul>"))
+                lines.extend((condition, f"<li>{line[2:]}</li>") for condition, line in escaped)
+                lines.append((None, "</ul>"))
+            else:
+                lines.append((None, "<p>" + "<br>".join(line for _, line in escaped) + "</p>"))
+    lines.append((None, "</div>"))
+    return CompiledTemplate(lines, "\n", escape=True)
+
+
+class EmailTemplate:
+    __slots__ = ("subject", "text", "html")
+
+    def __init__(self, name: str, subject: str, source: str):
+        self.subject = subject
+        self.text = _compile_text(name, source)
+        self.html = _compile_html(name, source)
+
+    def render(self, context: EmailContext) -> RenderedEmail:
+        values = context.values()
+        return RenderedEmail(self.subject, self.text.render(values), self.html.render(values))
+
+
+def compile_templates() -> Dict[str, EmailTemplate]:
+    return {
+        "confirmation": EmailTemplate("confirmation", CONFIRMATION_SUBJECT, CONFIRMATION_SOURCE),
+        "reminder": EmailTemplate("reminder", REMINDER_SUBJECT, REMINDER_SOURCE),
+        "cancellation": EmailTemplate("cancellation", CANCELLATION_SUBJECT, CANCELLATION_SOURCE),
+    }
+
+
+TEMPLATES = compile_templates()
+
+
+def render_email(kind: str, context: EmailContext) -> RenderedEmail:
+    return TEMPLATES[kind].render(context)
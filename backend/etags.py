@@ -0,0 +1,120 @@
+"""
+ETags and conditional GETs for the catalog and availability endpoints.
+
+Every cacheable response is derived from a few data version counters, one document per
+scope in the data_versions collection:
+
+    catalog                    barbers, services, barber_services
+    availability:{barber_id}   that barber's appointments and breaks
+
+Writes bump the counter of the scope they change ($inc, so every worker and machine sees
+the same number). A response's ETag is a hash of the counters it depends on plus
+whatever else shapes it (query parameters, the current minute for today's slots, the
+deployed image). A request whose If-None-Match still matches is answered with 304
+before any query runs - at most one version read, usually none, because the counters
+are cached per process for DATA_VERSION_CACHE_SECONDS (default 1s; a bump in this
+process updates the cache at once, other workers notice within the TTL).
+
+The ETags are strong; CompressionMiddleware appends "-gzip" / "-br" to them for
+compressed bodies and `matches` accepts either form back.
+"""
+import hashlib
+import os
+from time import monotonic
+from typing import Iterable, Optional
+
+from pymongo import ReturnDocument
+from starlette.responses import Response
+
+DATA_VERSIONS_COLLECTION = "data_versions"
+DATA_VERSION_CACHE_SECONDS = float(os.environ.get("DATA_VERSION_CACHE_SECONDS", 1.0))
+# Új image = esetleg más válaszformátum, így a régi ETag-ek nem érvényesek
+_BUILD = os.environ.get("FLY_IMAGE_REF", "")
+
+CATALOG = "catalog"
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def availability_scope(barber_id: str) -> str:
+    return f"availability:{barber_id}"
+
+
+class DataVersions:
+    def __init__(self, ttl: float = DATA_VERSION_CACHE_SECONDS):
+        self.ttl = ttl
+        self._cache = {}  # scope -> (version, expires_at)
+
+    async def current(self, db, scopes: Iterable[str]) -> dict:
+        """The version of each scope (0 if never bumped); one query for the uncached ones"""
+        now = monotonic()
+        versions, missing = {}, []
+        for scope in scopes:
+            cached = self._cache.get(scope)
+            if cached is not None and cached[1] > now:
+                versions[scope] = cached[0]
+            else:
+                missing.append(scope)
+        if missing:
+            found = {doc["_id"]: doc.get("version", 0) for doc in await db[DATA_VERSIONS_COLLECTION].find(
+                {"_id": {"$in": missing}}
+            ).to_list(None)}
+            for scope in missing:
+                versions[scope] = found.get(scope, 0)
+                self._cache[scope] = (versions[scope], now + self.ttl)
+        return versions
+
+    async def bump(self, db, scope: str) -> int:
+        doc = await db[DATA_VERSIONS_COLLECTION].find_one_and_update(
+            {"_id": scope},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        version = doc["version"]
+        self._cache[scope] = (version, monotonic() + self.ttl)
+        return version
+
+    def clear(self):
+        self._cache.clear()
+
+
+versions = DataVersions()
+
+
+def make_etag(scope_versions: dict, *parts) -> str:
+    key = "|".join(
+        [_BUILD]
+        + [f"{scope}={version}" for scope, version in sorted(scope_versions.items())]
+        + [str(part) for part in parts]
+    )
+    return '"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)]
+    return tag
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 prescribes for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in if_none_match.split(","))
+
+
+def etag_headers(etag: str) -> dict:
+    # no-cache: a böngésző tárolhatja, de minden használat előtt revalidál (olcsó 304)
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
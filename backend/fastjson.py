@@ -0,0 +1,97 @@
+"""
+Fast JSON responses for the read-heavy list endpoints.
+
+By default FastAPI validates whatever an endpoint returns against its response_model
+(building one pydantic object per document), turns that back into plain data and encodes
+it with the stdlib json module. For lists of stored documents, which were validated when
+they were written, that is mostly wasted work.
+
+Endpoints opt in by returning a FastJSONResponse built from documents passed through a
+DocumentDecoder: the decoder keeps exactly the model's fields, fills in the model's
+defaults and converts the stored ISO strings to date / time / datetime, and orjson
+encodes the result. FastAPI skips response_model validation for a returned Response, so
+the response_model stays on the route only for the OpenAPI schema. The JSON is the same
+as before: orjson writes dates, times and UTC datetimes ("...Z", OPT_UTC_Z) the way
+pydantic does.
+
+    decode_appointment = DocumentDecoder(Appointment)
+    docs = await db.appointments.find(query, decode_appointment.projection).to_list(1000)
+    return FastJSONResponse([decode_appointment(doc) for doc in docs])
+"""
+import types
+import typing
+from datetime import date, datetime, time
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+_MISSING = object()
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def _to_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _to_time(value):
+    return time.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _to_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _to_float(value):
+    return float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+
+# Csak azok a típusok, amiknek a tárolt alakja eltér a JSON-ban várttól
+_CONVERTERS = {
+    date: _to_date,
+    time: _to_time,
+    datetime: _to_datetime,
+    float: _to_float,
+}
+
+
+def _converter(annotation):
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        arguments = [argument for argument in typing.get_args(annotation) if argument is not type(None)]
+        if len(arguments) == 1:
+            annotation = arguments[0]
+    return _CONVERTERS.get(annotation)
+
+
+class DocumentDecoder:
+    """Typed projection of stored documents onto a pydantic model's fields (no validation)"""
+
+    def __init__(self, model: typing.Type[BaseModel]):
+        self.model = model
+        self.fields = []
+        for name, info in model.model_fields.items():
+            default = _MISSING if info.default is PydanticUndefined else info.default
+            self.fields.append((name, default, info.default_factory, _converter(info.annotation)))
+        # A model mezőin kívül semmit sem kell lekérni
+        self.projection = {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+    def __call__(self, document: dict) -> dict:
+        decoded = {}
+        for name, default, default_factory, converter in self.fields:
+            value = document.get(name, _MISSING)
+            if value is _MISSING:
+                if default_factory is not None:
+                    value = default_factory()
+                elif default is _MISSING:
+                    raise ValueError(f"{self.model.__name__} document {document.get('id')!r} has no {name!r}")
+                else:
+                    value = default
+            elif converter is not None and value is not None:
+                value = converter(value)
+            decoded[name] = value
+        return decoded
@@ -0,0 +1,186 @@
+"""
+Liveness and readiness probes.
+
+    GET /healthz   the process is up and the event loop answers; no I/O at all
+    GET /readyz    the app can serve traffic: a Mongo ping (cached for
+                   READINESS_PING_TTL_SECONDS, so frequent probes do not each hit the
+                   database), the connection pool state and the background workers
+
+/readyz answers 503 while the database is not configured yet or the ping fails; a
+stopped background worker is reported as "degraded" but keeps the machine in rotation,
+because bookings are still served (the outbox keeps queued e-mails until a worker runs).
+
+The pool state comes from a pymongo ConnectionPoolListener attached to the Motor client,
+so reading it costs nothing either.
+"""
+import asyncio
+import os
+import threading
+from time import monotonic
+from typing import Optional
+
+from pymongo import monitoring
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+READINESS_PING_TTL_SECONDS = float(os.environ.get("READINESS_PING_TTL_SECONDS", 5))
+READINESS_PING_TIMEOUT_SECONDS = float(os.environ.get("READINESS_PING_TIMEOUT_SECONDS", 2))
+
+# Előre kódolt válasz: a liveness probe nem serializál semmit
+_HEALTHZ_BODY = b'{"status":"ok"}'
+
+
+def healthz_endpoint(request: Request) -> Response:
+    return Response(_HEALTHZ_BODY, media_type="application/json")
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Open / checked-out connection counts per server, from pymongo's pool events"""
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, address) -> dict:
+        key = f"{address[0]}:{address[1]}"
+        return self._pools.setdefault(key, {"open": 0, "checked_out": 0, "cleared": 0, "ready": False})
+
+    def _update(self, event, **changes):
+        with self._lock:
+            pool = self._pool(event.address)
+            for field, value in changes.items():
+                if isinstance(value, bool):
+                    pool[field] = value
+                else:
+                    pool[field] += value
+
+    def pool_created(self, event):
+        self._update(event, ready=False)
+
+    def pool_ready(self, event):
+        self._update(event, ready=True)
+
+    def pool_cleared(self, event):
+        # A pymongo egy szerverhiba után üríti (és szünetelteti) a pool-t
+        self._update(event, ready=False, cleared=1)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        self._update(event, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event, open=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        self._update(event, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._update(event, checked_out=-1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {address: dict(pool) for address, pool in self._pools.items()}
+
+
+pool_listener = PoolListener()
+
+
+class CachedPing:
+    """Mongo ping whose result is reused for `ttl` seconds; concurrent probes share one ping"""
+
+    def __init__(self, ttl: float = READINESS_PING_TTL_SECONDS, timeout: float = READINESS_PING_TIMEOUT_SECONDS):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self, db) -> dict:
+        if self._result is not None and monotonic() - self._checked_at < self.ttl:
+            return self._result
+        async with self._lock:
+            # Amíg a lock-ra vártunk, egy másik probe frissíthette az eredményt
+            if self._result is not None and monotonic() - self._checked_at < self.ttl:
+                return self._result
+            started = monotonic()
+            try:
+                await asyncio.wait_for(db.command("ping"), timeout=self.timeout)
+            except Exception as exc:
+                result = {"ok": False, "error": f"{type(exc).__name__}: {exc}"[:200]}
+            else:
+                result = {"ok": True, "latency_ms": round((monotonic() - started) * 1000, 3)}
+            self._result = result
+            self._checked_at = monotonic()
+            return result
+
+    def clear(self):
+        self._result = None
+
+
+mongo_ping = CachedPing()
+
+
+def task_status(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return "starting"
+    if not task.done():
+        return "running"
+    if task.cancelled():
+        return "cancelled"
+    return "crashed" if task.exception() is not None else "stopped"
+
+
+async def readiness(db, workers: dict, startup_task: Optional[asyncio.Task] = None) -> JSONResponse:
+    """
+    The /readyz response. `workers` maps the name of each background worker enabled in
+    this process to the worker (anything with a `_task`), or None while it is not started
+    yet. `startup_task` is the background index creation, which retries until it succeeds
+    (reported as "pending" meanwhile).
+    """
+    if db is None:
+        return JSONResponse({"status": "starting"}, status_code=503)
+
+    mongo = await mongo_ping.check(db)
+    worker_report = {}
+    for name, worker in workers.items():
+        worker_report[name] = {"status": task_status(getattr(worker, "_task", None))}
+        if getattr(worker, "last_run_at", None) is not None:
+            worker_report[name]["last_run_at"] = worker.last_run_at.isoformat()
+        if hasattr(worker, "is_leader"):
+            worker_report[name]["leader"] = worker.is_leader
+    # Az indexek a háttérben készülnek (lásd server.start_background_workers)
+    if startup_task is None or not startup_task.done():
+        indexes = "pending"
+    else:
+        indexes = "ready" if not startup_task.cancelled() and startup_task.result() else "failed"
+
+    if not mongo["ok"]:
+        status = "unavailable"
+    elif indexes == "failed" or any(
+        report["status"] not in ("running", "starting") for report in worker_report.values()
+    ):
+        status = "degraded"
+    else:
+        status = "ok"
+    return JSONResponse(
+        {
+            "status": status,
+            "mongo": mongo,
+            "pool": pool_listener.snapshot(),
+            "workers": worker_report,
+            "indexes": indexes,
+        },
+        status_code=503 if status == "unavailable" else 200,
+    )
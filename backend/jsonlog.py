@@ -0,0 +1,147 @@
+"""
+Structured JSON logging.
+
+configure_logging() installs a formatter that writes one JSON object per line. Every
+line carries the current request context (request_id, route, barber_id) from a context
+variable, so log lines written by handlers, background tasks and DB instrumentation can
+be joined on request_id. Set LOG_FORMAT=text for human-readable local output.
+
+RequestLoggingMiddleware assigns the request id (taken from X-Request-ID if the client
+or proxy sent one), echoes it back in the response headers and, when the request is
+done, writes one "request" line with route, status, latency, DB call count / time and
+outcome. Extra structured fields can be attached to any log call with
+`logger.info("...", extra={"fields": {...}})`.
+"""
+import json
+import logging
+import os
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+import dbstats
+import metrics
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+
+access_logger = logging.getLogger("oxyss.access")
+# Health probe-ok (Fly / Docker, néhány másodpercenként) csak DEBUG szinten kerülnek a logba
+PROBE_PATHS = frozenset({"/healthz", "/readyz"})
+
+# Kérésenként egy közös, módosítható dict: amit a handler (pl. az auth) beleír,
+# azt a middleware is látja a kérés végén
+_log_context: ContextVar[Optional[dict]] = ContextVar("log_context", default=None)
+
+
+def get_log_context() -> dict:
+    return _log_context.get() or {}
+
+
+def bind_log_context(**fields):
+    """Attach fields (e.g. barber_id) to every log line of the current request"""
+    context = _log_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+def set_log_context(**fields):
+    """Start a new log context, e.g. in a background worker processing one message"""
+    return _log_context.set(dict(fields))
+
+
+def reset_log_context(token):
+    _log_context.reset(token)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(get_log_context())
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT):
+    handler = logging.StreamHandler(sys.stdout)
+    if log_format == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+
+def _outcome(status_code: int) -> str:
+    if status_code >= 500:
+        return "server_error"
+    if status_code >= 400:
+        return "client_error"
+    return "ok"
+
+
+class RequestLoggingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        route = metrics.route_template(scope["app"], scope)
+        token = _log_context.set({"request_id": request_id, "route": route})
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        started = perf_counter()
+        outcome = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            outcome = "exception"
+            raise
+        finally:
+            stats = dbstats.current_db_stats()
+            level = logging.DEBUG if scope["path"] in PROBE_PATHS and status_code < 500 else logging.INFO
+            access_logger.log(
+                level,
+                "request",
+                extra={"fields": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "latency_ms": round((perf_counter() - started) * 1000, 3),
+                    "db_calls": stats.calls if stats else 0,
+                    "db_time_ms": round(stats.time * 1000, 3) if stats else 0.0,
+                    "outcome": outcome or _outcome(status_code),
+                }},
+            )
+            _log_context.reset(token)
@@ -0,0 +1,125 @@
+"""
+Load shedding: fast-fail non-critical requests while the process is overloaded.
+
+Two signals say a worker is overloaded:
+
+    event-loop lag   LoopLagMonitor sleeps LOOP_LAG_INTERVAL_MS (50 ms) in a loop and
+                     measures how late it wakes up. The value rises at once and decays
+                     slowly (LOOP_LAG_DECAY), so one quiet sample does not end an overload.
+    in-flight        requests currently inside LoadSheddingMiddleware in this worker.
+
+While lag >= LOAD_SHED_LAG_MS (default 100) or in-flight >= LOAD_SHED_MAX_IN_FLIGHT
+(default 10 per worker; fly.toml allows 25 connections per machine over 2 workers), the
+routes in SHEDDABLE_ROUTES - Google reviews, the contact message listing, the export -
+are answered with 503 and Retry-After: 1 before any work is done. Everything else,
+above all POST /appointments and the availability endpoints, is always admitted: the
+point of shedding the rest is to keep those within their latency targets.
+
+LOAD_SHED_ENABLED=0 turns shedding off (the signals are still measured). Decisions are
+exported as load_shed_requests_total{route, reason}, the lag as event_loop_lag_seconds.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from metrics import EVENT_LOOP_LAG, LOAD_SHED_REQUESTS, route_template
+
+logger = logging.getLogger(__name__)
+
+LOAD_SHED_ENABLED = os.environ.get("LOAD_SHED_ENABLED", "1") == "1"
+LOAD_SHED_LAG_MS = float(os.environ.get("LOAD_SHED_LAG_MS", 100))
+LOAD_SHED_MAX_IN_FLIGHT = int(os.environ.get("LOAD_SHED_MAX_IN_FLIGHT", 10))
+LOOP_LAG_INTERVAL_MS = float(os.environ.get("LOOP_LAG_INTERVAL_MS", 50))
+LOOP_LAG_DECAY = float(os.environ.get("LOOP_LAG_DECAY", 0.8))
+
+SHEDDABLE_ROUTES = frozenset({
+    ("GET", "/api/reviews"),
+    ("GET", "/api/contact"),
+    ("GET", "/__export_db"),
+})
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_MS / 1000, decay: float = LOOP_LAG_DECAY):
+        self.interval = interval
+        self.decay = decay
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, sample: float):
+        # Gyorsan emelkedik, lassan cseng le
+        self.lag = sample if sample >= self.lag else self.lag * self.decay + sample * (1 - self.decay)
+        EVENT_LOOP_LAG.set(self.lag)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run(), name="loop-lag-monitor")
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - started - self.interval))
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+class LoadSheddingMiddleware:
+    def __init__(
+        self,
+        app,
+        monitor: LoopLagMonitor = loop_lag_monitor,
+        lag_threshold: float = LOAD_SHED_LAG_MS / 1000,
+        max_in_flight: int = LOAD_SHED_MAX_IN_FLIGHT,
+        enabled: bool = LOAD_SHED_ENABLED,
+    ):
+        self.app = app
+        self.monitor = monitor
+        self.lag_threshold = lag_threshold
+        self.max_in_flight = max_in_flight
+        self.enabled = enabled
+        self.in_flight = 0
+
+    def overload_reason(self) -> Optional[str]:
+        if self.monitor.lag >= self.lag_threshold:
+            return "loop_lag"
+        if self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.enabled:
+            reason = self.overload_reason()
+            if reason is not None:
+                route = route_template(scope["app"], scope)
+                if (scope["method"], route) in SHEDDABLE_ROUTES:
+                    LOAD_SHED_REQUESTS.labels(route, reason).inc()
+                    response = JSONResponse(
+                        {"detail": "Service temporarily overloaded"}, status_code=503, headers={"Retry-After": "1"}
+                    )
+                    await response(scope, receive, send)
+                    return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
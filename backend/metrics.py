@@ -0,0 +1,171 @@
+"""
+Prometheus metrics.
+
+MetricsMiddleware records, per route template (e.g.
+/api/barbers/{barber_id}/available-slots) and status code, a request counter, an
+in-flight gauge and a latency histogram. Labels always use the route template, never the
+raw path, so IDs cannot blow up the label cardinality.
+
+singleflight_calls_total counts coalesced computations (singleflight.py) by role: a
+high follower share means the coalescing is doing its job. rate_limit_requests_total
+counts the rate limiter's decisions (ratelimit.py) per route class;
+load_shed_requests_total and event_loop_lag_seconds come from the load shedder
+(loadshed.py).
+
+With several uvicorn workers each process keeps its own counters. When
+PROMETHEUS_MULTIPROC_DIR is set (see the Dockerfile), prometheus_client writes them to
+memory-mapped files in that directory and /metrics aggregates every worker's files, so a
+scrape sees the whole machine no matter which worker answers it.
+
+The route template is matched once per request, by MetricsMiddleware (the outermost
+middleware), and kept in the ASGI scope; the inner middlewares that label or classify by
+route (access log, tracing, load shedding, rate limiting) read it from there.
+
+/metrics is not public: with METRICS_TOKEN set, a scrape must send
+"Authorization: Bearer <METRICS_TOKEN>" (Prometheus: `authorization: {credentials: ...}`);
+without it, only loopback clients (e.g. a sidecar or `fly ssh console`) are answered.
+"""
+import hmac
+import os
+from time import perf_counter
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+UNMATCHED_ROUTE = "__unmatched__"
+ROUTE_TEMPLATE_SCOPE_KEY = "route_template"
+LOOPBACK_CLIENTS = frozenset({"127.0.0.1", "::1"})
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "HTTP requests handled",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Coalesced computations: leaders started one, followers joined a running one",
+    ["name", "role"],
+)
+RATE_LIMIT_REQUESTS = Counter(
+    "rate_limit_requests_total",
+    "Requests seen by the rate limiter, by route class and decision (allowed / limited)",
+    ["route_class", "decision"],
+)
+LOAD_SHED_REQUESTS = Counter(
+    "load_shed_requests_total",
+    "Requests answered with 503 by the load shedder, by route and overload signal",
+    ["route", "reason"],
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds",
+    "Smoothed event-loop lag measured by the load shedder's monitor",
+    multiprocess_mode="livemax",
+)
+
+
+def route_template(app, scope) -> str:
+    """
+    The route template for a request. The first call (MetricsMiddleware) matches the
+    router's routes - or takes the route from the scope, once routed - and stores the
+    result in the scope, so every later call is a dict lookup.
+    """
+    template = scope.get(ROUTE_TEMPLATE_SCOPE_KEY)
+    if template is None:
+        route = scope.get("route")
+        if route is None:
+            for candidate in app.router.routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    route = candidate
+                    break
+        template = getattr(route, "path", UNMATCHED_ROUTE) if route is not None else UNMATCHED_ROUTE
+        scope[ROUTE_TEMPLATE_SCOPE_KEY] = template
+    return template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so it adds no per-request task or body buffering"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"], scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - started
+            in_flight.dec()
+            status_label = str(status_code)
+            REQUESTS_TOTAL.labels(method, route, status_label).inc()
+            REQUEST_DURATION.labels(method, route, status_label).observe(elapsed)
+
+
+def metrics_authorized(request: Request, token: Optional[str] = None) -> bool:
+    token = METRICS_TOKEN if token is None else token
+    if token:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), token.encode())
+    # Token nélkül csak a gépen belülről (a Fly proxy mögül érkező kérés sosem loopback)
+    return request.client is not None and request.client.host in LOOPBACK_CLIENTS
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if not metrics_authorized(request):
+        return Response("Forbidden", status_code=403, media_type="text/plain")
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the shared multiprocess files"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,365 @@
+"""
+Durable e-mail outbox.
+
+Request handlers never talk to SMTP: they insert a message into the `email_outbox`
+collection and return. An OutboxWorker claims pending messages in batches, sends each
+batch over a single reused SMTP connection and records the outcome. Failed messages are
+retried with exponential backoff; after EMAIL_MAX_ATTEMPTS (or on a permanent SMTP
+rejection) they are dead-lettered with status "dead" and kept for inspection.
+
+Claims are atomic (find_one_and_update) and time-limited, so any number of workers -
+both uvicorn workers, or a standalone `python outbox.py` process - can run side by
+side, and messages held by a crashed worker are picked up again once the lease expires.
+
+Delivery errors are logged and stored (`last_error`) as the exception type plus the SMTP
+code and server message, with any e-mail address redacted: aiosmtplib's exceptions carry
+the refused recipients, and server replies often quote them.
+"""
+import asyncio
+import logging
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from email_templates import TEMPLATES, EmailContext, render_email
+from jsonlog import configure_logging, get_log_context, reset_log_context, set_log_context
+from tracing import current_trace_context, extract_trace_context, span
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_COLLECTION = "email_outbox"
+
+EMAIL_USERNAME = os.getenv("EMAIL_USERNAME")
+EMAIL_FROM = os.getenv("EMAIL_FROM") or EMAIL_USERNAME or "noreply@localhost"
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
+EMAIL_START_TLS = os.getenv("EMAIL_START_TLS", "1") == "1"
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 20))
+EMAIL_POLL_INTERVAL_SECONDS = float(os.getenv("EMAIL_POLL_INTERVAL_SECONDS", 5))
+EMAIL_CLAIM_LEASE_SECONDS = int(os.getenv("EMAIL_CLAIM_LEASE_SECONDS", 120))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+EMAIL_RETRY_MAX_SECONDS = int(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+
+# Állapotok: pending -> sending -> sent | pending (újrapróbálás) | dead (dead-letter)
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+# Címek a hibaüzenetekben (pl. "550 5.1.1 <user@example.com> unknown") - nem kerülhetnek logba
+_ADDRESS_RE = re.compile(r"[^\s<>()\[\],;:'\"]+@[^\s<>()\[\],;:'\"]+")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+async def ensure_outbox_indexes(db):
+    await db[EMAIL_OUTBOX_COLLECTION].create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+    await db[EMAIL_OUTBOX_COLLECTION].create_index("id", unique=True)
+    await db[EMAIL_OUTBOX_COLLECTION].create_index(
+        "dedupe_key",
+        unique=True,
+        partialFilterExpression={"dedupe_key": {"$type": "string"}},
+    )
+
+
+async def enqueue_email(
+    db,
+    to: str,
+    subject: str,
+    body: Optional[str] = None,
+    kind: str = "generic",
+    html: Optional[str] = None,
+    context: Optional[dict] = None,
+    dedupe_key: Optional[str] = None,
+    **metadata,
+) -> Optional[str]:
+    """
+    Persist an e-mail for delivery by the outbox worker and return its id. Either a
+    ready body is given, or a template `kind` plus its `context` (rendered at send time).
+    A message whose `dedupe_key` was already queued is dropped and None is returned.
+    The current request id and trace context are stored with the message, so the
+    worker's delivery logs and span join the request that caused them.
+    """
+    now = _utcnow()
+    message_id = str(uuid.uuid4())
+    doc = {
+        "id": message_id,
+        "kind": kind,
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "html": html,
+        "context": context,
+        "status": STATUS_PENDING,
+        "attempts": 0,
+        "next_attempt_at": now,
+        "locked_until": None,
+        "last_error": None,
+        "created_at": now,
+        "sent_at": None,
+        "request_id": get_log_context().get("request_id"),
+        "trace_context": current_trace_context(),
+        **metadata,
+    }
+    if dedupe_key is not None:
+        doc["dedupe_key"] = dedupe_key
+    try:
+        await db[EMAIL_OUTBOX_COLLECTION].insert_one(doc)
+    except DuplicateKeyError:
+        if dedupe_key is None:
+            raise
+        return None
+    return message_id
+
+
+async def enqueue_template_email(db, kind: str, to: str, context: EmailContext, **metadata) -> Optional[str]:
+    """Queue a templated e-mail; rendering is left to the worker, off the request path"""
+    return await enqueue_email(
+        db,
+        to=to,
+        subject=TEMPLATES[kind].subject,
+        kind=kind,
+        context=context.to_document(),
+        **metadata,
+    )
+
+
+def build_message(outbox_doc: dict) -> EmailMessage:
+    subject, body, html = outbox_doc["subject"], outbox_doc.get("body"), outbox_doc.get("html")
+    if outbox_doc.get("context") is not None:
+        subject, body, html = render_email(outbox_doc["kind"], EmailContext(**outbox_doc["context"]))
+
+    message = EmailMessage()
+    message["From"] = EMAIL_FROM
+    message["To"] = outbox_doc["to"]
+    message["Subject"] = subject
+    message.set_content(body)
+    if html:
+        message.add_alternative(html, subtype="html")
+    return message
+
+
+def describe_error(exc: BaseException) -> str:
+    """The exception type, SMTP code(s) and server message, e-mail addresses redacted"""
+    refused = getattr(exc, "recipients", None)
+    if isinstance(refused, list):
+        detail = "; ".join(f"{getattr(item, 'code', '')} {getattr(item, 'message', '')}".strip() for item in refused)
+    elif hasattr(exc, "code") and hasattr(exc, "message"):
+        detail = f"{exc.code} {exc.message}"
+    else:
+        detail = str(exc)
+    detail = _ADDRESS_RE.sub("<redacted>", detail)
+    return f"{type(exc).__name__}: {detail}" if detail else type(exc).__name__
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base * 2^(attempts-1), capped"""
+    seconds = EMAIL_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, EMAIL_RETRY_MAX_SECONDS))
+
+
+class OutboxWorker:
+    """Claims outbox messages in batches and delivers them over one SMTP connection"""
+
+    def __init__(
+        self,
+        db,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        poll_interval: float = EMAIL_POLL_INTERVAL_SECONDS,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        hostname: str = EMAIL_HOST,
+        port: int = EMAIL_PORT,
+        start_tls: bool = EMAIL_START_TLS,
+        username: Optional[str] = EMAIL_USERNAME,
+        password: Optional[str] = EMAIL_PASSWORD,
+    ):
+        self.db = db
+        self.collection = db[EMAIL_OUTBOX_COLLECTION]
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.smtp_options = {
+            "hostname": hostname,
+            "port": port,
+            "start_tls": start_tls,
+            "username": username,
+            "password": password,
+        }
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self):
+        """Wake the worker early, e.g. right after a request enqueued a message"""
+        self._wakeup.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self.run(), name="email-outbox-worker")
+        return self._task
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                sent = await self.process_once()
+            except Exception:
+                logger.exception("Email outbox worker iteration failed")
+                sent = 0
+            if sent == 0 and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def process_once(self) -> int:
+        """Claim and deliver one batch; returns the number of messages handled"""
+        batch = await self.claim_batch()
+        if batch:
+            await self.deliver(batch)
+        return len(batch)
+
+    async def claim_batch(self):
+        now = _utcnow()
+        batch = []
+        for _ in range(self.batch_size):
+            doc = await self.collection.find_one_and_update(
+                {"$or": [
+                    {"status": STATUS_PENDING, "next_attempt_at": {"$lte": now}},
+                    # Egy összeomlott worker által lefoglalt, lejárt lease-ű üzenetek
+                    {"status": STATUS_SENDING, "locked_until": {"$lt": now}},
+                ]},
+                {"$set": {
+                    "status": STATUS_SENDING,
+                    "locked_until": now + timedelta(seconds=EMAIL_CLAIM_LEASE_SECONDS),
+                    "worker": self.worker_id,
+                }},
+                sort=[("next_attempt_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                break
+            batch.append(doc)
+        return batch
+
+    async def deliver(self, batch):
+        # Csak a worker használja, így az API indulásakor nem kell betölteni
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(**self.smtp_options)
+        try:
+            await smtp.connect()
+        except Exception as exc:
+            logger.warning(
+                "SMTP connection failed, %d message(s) will be retried: %s", len(batch), describe_error(exc)
+            )
+            for doc in batch:
+                await self._mark_failed(doc, exc)
+            return
+
+        try:
+            for index, doc in enumerate(batch):
+                log_token = set_log_context(request_id=doc.get("request_id"), email_id=doc["id"])
+                try:
+                    with span(
+                        "email.send",
+                        context=extract_trace_context(doc.get("trace_context")),
+                        **{"email.id": doc["id"], "email.kind": doc.get("kind", "")},
+                    ):
+                        await smtp.send_message(build_message(doc))
+                except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused) as exc:
+                    # Végleges elutasítás: felesleges újrapróbálni
+                    await self._mark_failed(doc, exc, permanent=True)
+                except aiosmtplib.SMTPServerDisconnected as exc:
+                    await self._mark_failed(doc, exc)
+                    try:
+                        await smtp.connect()
+                    except Exception as reconnect_exc:
+                        # A batch maradéka el sem indult: visszaadjuk, ne várjon a lease lejártáig
+                        unsent = batch[index + 1:]
+                        logger.warning(
+                            "SMTP reconnect failed, releasing %d unsent message(s): %s",
+                            len(unsent),
+                            describe_error(reconnect_exc),
+                        )
+                        await self._release(unsent)
+                        return
+                except Exception as exc:
+                    await self._mark_failed(doc, exc)
+                else:
+                    await self._mark_sent(doc)
+                finally:
+                    reset_log_context(log_token)
+        finally:
+            if smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except aiosmtplib.SMTPException:
+                    smtp.close()
+
+    async def _mark_sent(self, doc):
+        await self.collection.update_one(
+            {"id": doc["id"], "worker": self.worker_id},
+            {"$set": {"status": STATUS_SENT, "sent_at": _utcnow(), "locked_until": None},
+             "$inc": {"attempts": 1}},
+        )
+        logger.info("Email %s (%s) sent", doc["id"], doc.get("kind"))
+
+    async def _release(self, docs):
+        """Give claimed but unattempted messages back (no attempt is counted)"""
+        if not docs:
+            return
+        await self.collection.update_many(
+            {"id": {"$in": [doc["id"] for doc in docs]}, "worker": self.worker_id},
+            {"$set": {"status": STATUS_PENDING, "next_attempt_at": _utcnow(), "locked_until": None}},
+        )
+
+    async def _mark_failed(self, doc, exc, permanent: bool = False):
+        attempts = doc.get("attempts", 0) + 1
+        error = describe_error(exc)
+        update = {"attempts": attempts, "last_error": error, "locked_until": None}
+        if permanent or attempts >= self.max_attempts:
+            update["status"] = STATUS_DEAD
+            logger.error("Email %s dead-lettered after %d attempt(s): %s", doc["id"], attempts, error)
+        else:
+            update["status"] = STATUS_PENDING
+            update["next_attempt_at"] = _utcnow() + retry_delay(attempts)
+            logger.warning("Email %s failed (attempt %d), retrying: %s", doc["id"], attempts, error)
+        await self.collection.update_one({"id": doc["id"], "worker": self.worker_id}, {"$set": update})
+
+
+async def _main():
+    """Run the outbox worker as a standalone process (e.g. a separate Fly process group)"""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
+    configure_logging()
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    await ensure_outbox_indexes(db)
+    try:
+        await OutboxWorker(db).run()
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,87 @@
+"""
+Password hashing helpers.
+
+bcrypt is intentionally slow (a verify costs ~200-300 ms of CPU), so it must not run
+directly on the event loop: one login would stall every in-flight request on the
+worker. The async helpers below push the work to a small, bounded thread pool
+(the bcrypt C extension releases the GIL, so threads hash in parallel) and a
+semaphore caps how many hashes may be queued or running at once.
+
+Bulk provisioning (many accounts at once) uses a process pool instead, so a batch is
+hashed in parallel without touching the request workers' threads. The pool leaves at
+least one core free (BULK_HASH_PROCESSES, default cpu_count - 1) so request handling
+keeps CPU while a batch runs.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Egyszerre legfeljebb ennyi bcrypt futhat workerenként; a többi login aszinkron vár
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', PASSWORD_HASH_WORKERS * 4))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_semaphore = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+
+# Tömeges hash-eléshez: lusta process pool (csak első használatkor indul); egy mag mindig
+# a kérések kiszolgálásáé marad
+BULK_HASH_PROCESSES = int(os.environ.get('BULK_HASH_PROCESSES', max(1, (os.cpu_count() or 1) - 1)))
+_bulk_hash_pool = None
+
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+
+async def _run_in_hash_pool(fn, *args):
+    async with _hash_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, fn, *args)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password without blocking the event loop"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    """Hash a password without blocking the event loop"""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+def _get_bulk_hash_pool():
+    global _bulk_hash_pool
+    if _bulk_hash_pool is None:
+        # spawn: a gyerekfolyamat csak ezt a kis modult importálja, nem örökli a
+        # szülő szálait (motor executor, bcrypt pool)
+        _bulk_hash_pool = ProcessPoolExecutor(
+            max_workers=BULK_HASH_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _bulk_hash_pool
+
+
+async def hash_passwords_bulk(passwords):
+    """Hash many passwords in parallel in the process pool; order is preserved"""
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    pool = _get_bulk_hash_pool()
+    return await asyncio.gather(*(loop.run_in_executor(pool, get_password_hash, p) for p in passwords))
+
+
+def shutdown_hash_pool():
+    global _bulk_hash_pool
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+    if _bulk_hash_pool is not None:
+        _bulk_hash_pool.shutdown(wait=False, cancel_futures=True)
+        _bulk_hash_pool = None
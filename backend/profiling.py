@@ -0,0 +1,119 @@
+"""
+On-demand request profiling.
+
+Add `__profile=1` to the query string (or send an `X-Profile: 1` header) together with
+a valid barber bearer token, and instead of the normal response you get a sampling
+profile of that exact request, taken with pyinstrument in async mode (only the request's
+own task is sampled, not the other requests sharing the event loop):
+
+    __profile=1 / html    interactive HTML flame view (default)
+    __profile=collapsed   collapsed stacks ("a;b;c <microseconds>"), for flamegraph.pl
+                          or speedscope
+    __profile=text        plain-text call tree
+
+The handler's own status code is returned in X-Profiled-Status. Requests without a
+valid token are served normally, unprofiled. pyinstrument is imported only when a
+profile is actually requested.
+"""
+import os
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+
+PROFILE_QUERY_PARAM = "__profile"
+PROFILE_HEADER = b"x-profile"
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_SECONDS", 0.001))
+
+_FORMATS = {"1": "html", "true": "html", "html": "html", "collapsed": "collapsed", "text": "text"}
+
+
+def _requested_format(scope) -> Optional[str]:
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if PROFILE_QUERY_PARAM in query:
+        return _FORMATS.get(query[PROFILE_QUERY_PARAM][0].lower())
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            return _FORMATS.get(value.decode("latin-1").lower())
+    return None
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+
+def collapsed_stacks(root_frame) -> str:
+    """Render a pyinstrument frame tree as collapsed stacks, weighted in microseconds"""
+    lines = []
+
+    def walk(frame, path):
+        if frame.is_synthetic:
+            name = frame.function
+        else:
+            name = f"{frame.function} ({frame.file_path_short}:{frame.line_no})"
+        path = path + [name.replace(";", ":")]
+        self_time = frame.time - sum(child.time for child in frame.children)
+        if self_time > 0:
+            lines.append(f"{';'.join(path)} {int(self_time * 1_000_000)}")
+        for child in frame.children:
+            walk(child, path)
+
+    if root_frame is not None:
+        walk(root_frame, [])
+    return "\n".join(lines) + "\n"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, authorize: Callable[[str], bool]):
+        self.app = app
+        # Token -> jogosult-e (pl. érvényes barber access token, DB nélkül ellenőrizve)
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        report_format = _requested_format(scope)
+        token = _bearer_token(scope) if report_format else None
+        if report_format is None or token is None or not self.authorize(token):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        status_code = 500
+
+        async def discard_response(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard_response)
+        finally:
+            profiler.stop()
+
+        if report_format == "html":
+            body, media_type = profiler.output_html(), "text/html; charset=utf-8"
+        elif report_format == "collapsed":
+            body, media_type = collapsed_stacks(profiler.last_session.root_frame()), "text/plain; charset=utf-8"
+        else:
+            body, media_type = profiler.output_text(unicode=True, color=False), "text/plain; charset=utf-8"
+
+        payload = body.encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", media_type.encode("latin-1")),
+                (b"content-length", str(len(payload)).encode("latin-1")),
+                (b"cache-control", b"no-store"),
+                (b"x-profiled-status", str(status_code).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
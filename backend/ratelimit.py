@@ -0,0 +1,184 @@
+"""
+Per-client admission control: an in-process token-bucket rate limiter.
+
+Every request is charged to a bucket keyed by (client IP, route class). A bucket holds
+up to `burst` tokens and refills at `per_minute` tokens a minute; a request that finds
+it empty is answered with 429 and a Retry-After header (seconds until a token is back)
+without reaching the app, so one scraper hammering /available-dates cannot use up the
+machine's 25 connections (fly.toml hard_limit) and starve real customers.
+
+Route classes and their default limits (per worker process, see below):
+
+    availability   GET available-dates / available-slots / availability,   60/min, burst 30
+                   GET /booking/bootstrap
+    booking        POST /appointments, POST /contact                       10/min, burst 5
+    auth           POST /auth/login, /auth/refresh                         10/min, burst 10
+    reviews        GET /reviews (paid upstream API)                        30/min, burst 10
+    catalog        GET /barbers, /services and the per-barber lists       300/min, burst 100
+    default        everything else (barber dashboard, admin)              600/min, burst 200
+
+RATE_LIMITS overrides them, e.g. RATE_LIMITS="availability=120/40,catalog=600/200";
+RATE_LIMIT_ENABLED=0 turns the middleware into a pass-through. Probes, /metrics and CORS
+preflights are never limited.
+
+The client IP is Fly-Client-IP (set by the Fly proxy), else the last X-Forwarded-For
+hop (the one our own proxy appended; the earlier hops are client supplied), else the
+socket peer. Buckets live in an LRU of at most RATE_LIMIT_MAX_CLIENTS entries, so
+memory stays bounded however many addresses show up; an evicted client simply starts
+again with a full bucket. Each uvicorn worker keeps its own buckets, so a client spread
+over both workers can get up to twice the limit - fine for this purpose.
+
+Decisions are exported as rate_limit_requests_total{route_class, decision}.
+"""
+import math
+import os
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from jsonlog import PROBE_PATHS
+from metrics import RATE_LIMIT_REQUESTS, route_template
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", 10000))
+
+EXEMPT_PATHS = PROBE_PATHS | {"/metrics"}
+
+
+class Limit(NamedTuple):
+    per_minute: float
+    burst: int
+
+
+DEFAULT_LIMITS = {
+    "availability": Limit(60, 30),
+    "booking": Limit(10, 5),
+    "auth": Limit(10, 10),
+    "reviews": Limit(30, 10),
+    "catalog": Limit(300, 100),
+    "default": Limit(600, 200),
+}
+
+# (method, route template) -> osztály; ami nincs itt, az "default"
+ROUTE_CLASSES = {
+    ("GET", "/api/barbers/{barber_id}/available-dates"): "availability",
+    ("GET", "/api/barbers/{barber_id}/available-slots"): "availability",
+    ("GET", "/api/barbers/{barber_id}/availability"): "availability",
+    ("GET", "/api/booking/bootstrap"): "availability",
+    ("POST", "/api/appointments"): "booking",
+    ("POST", "/api/contact"): "booking",
+    ("POST", "/api/auth/login"): "auth",
+    ("POST", "/api/auth/refresh"): "auth",
+    ("GET", "/api/reviews"): "reviews",
+    ("GET", "/api/barbers"): "catalog",
+    ("GET", "/api/barbers/{barber_id}"): "catalog",
+    ("GET", "/api/services"): "catalog",
+    ("GET", "/api/barbers/{barber_id}/services"): "catalog",
+    ("GET", "/api/services/by-barber/{barber_id}"): "catalog",
+}
+
+
+def parse_limits(value: str) -> Dict[str, Limit]:
+    """RATE_LIMITS="class=per_minute/burst,..." on top of the defaults"""
+    limits = dict(DEFAULT_LIMITS)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route_class, _, spec = item.partition("=")
+        per_minute, _, burst = spec.partition("/")
+        limits[route_class.strip()] = Limit(float(per_minute), int(burst or per_minute))
+    return limits
+
+
+def client_ip(scope) -> str:
+    forwarded_for = None
+    for name, value in scope.get("headers", []):
+        if name == b"fly-client-ip":
+            return value.decode("latin-1").strip()
+        if name == b"x-forwarded-for":
+            forwarded_for = value.decode("latin-1")
+    if forwarded_for:
+        return forwarded_for.rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class TokenBuckets:
+    """Token buckets in an LRU; `take` returns 0 when admitted, else seconds to wait"""
+
+    def __init__(self, limits: Dict[str, Limit], max_clients: int = RATE_LIMIT_MAX_CLIENTS, clock=monotonic):
+        self.limits = limits
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()  # -> [tokens, updated_at]
+
+    def take(self, client: str, route_class: str) -> float:
+        limit = self.limits[route_class]
+        rate = limit.per_minute / 60.0
+        now = self.clock()
+        key = (client, route_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(limit.burst), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(limit.burst), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / rate if rate > 0 else math.inf
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+buckets = TokenBuckets(parse_limits(os.environ.get("RATE_LIMITS", "")))
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, token_buckets: Optional[TokenBuckets] = None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.buckets = token_buckets or buckets
+        self._classes: Dict[Tuple[str, str], str] = {}
+
+    def route_class(self, scope) -> str:
+        key = (scope["method"], route_template(scope["app"], scope))
+        route_class = self._classes.get(key)
+        if route_class is None:
+            route_class = ROUTE_CLASSES.get(key, "default")
+            if route_class not in self.buckets.limits:
+                route_class = "default"
+            self._classes[key] = route_class
+        return route_class
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.enabled
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.route_class(scope)
+        retry_after = self.buckets.take(client_ip(scope), route_class)
+        if retry_after:
+            RATE_LIMIT_REQUESTS.labels(route_class, "limited").inc()
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(min(retry_after, 3600))))},
+            )
+            await response(scope, receive, send)
+            return
+        RATE_LIMIT_REQUESTS.labels(route_class, "allowed").inc()
+        await self.app(scope, receive, send)
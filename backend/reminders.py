@@ -0,0 +1,217 @@
+"""
+Appointment reminder scheduler.
+
+Sends a day-before reminder (for tomorrow's appointments) and an hour-before reminder
+(for appointments starting within REMINDER_HOUR_BEFORE_MINUTES) for every `confirmed`
+appointment. Runs inside the app lifespan on every worker, but only the holder of the
+`scheduler_leases` lease does any work, so exactly one process per deployment scans.
+
+Scans only ever hit the (status, appointment_date, appointment_time) index - the query
+is hinted, so a missing index fails loudly instead of silently scanning the collection.
+Each reminder is enqueued to the e-mail outbox with a dedupe key and then marked on the
+appointment (`reminders.<kind>`); both steps are idempotent, so a crash between them or a
+lease hand-over can never produce a duplicate e-mail. An appointment whose reminder
+cannot be built (no e-mail address, malformed date...) is logged and marked under
+`reminder_failures.<kind>` instead, which also takes it out of the scan - otherwise,
+being first in date order, it would block every later reminder on every pass.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from email_templates import EmailContext
+from outbox import enqueue_template_email
+
+logger = logging.getLogger(__name__)
+
+LEASE_COLLECTION = "scheduler_leases"
+LEASE_NAME = "appointment-reminders"
+REMINDER_INDEX_NAME = "status_date_time"
+
+REMINDER_INTERVAL_SECONDS = float(os.getenv("REMINDER_INTERVAL_SECONDS", 60))
+REMINDER_LEASE_SECONDS = int(os.getenv("REMINDER_LEASE_SECONDS", 180))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", 100))
+REMINDER_HOUR_BEFORE_MINUTES = int(os.getenv("REMINDER_HOUR_BEFORE_MINUTES", 60))
+
+DAY_BEFORE = "day_before"
+HOUR_BEFORE = "hour_before"
+
+# Az _id is kell: egy hibás (akár id nélküli) dokumentumot is meg kell tudni jelölni
+REMINDER_PROJECTION = {
+    "id": 1,
+    "customer_name": 1,
+    "customer_email": 1,
+    "service_name": 1,
+    "barber_name": 1,
+    "appointment_date": 1,
+    "appointment_time": 1,
+    "duration": 1,
+    "price": 1,
+}
+
+
+async def ensure_reminder_indexes(db):
+    await db.appointments.create_index(
+        [("status", ASCENDING), ("appointment_date", ASCENDING), ("appointment_time", ASCENDING)],
+        name=REMINDER_INDEX_NAME,
+    )
+
+
+def window_filter(start: datetime, end: datetime) -> dict:
+    """
+    Filter for appointments starting in (start, end]. Dates and times are stored as
+    "YYYY-MM-DD" / "HH:MM:SS" strings, so range comparisons are lexicographic; a window
+    crossing midnight is split per day.
+    """
+    start_date, end_date = start.date().isoformat(), end.date().isoformat()
+    start_time, end_time = start.strftime("%H:%M:%S"), end.strftime("%H:%M:%S")
+    if start_date == end_date:
+        return {"appointment_date": start_date, "appointment_time": {"$gt": start_time, "$lte": end_time}}
+    return {"$or": [
+        {"appointment_date": start_date, "appointment_time": {"$gt": start_time}},
+        {"appointment_date": {"$gt": start_date, "$lt": end_date}},
+        {"appointment_date": end_date, "appointment_time": {"$lte": end_time}},
+    ]}
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        db,
+        now: Callable[[], datetime],
+        after_hours_label: Callable[[dict], str],
+        notify: Optional[Callable[[], None]] = None,
+        interval: float = REMINDER_INTERVAL_SECONDS,
+        batch_size: int = REMINDER_BATCH_SIZE,
+    ):
+        self.db = db
+        # Helyi (romániai) idő szerinti "most" - a foglalások is helyi időben vannak tárolva
+        self.now = now
+        self.after_hours_label = after_hours_label
+        self.notify = notify
+        self.interval = interval
+        self.batch_size = batch_size
+        self.holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.last_run_at: Optional[datetime] = None
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run(), name="appointment-reminders")
+        return self._task
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+        await self.release_lease()
+
+    async def run(self):
+        while not self._stopping.is_set():
+            try:
+                if await self.acquire_lease():
+                    await self.run_once()
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def acquire_lease(self) -> bool:
+        """Take or renew the lease; False if another process holds a live one"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db[LEASE_COLLECTION].find_one_and_update(
+                {"_id": LEASE_NAME, "$or": [{"holder": self.holder}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=REMINDER_LEASE_SECONDS)}},
+                upsert=True,
+            )
+            self.is_leader = True
+        except DuplicateKeyError:
+            # A lease dokumentum létezik és más tartja (az upsert ütközött)
+            self.is_leader = False
+        return self.is_leader
+
+    async def release_lease(self):
+        if self.is_leader:
+            await self.db[LEASE_COLLECTION].delete_one({"_id": LEASE_NAME, "holder": self.holder})
+            self.is_leader = False
+
+    async def run_once(self) -> int:
+        now = self.now()
+        tomorrow = (now + timedelta(days=1)).date().isoformat()
+        sent = await self._process(DAY_BEFORE, {"appointment_date": tomorrow})
+        sent += await self._process(
+            HOUR_BEFORE,
+            window_filter(now, now + timedelta(minutes=REMINDER_HOUR_BEFORE_MINUTES)),
+        )
+        self.last_run_at = datetime.now(timezone.utc)
+        return sent
+
+    async def _process(self, kind: str, date_filter: dict) -> int:
+        query = {
+            "status": "confirmed",
+            f"reminders.{kind}": {"$exists": False},
+            f"reminder_failures.{kind}": {"$exists": False},
+            **date_filter,
+        }
+        sent = 0
+        while True:
+            batch = await (
+                self.db.appointments.find(query, REMINDER_PROJECTION)
+                .hint(REMINDER_INDEX_NAME)
+                .sort([("appointment_date", ASCENDING), ("appointment_time", ASCENDING)])
+                .limit(self.batch_size)
+                .to_list(self.batch_size)
+            )
+            for appointment in batch:
+                try:
+                    await self._send(kind, appointment)
+                except Exception as exc:
+                    logger.exception(
+                        "Reminder could not be sent, skipping appointment",
+                        extra={"fields": {"appointment_id": appointment.get("id"), "kind": kind}},
+                    )
+                    await self._mark_failed(kind, appointment, exc)
+                    continue
+                sent += 1
+            if sent and self.notify is not None:
+                self.notify()
+            # A megjelölt foglalások kiesnek a szűrőből, így a következő kör a maradékot adja
+            if len(batch) < self.batch_size:
+                return sent
+
+    async def _send(self, kind: str, appointment: dict):
+        await enqueue_template_email(
+            self.db,
+            "reminder",
+            to=appointment["customer_email"],
+            context=EmailContext.from_appointment(
+                appointment,
+                after_hours_window=self.after_hours_label(appointment),
+                reminder=kind,
+            ),
+            appointment_id=appointment["id"],
+            dedupe_key=f"reminder:{kind}:{appointment['id']}",
+        )
+        await self.db.appointments.update_one(
+            {"id": appointment["id"]},
+            {"$set": {f"reminders.{kind}": datetime.now(timezone.utc)}},
+        )
+
+    async def _mark_failed(self, kind: str, appointment: dict, exc: Exception):
+        await self.db.appointments.update_one(
+            {"_id": appointment["_id"]},
+            {"$set": {f"reminder_failures.{kind}": {
+                "at": datetime.now(timezone.utc),
+                "error": f"{type(exc).__name__}: {exc}"[:500],
+            }}},
+        )
@@ -10,14 +10,47 @@ from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, date, time, timedelta
 import pytz
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi import Depends, HTTPException, status, BackgroundTasks
-import aiosmtplib
-from email.message import EmailMessage
-import httpx
+from fastapi import Depends, HTTPException, status, Request, Response
+import asyncio
 import calendar as calendar_module
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from time import monotonic
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# A saját modulok a fenti .env betöltése után importálódnak, mert importkor olvassák a beállításaikat
+from passwords import (  # noqa: E402
+    hash_passwords_bulk,
+    verify_password_async,
+    get_password_hash_async,
+    shutdown_hash_pool,
+)
+from outbox import OutboxWorker, enqueue_template_email, ensure_outbox_indexes  # noqa: E402
+from email_templates import EmailContext  # noqa: E402
+from reminders import ReminderScheduler, ensure_reminder_indexes  # noqa: E402
+import metrics  # noqa: E402
+import dbstats  # noqa: E402
+from profiling import ProfilingMiddleware  # noqa: E402
+from jsonlog import RequestLoggingMiddleware, bind_log_context, configure_logging  # noqa: E402
+import tracing  # noqa: E402
+import health  # noqa: E402
+from compression import CompressionMiddleware  # noqa: E402
+import etags  # noqa: E402
+import singleflight  # noqa: E402
+from ratelimit import RateLimitMiddleware  # noqa: E402
+from loadshed import LoadSheddingMiddleware, loop_lag_monitor  # noqa: E402
+from tracing import traced  # noqa: E402
+from fastjson import DocumentDecoder, FastJSONResponse  # noqa: E402
+
+# Strukturált (JSON) naplózás, LOG_FORMAT=text esetén olvasható szöveges formátum
+configure_logging()
+logger = logging.getLogger(__name__)
+# Tracing (TRACE_EXPORTER=file|otlp) - a @traced dekorátorok előtt kell beállítani
+tracing.configure_tracing()
 
 # Romanian timezone
 ROMANIAN_TZ = pytz.timezone('Europe/Bucharest')
@@ -54,6 +87,13 @@ def get_after_hours_window(weekday: int):
         return time(13, 0), time(15, 0)
     return None
 
+def format_after_hours_window(appointment_date: date) -> str:
+    """Az ablak "HH:MM-HH:MM" formában (az e-mailekhez)"""
+    window = get_after_hours_window(appointment_date.weekday())
+    if window is None:
+        return ""
+    return f"{window[0].strftime('%H:%M')}-{window[1].strftime('%H:%M')}"
+
 def is_after_hours_time(appointment_date: date, t: time) -> bool:
     window = get_after_hours_window(appointment_date.weekday())
     if window is None:
@@ -61,29 +101,37 @@ def is_after_hours_time(appointment_date: date, t: time) -> bool:
     window_start, window_end = window
     return window_start <= t < window_end
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
-# MongoDB connection
+# MongoDB connection - a kliens a lifespan-ben jön létre, így az import nem végez hálózati
+# műveletet (pl. mongodb+srv feloldást); a tesztek / load test által beállított db megmarad
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+client: Optional[AsyncIOMotorClient] = None
+db = None
 
 # Authentication setup
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-for-jwt-tokens-change-in-production')
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 4320  # 8 hours
+# Rövid életű access token (claim-ekkel, DB nélkül ellenőrizhető) + hosszú életű refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', 15))
+REFRESH_TOKEN_EXPIRE_MINUTES = int(os.environ.get('REFRESH_TOKEN_EXPIRE_MINUTES', 4320))  # 3 days
+BARBER_ROLE = "barber"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_background_workers()
+    try:
+        yield
+    finally:
+        await shutdown_background_workers()
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # === TEMPORARY EXPORT ROUTE (for migration) ===
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 import os
 
 export_router = APIRouter()
@@ -94,11 +142,18 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_PLACE_ID = os.getenv("GOOGLE_PLACE_ID")
 
 # Use separate variables for sync export client to avoid overwriting async client
-export_client = MongoClient(MONGO_URL)
-export_db = export_client[DB_NAME]
+export_client: Optional[MongoClient] = None
+
+def get_export_db():
+    """A szinkron export kliens csak az első export kéréskor jön létre"""
+    global export_client
+    if export_client is None:
+        export_client = MongoClient(MONGO_URL, event_listeners=[dbstats.command_listener])
+    return export_client[DB_NAME]
 
 @export_router.get("/__export_db")
 def export_database():
+    export_db = get_export_db()
     data = {}
     for collection_name in export_db.list_collection_names():
         documents = list(export_db[collection_name].find({}, {"_id": 0}))
@@ -112,12 +167,6 @@ app.include_router(export_router)
 api_router = APIRouter(prefix="/api")
 
 # Authentication helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -128,24 +177,171 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_barber(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    credentials_exception = HTTPException(
+def create_token_pair(
+    barber_id: str,
+    barber_name: str,
+    auth_id: str,
+    token_version: int = 0,
+    session_id: Optional[str] = None,
+    refresh_jti: Optional[str] = None,
+):
+    """
+    Issue an access token carrying the identity claims the protected endpoints need
+    (so they can authorize without a DB lookup) and a refresh token for renewing it.
+    The refresh token names its login session (`sid`) and its own id (`jti`), which
+    must match the session's current one when it is redeemed (see refresh_sessions).
+    """
+    access_token = create_access_token(data={
+        "sub": barber_id,
+        "name": barber_name,
+        "role": BARBER_ROLE,
+        "tv": token_version,
+        "type": "access",
+    })
+    refresh_token = create_access_token(
+        data={
+            "sub": barber_id,
+            "aid": auth_id,
+            "tv": token_version,
+            "type": "refresh",
+            "sid": session_id,
+            "jti": refresh_jti or str(uuid.uuid4()),
+        },
+        expires_delta=timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES),
+    )
+    return access_token, refresh_token
+
+class TTLCache:
+    """
+    Kis méretű, folyamaton belüli TTL + LRU cache.
+    Minden bejegyzésnek saját lejárata van; a legrégebben használt elemek esnek ki,
+    ha a cache megtelik.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard_where(self, predicate):
+        for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+# Token -> barber dokumentum cache, hogy az authentikált végpontok ne menjenek
+# minden kérésnél a DB-hez. Worker-enként külön él, ezért a TTL rövid: egy másik
+# workeren történt módosítás legfeljebb ennyi ideig lehet elavult.
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', 60))
+AUTH_CACHE_MAXSIZE = int(os.environ.get('AUTH_CACHE_MAXSIZE', 1024))
+_barber_token_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+# A legfrissebb token verzió barberenként (barber_auth.token_version, a logout növeli).
+# Cache hiány esetén a DB-ből töltjük, így egy másik workeren történt logout legfeljebb
+# AUTH_CACHE_TTL_SECONDS múlva itt is érvényes; a saját workeren azonnal.
+_token_versions = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_barber_cache(barber_id: Optional[str] = None):
+    """Drop cached identities for one barber (or all of them) after a barber write"""
+    if barber_id is None:
+        _barber_token_cache.clear()
+    else:
+        _barber_token_cache.discard_where(lambda barber: barber.get("id") == barber_id)
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """
+    Decode and verify a JWT. Tokens issued before typed tokens existed carry no
+    "type" claim and are accepted as access tokens.
+    """
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        barber_id: str = payload.get("sub")
-        if barber_id is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None or payload.get("type", "access") != token_type:
+        raise _credentials_exception()
+    known_version = _token_versions.get(payload["sub"])
+    if known_version is not None and payload.get("tv", 0) < known_version:
+        raise _credentials_exception()
+    bind_log_context(barber_id=payload["sub"])
+    return payload
+
+async def _require_current_token_version(payload: dict):
+    """Reject tokens issued before the barber's last logout, loading the version on a cache miss"""
+    barber_id = payload["sub"]
+    known_version = _token_versions.get(barber_id)
+    if known_version is None:
+        barber_auth = await db.barber_auth.find_one(
+            {"barber_id": barber_id}, {"_id": 0, "token_version": 1}, sort=[("token_version", -1)]
+        )
+        known_version = (barber_auth or {}).get("token_version", 0)
+        _token_versions.set(barber_id, known_version)
+    if payload.get("tv", 0) < known_version:
+        raise _credentials_exception()
+
+async def get_current_claims(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Stateless identity for read-only endpoints: built from the token claims alone,
+    without touching Mongo. Legacy tokens without claims fall back to the DB lookup.
+    """
+    payload = decode_token(credentials.credentials)
+    await _require_current_token_version(payload)
+    if "name" not in payload:
+        barber = await get_current_barber(credentials)
+        return {"id": barber["id"], "name": barber["name"], "role": BARBER_ROLE, "token_version": 0}
+    return {
+        "id": payload["sub"],
+        "name": payload["name"],
+        "role": payload.get("role", BARBER_ROLE),
+        "token_version": payload.get("tv", 0),
+    }
+
+async def get_current_barber(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    cached = _barber_token_cache.get(token)
+    if cached is not None:
+        # A decode_token kimarad, így a log kontextust itt kell beállítani
+        bind_log_context(barber_id=cached["id"])
+        return cached
+
+    payload = decode_token(token)
+    await _require_current_token_version(payload)
+    barber_id: str = payload["sub"]
     
     barber = await db.barbers.find_one({"id": barber_id}, {"_id": 0})
     if barber is None:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    # A cache bejegyzés sosem élhet tovább, mint maga a token
+    remaining = payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+    _barber_token_cache.set(token, barber, ttl=remaining)
     return barber
 
 # Helper functions for MongoDB serialization
@@ -282,11 +478,23 @@ class BarberAuthCreate(BaseModel):
     email: EmailStr
     password: str
 
+class BarberAuthPublic(BaseModel):
+    """A barber account as returned by the API - never with the password hash"""
+    id: str
+    barber_id: str
+    email: EmailStr
+    is_active: bool = True
+
 class Token(BaseModel):
     access_token: str
     token_type: str
     barber_id: str
     barber_name: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class BarberBreak(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -350,6 +558,29 @@ class ContactMessageCreate(BaseModel):
     email: EmailStr
     message: str
 
+# Tárolt dokumentumok -> válasz, pydantic validáció nélkül (a lista végpontok gyors útja, lásd fastjson.py)
+decode_barber = DocumentDecoder(Barber)
+decode_service = DocumentDecoder(Service)
+decode_appointment = DocumentDecoder(Appointment)
+decode_contact_message = DocumentDecoder(ContactMessage)
+
+async def _conditional_get(request: Request, scopes, *parts):
+    """
+    A válasz ETag-je a scope-ok adatverzióiból (+ a query és a megadott részek);
+    (etag, 304 válasz) ha a kliens példánya még friss, különben (etag, None).
+    """
+    versions = await etags.versions.current(db, scopes)
+    etag = etags.make_etag(versions, request.url.path, request.url.query, *parts)
+    if etags.matches(request.headers.get("if-none-match"), etag):
+        return etag, etags.not_modified(etag)
+    return etag, None
+
+def _availability_time_part(date_from: date, date_to: date, now: datetime) -> str:
+    """A mai nap slotjai percenként "múltba csúsznak", a jövőbeli napok csak a dátumváltással"""
+    if date_from <= now.date() <= date_to:
+        return now.strftime("%Y-%m-%dT%H:%M")
+    return now.date().isoformat()
+
 # Routes
 @api_router.get("/")
 async def root():
@@ -360,7 +591,7 @@ async def root():
 async def login_barber(barber_login: BarberLogin):
     # Find barber auth by email
     barber_auth = await db.barber_auth.find_one({"email": barber_login.email}, {"_id": 0})
-    if not barber_auth or not verify_password(barber_login.password, barber_auth["password_hash"]):
+    if not barber_auth or not await verify_password_async(barber_login.password, barber_auth["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -372,14 +603,104 @@ async def login_barber(barber_login: BarberLogin):
     if not barber:
         raise HTTPException(status_code=404, detail="Barber not found")
     
-    access_token = create_access_token(data={"sub": barber_auth["barber_id"]})
+    return await _start_session(barber_auth, barber)
+
+REFRESH_SESSIONS_COLLECTION = "refresh_sessions"
+
+async def ensure_auth_indexes(database):
+    """Refresh sessions: looked up by id, dropped by Mongo once their last refresh token expired"""
+    await database[REFRESH_SESSIONS_COLLECTION].create_index("id", unique=True)
+    await database[REFRESH_SESSIONS_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+
+def _refresh_expires_at() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
+
+async def _start_session(barber_auth: dict, barber: dict):
+    """
+    A login opens a refresh session holding the id (jti) of the only refresh token that
+    may be redeemed next; every refresh rotates it (see refresh_access_token).
+    """
+    session_id, refresh_jti = str(uuid.uuid4()), str(uuid.uuid4())
+    await db[REFRESH_SESSIONS_COLLECTION].insert_one({
+        "id": session_id,
+        "barber_id": barber_auth["barber_id"],
+        "auth_id": barber_auth["id"],
+        "jti": refresh_jti,
+        "expires_at": _refresh_expires_at(),
+    })
+    _token_versions.set(barber_auth["barber_id"], barber_auth.get("token_version", 0))
+    return _token_response(barber_auth, barber, session_id, refresh_jti)
+
+def _token_response(barber_auth: dict, barber: dict, session_id: str, refresh_jti: str):
+    access_token, refresh_token = create_token_pair(
+        barber_auth["barber_id"],
+        barber["name"],
+        barber_auth["id"],
+        barber_auth.get("token_version", 0),
+        session_id=session_id,
+        refresh_jti=refresh_jti,
+    )
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "barber_id": barber_auth["barber_id"],
-        "barber_name": barber["name"]
+        "barber_name": barber["name"],
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
     }
 
+@api_router.post("/auth/refresh", response_model=Token)
+async def refresh_access_token(refresh_data: RefreshRequest):
+    """
+    Exchange a valid refresh token for a new access/refresh token pair. Refresh tokens
+    are single use: redeeming one rotates its session to the new token's jti, and
+    presenting an already redeemed one (a replay - the token was copied) revokes the
+    whole session, so neither the thief nor the owner can keep refreshing with it.
+    Tokens issued before sessions existed carry no `sid` and are rejected.
+    """
+    payload = decode_token(refresh_data.refresh_token, token_type="refresh")
+    barber_id = payload["sub"]
+    session_id = payload.get("sid")
+    if not session_id:
+        raise _credentials_exception()
+
+    barber_auth = await db.barber_auth.find_one({"id": payload.get("aid"), "barber_id": barber_id}, {"_id": 0})
+    if not barber_auth or not barber_auth.get("is_active", True):
+        raise _credentials_exception()
+    # Token verzió ellenőrzés: logout után a régi refresh tokenek érvénytelenek
+    current_version = barber_auth.get("token_version", 0)
+    _token_versions.set(barber_id, current_version)
+    if payload.get("tv", 0) != current_version:
+        raise _credentials_exception()
+
+    # Atomikus csere: egy refresh tokent csak egyszer lehet beváltani
+    refresh_jti = str(uuid.uuid4())
+    session = await db[REFRESH_SESSIONS_COLLECTION].find_one_and_update(
+        {"id": session_id, "barber_id": barber_id, "jti": payload.get("jti")},
+        {"$set": {"jti": refresh_jti, "expires_at": _refresh_expires_at()}},
+        projection={"_id": 0, "id": 1},
+    )
+    if session is None:
+        await db[REFRESH_SESSIONS_COLLECTION].delete_one({"id": session_id, "barber_id": barber_id})
+        logger.warning("Refresh token replayed, session revoked", extra={"fields": {"session_id": session_id}})
+        raise _credentials_exception()
+
+    barber = await db.barbers.find_one({"id": barber_id}, {"_id": 0})
+    if not barber:
+        raise _credentials_exception()
+
+    return _token_response(barber_auth, barber, session_id, refresh_jti)
+
+@api_router.post("/auth/logout")
+async def logout_barber(current_barber: dict = Depends(get_current_claims)):
+    """Revoke every token issued to the barber so far by bumping their token version"""
+    barber_id = current_barber["id"]
+    await db.barber_auth.update_many({"barber_id": barber_id}, {"$inc": {"token_version": 1}})
+    await db[REFRESH_SESSIONS_COLLECTION].delete_many({"barber_id": barber_id})
+    _token_versions.set(barber_id, current_barber["token_version"] + 1)
+    invalidate_barber_cache(barber_id)
+    return {"message": "Logged out successfully"}
+
 @api_router.post("/auth/create", response_model=BarberAuth)
 async def create_barber_auth(barber_auth_data: BarberAuthCreate):
     # Check if email already exists
@@ -392,7 +713,7 @@ async def create_barber_auth(barber_auth_data: BarberAuthCreate):
     if not barber:
         raise HTTPException(status_code=404, detail="Barber not found")
     
-    hashed_password = get_password_hash(barber_auth_data.password)
+    hashed_password = await get_password_hash_async(barber_auth_data.password)
     auth_dict = barber_auth_data.model_dump()
     auth_dict["password_hash"] = hashed_password
     del auth_dict["password"]
@@ -402,11 +723,64 @@ async def create_barber_auth(barber_auth_data: BarberAuthCreate):
     await db.barber_auth.insert_one(doc)
     return auth_obj
 
+# Egy kérés legfeljebb ennyi bcrypt hash-t indíthat (mindegyik ~250 ms CPU)
+BULK_CREATE_MAX_ACCOUNTS = int(os.environ.get('BULK_CREATE_MAX_ACCOUNTS', 50))
+
+@api_router.post("/auth/bulk-create", response_model=List[BarberAuthPublic])
+async def bulk_create_barber_auth(accounts: List[BarberAuthCreate], current_barber: dict = Depends(get_current_barber)):
+    """
+    Create many barber accounts at once (new salon staff, test environment reseed).
+    Only an authenticated barber may call it, with at most BULK_CREATE_MAX_ACCOUNTS
+    accounts per request. Passwords are hashed in parallel in a process pool and the
+    accounts are inserted with a single insert_many; nothing is written if any account
+    is invalid. The response lists the new accounts without their password hashes.
+    """
+    if not accounts:
+        return []
+    if len(accounts) > BULK_CREATE_MAX_ACCOUNTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BULK_CREATE_MAX_ACCOUNTS} accounts per request",
+        )
+
+    emails = [account.email for account in accounts]
+    duplicates = sorted({email for email in emails if emails.count(email) > 1})
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate emails in request: {duplicates}")
+
+    existing = await db.barber_auth.find({"email": {"$in": emails}}, {"_id": 0, "email": 1}).to_list(len(emails))
+    if existing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Email already registered: {sorted(e['email'] for e in existing)}"
+        )
+
+    barber_ids = list({account.barber_id for account in accounts})
+    barbers = await db.barbers.find({"id": {"$in": barber_ids}}, {"_id": 0, "id": 1}).to_list(len(barber_ids))
+    missing = sorted(set(barber_ids) - {b["id"] for b in barbers})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Barber not found: {missing}")
+
+    hashed_passwords = await hash_passwords_bulk([account.password for account in accounts])
+
+    auth_objs = []
+    for account, hashed_password in zip(accounts, hashed_passwords):
+        auth_dict = account.model_dump()
+        auth_dict["password_hash"] = hashed_password
+        del auth_dict["password"]
+        auth_objs.append(BarberAuth(**auth_dict))
+
+    await db.barber_auth.insert_many([auth_obj.model_dump() for auth_obj in auth_objs])
+    return [BarberAuthPublic(**auth_obj.model_dump(exclude={"password_hash"})) for auth_obj in auth_objs]
+
 # Barbers endpoints
 @api_router.get("/barbers", response_model=List[Barber])
-async def get_barbers():
-    barbers = await db.barbers.find({}, {"_id": 0}).to_list(1000)
-    return barbers
+async def get_barbers(request: Request):
+    etag, not_modified = await _conditional_get(request, [etags.CATALOG])
+    if not_modified:
+        return not_modified
+    barbers = await db.barbers.find({}, decode_barber.projection).to_list(1000)
+    return FastJSONResponse([decode_barber(barber) for barber in barbers], headers=etags.etag_headers(etag))
 
 @api_router.post("/barbers", response_model=Barber)
 async def create_barber(barber_data: BarberCreate):
@@ -415,6 +789,8 @@ async def create_barber(barber_data: BarberCreate):
     
     doc = barber_obj.model_dump()
     _ = await db.barbers.insert_one(doc)
+    await etags.versions.bump(db, etags.CATALOG)
+    invalidate_barber_cache(barber_obj.id)
     return barber_obj
 
 @api_router.get("/barbers/{barber_id}", response_model=Barber)
@@ -426,9 +802,12 @@ async def get_barber(barber_id: str):
 
 # Services endpoints
 @api_router.get("/services", response_model=List[Service])
-async def get_services():
-    services = await db.services.find({}, {"_id": 0}).to_list(1000)
-    return services
+async def get_services(request: Request):
+    etag, not_modified = await _conditional_get(request, [etags.CATALOG])
+    if not_modified:
+        return not_modified
+    services = await db.services.find({}, decode_service.projection).to_list(1000)
+    return FastJSONResponse([decode_service(service) for service in services], headers=etags.etag_headers(etag))
 
 @api_router.post("/services", response_model=Service)
 async def create_service(service_data: ServiceCreate):
@@ -437,14 +816,25 @@ async def create_service(service_data: ServiceCreate):
     
     doc = service_obj.model_dump()
     _ = await db.services.insert_one(doc)
+    await etags.versions.bump(db, etags.CATALOG)
     return service_obj
 
 # Barber Services endpoints
 @api_router.get("/barbers/{barber_id}/services", response_model=List[BarberServiceWithDetails])
-async def get_barber_services(barber_id: str):
-    # Get barber services with service details
+async def get_barber_services(barber_id: str, request: Request, response: Response):
+    etag, not_modified = await _conditional_get(request, [etags.CATALOG])
+    if not_modified:
+        return not_modified
+    response.headers.update(etags.etag_headers(etag))
+    return await _barber_services_with_details(barber_id)
+
+async def _barber_services_with_details(barber_id: Optional[str] = None):
+    # Get barber services with service details (barber_id nélkül: minden barberé)
+    match = {"is_available": True}
+    if barber_id is not None:
+        match["barber_id"] = barber_id
     pipeline = [
-        {"$match": {"barber_id": barber_id, "is_available": True}},
+        {"$match": match},
         {"$lookup": {
             "from": "services",
             "localField": "service_id", 
@@ -480,12 +870,13 @@ async def create_barber_service(barber_service_data: BarberServiceCreate):
     
     doc = barber_service_obj.model_dump()
     _ = await db.barber_services.insert_one(doc)
+    await etags.versions.bump(db, etags.CATALOG)
     return barber_service_obj
 
 @api_router.get("/services/by-barber/{barber_id}")
-async def get_services_by_barber(barber_id: str):
+async def get_services_by_barber(barber_id: str, request: Request, response: Response):
     """Get all services offered by a specific barber with their pricing"""
-    return await get_barber_services(barber_id)
+    return await get_barber_services(barber_id, request, response)
 
 # Break management endpoints
 @api_router.get("/barbers/{barber_id}/breaks", response_model=List[BarberBreak])
@@ -523,6 +914,7 @@ async def create_barber_break(break_data: BarberBreakCreate, current_barber: dic
     doc['created_at'] = doc['created_at'].isoformat()
     
     await db.barber_breaks.insert_one(doc)
+    await etags.versions.bump(db, etags.availability_scope(break_obj.barber_id))
     return break_obj
 
 @api_router.delete("/breaks/{break_id}")
@@ -538,103 +930,89 @@ async def delete_barber_break(break_id: str, current_barber: dict = Depends(get_
     result = await db.barber_breaks.delete_one({"id": break_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Break not found")
+    await etags.versions.bump(db, etags.availability_scope(break_item["barber_id"]))
     
     return {"message": "Break deleted successfully"}
 
 # Availability checking
-@api_router.get("/barbers/{barber_id}/availability")
-async def check_barber_availability(barber_id: str, date: str, start_time: str, duration: int):
-    """Check if a barber is available at a specific date and time"""
-    appointment_date = date
-    start_time_obj = datetime.strptime(start_time, '%H:%M').time()
-    
-    # Check if the slot is in the past (Romanian timezone)
-    appointment_datetime = datetime.fromisoformat(f"{date}T{start_time}:00")
-    romanian_now = get_romanian_now()
-    
-    # If appointment is today, check if time has passed
-    if date == get_romanian_today().isoformat():
-        appointment_datetime_ro = ROMANIAN_TZ.localize(appointment_datetime)
-        if appointment_datetime_ro <= romanian_now:
-            return {"available": False, "reason": "Time slot is in the past"}
-    
-    # Calculate end time
-    start_datetime = datetime.combine(datetime.fromisoformat(date).date(), start_time_obj)
-    end_datetime = start_datetime + timedelta(minutes=duration)
-    end_time_obj = end_datetime.time()
-    
-    # Check for existing appointments
-    existing_appointments = await db.appointments.find({
+ACTIVE_APPOINTMENT_STATUSES = ["confirmed", "pending"]
+_SLOT_APPOINTMENT_PROJECTION = {"_id": 0, "appointment_date": 1, "appointment_time": 1, "duration": 1}
+_SLOT_BREAK_PROJECTION = {"_id": 0, "break_date": 1, "start_time": 1, "end_time": 1, "title": 1}
+
+@traced("availability.fetch_bookings")
+async def fetch_barber_bookings(barber_id: str, date_from: str, date_to: Optional[str] = None):
+    """
+    Egy barber aktív foglalásai és szünetei egy napra vagy napok tartományára, napokra
+    bontva - tartománytól függetlenül pontosan 2 lekérdezéssel (a slot-számítás innen
+    dolgozik, nem slotonként / naponként kérdez le).
+    """
+    date_range = {"$gte": date_from, "$lte": date_to or date_from}
+    appointments = await db.appointments.find({
         "barber_id": barber_id,
-        "appointment_date": appointment_date,
-        "status": {"$in": ["confirmed", "pending"]}
-    }, {"_id": 0}).to_list(1000)
-    
-    # Check for breaks
-    existing_breaks = await db.barber_breaks.find({
+        "appointment_date": date_range,
+        "status": {"$in": ACTIVE_APPOINTMENT_STATUSES}
+    }, _SLOT_APPOINTMENT_PROJECTION).to_list(None)
+    breaks = await db.barber_breaks.find({
         "barber_id": barber_id,
-        "break_date": appointment_date
-    }, {"_id": 0}).to_list(1000)
-    
-    # Check time conflicts
-    for appointment in existing_appointments:
+        "break_date": date_range
+    }, _SLOT_BREAK_PROJECTION).to_list(None)
+
+    appointments_by_date, breaks_by_date = {}, {}
+    for appointment in appointments:
+        appointments_by_date.setdefault(appointment["appointment_date"], []).append(appointment)
+    for break_item in breaks:
+        breaks_by_date.setdefault(break_item["break_date"], []).append(break_item)
+    return appointments_by_date, breaks_by_date
+
+def _busy_periods(date_obj: date, appointments: list, breaks: list):
+    """(start, end, reason) a nap foglalásaiból és szüneteiből - előbb a foglalások, aztán a szünetek"""
+    periods = []
+    for appointment in appointments:
         appt_start = datetime.strptime(appointment["appointment_time"][:5], '%H:%M').time()
         # Use actual duration from appointment, fallback to 45 if not set
         appt_duration = appointment.get("duration", 45)
-        appt_end_datetime = datetime.combine(datetime.fromisoformat(date).date(), appt_start) + timedelta(minutes=appt_duration)
-        appt_end = appt_end_datetime.time()
-        
-        if (start_time_obj < appt_end and end_time_obj > appt_start):
-            return {"available": False, "reason": "Time slot conflicts with existing appointment"}
-    
-    for break_item in existing_breaks:
+        appt_end = (datetime.combine(date_obj, appt_start) + timedelta(minutes=appt_duration)).time()
+        periods.append((appt_start, appt_end, "Time slot conflicts with existing appointment"))
+    for break_item in breaks:
         break_start = datetime.strptime(break_item["start_time"][:5], '%H:%M').time()
         break_end = datetime.strptime(break_item["end_time"][:5], '%H:%M').time()
-        
-        if (start_time_obj < break_end and end_time_obj > break_start):
-            return {"available": False, "reason": f"Time slot conflicts with break: {break_item['title']}"}
-    
+        periods.append((break_start, break_end, f"Time slot conflicts with break: {break_item['title']}"))
+    return periods
+
+def _is_past(date_obj: date, start: time, now: datetime) -> bool:
+    """Mai napon a már elmúlt időpont (romániai idő szerint)"""
+    if date_obj != now.date():
+        return False
+    return ROMANIAN_TZ.localize(datetime.combine(date_obj, start)) <= now
+
+def slot_availability(date_obj: date, start: time, duration: int, busy_periods: list, now: datetime) -> dict:
+    """Egy slot szabad-e - tiszta függvény, a nap foglaltságai már előre ki vannak számolva"""
+    if _is_past(date_obj, start, now):
+        return {"available": False, "reason": "Time slot is in the past"}
+
+    end = (datetime.combine(date_obj, start) + timedelta(minutes=duration)).time()
+    for busy_start, busy_end, reason in busy_periods:
+        if start < busy_end and end > busy_start:
+            return {"available": False, "reason": reason}
     return {"available": True, "reason": "Time slot available"}
 
-async def get_next_after_hours_slot(barber_id: str, date: str, duration: int):
+def next_after_hours_slot(date_obj: date, duration: int, busy_periods: list, now: datetime):
     """
     A program utáni ablakban (napi bontásban: hétköznap 19:00-21:00, szombaton 13:00-15:00)
     csak a legkorábbi szabad, hézag nélküli időpontot adja vissza - nem szabad tetszőleges
     később kezdődő időpontot választani, hogy a fodrász ne várjon feleslegesen.
     """
-    date_obj = datetime.fromisoformat(date).date()
     window = get_after_hours_window(date_obj.weekday())
     if window is None:
         return None
     window_start, window_end = window
 
-    existing_appointments = await db.appointments.find({
-        "barber_id": barber_id,
-        "appointment_date": date,
-        "status": {"$in": ["confirmed", "pending"]}
-    }, {"_id": 0}).to_list(1000)
-
-    existing_breaks = await db.barber_breaks.find({
-        "barber_id": barber_id,
-        "break_date": date
-    }, {"_id": 0}).to_list(1000)
-
-    # Az after-hours ablakkal ütköző foglaltságok (foglalás + szünet) összegyűjtése, rendezve
-    busy_intervals = []
-    for appointment in existing_appointments:
-        appt_start = datetime.strptime(appointment["appointment_time"][:5], '%H:%M').time()
-        appt_duration = appointment.get("duration", 45)
-        appt_end = (datetime.combine(date_obj, appt_start) + timedelta(minutes=appt_duration)).time()
-        if appt_start < window_end and appt_end > window_start:
-            busy_intervals.append((max(appt_start, window_start), min(appt_end, window_end)))
-
-    for break_item in existing_breaks:
-        break_start = datetime.strptime(break_item["start_time"][:5], '%H:%M').time()
-        break_end = datetime.strptime(break_item["end_time"][:5], '%H:%M').time()
-        if break_start < window_end and break_end > window_start:
-            busy_intervals.append((max(break_start, window_start), min(break_end, window_end)))
-
-    busy_intervals.sort(key=lambda iv: iv[0])
+    # Az after-hours ablakkal ütköző foglaltságok (foglalás + szünet), rendezve
+    busy_intervals = sorted(
+        (max(busy_start, window_start), min(busy_end, window_end))
+        for busy_start, busy_end, _ in busy_periods
+        if busy_start < window_end and busy_end > window_start
+    )
 
     # Sorban végigmegyünk a foglaltságokon, és megkeressük az első hézag nélküli szabad helyet
     candidate = window_start
@@ -650,26 +1028,16 @@ async def get_next_after_hours_slot(barber_id: str, date: str, duration: int):
         return None  # nincs több hely az ablakban
 
     # Ha a nap már elmúlt (mai napra), ne kínáljuk fel a múltbeli időpontot
-    if date == get_romanian_today().isoformat():
-        candidate_dt = ROMANIAN_TZ.localize(datetime.combine(date_obj, candidate))
-        if candidate_dt <= get_romanian_now():
-            return None
+    if _is_past(date_obj, candidate, now):
+        return None
 
     return candidate
 
-async def _compute_slots_for_date(barber_id: str, date: str, service_id: str):
+def compute_day_slots(service_id: str, duration: int, date_obj: date, busy_periods: list, now: datetime):
     """
-    Belső segédfüggvény: egy adott napra kiszámolja a duration-t és a slot listát
-    (normál nyitvatartás + a 2 kijelölt servicenél a program utáni egyetlen szabad hely).
-    Ezt használja mind a /available-slots, mind a /available-dates végpont.
+    Egy nap slot listája (normál nyitvatartás + a 2 kijelölt servicenél a program utáni
+    egyetlen szabad hely) a nap előre kiszámolt foglaltságaiból - DB hozzáférés nélkül.
     """
-    service = await db.services.find_one({"id": service_id}, {"_id": 0})
-    if not service:
-        raise HTTPException(status_code=404, detail="Service not found")
-
-    duration = service["duration"]
-
-    date_obj = datetime.fromisoformat(date).date()
     weekday = date_obj.weekday()
     # 0 = hétfő, 5 = szombat, 6 = vasárnap
 
@@ -684,7 +1052,7 @@ async def _compute_slots_for_date(barber_id: str, date: str, service_id: str):
         business_end = time(13, 0)
     else:
         # Vasárnap: zárva → nincs időpont (a program utáni foglalás sem, mert nincs "program")
-        return duration, []
+        return []
 
     # Nyitvatartási időablakok: alap program (normál rács) + program utáni ablak
     # (a program utáni ablaknál csak a legkorábbi szabad, hézag nélküli időpontot kínáljuk fel)
@@ -694,12 +1062,7 @@ async def _compute_slots_for_date(barber_id: str, date: str, service_id: str):
     end_time = datetime.combine(date_obj, business_end)
     while current_time + timedelta(minutes=duration) <= end_time:
         slot_time = current_time.time()
-        availability = await check_barber_availability(
-            barber_id,
-            date,
-            slot_time.strftime('%H:%M'),
-            duration
-        )
+        availability = slot_availability(date_obj, slot_time, duration, busy_periods, now)
         slots.append({
             "time": slot_time.strftime('%H:%M'),
             "available": availability["available"],
@@ -710,7 +1073,7 @@ async def _compute_slots_for_date(barber_id: str, date: str, service_id: str):
         current_time += timedelta(minutes=15)
 
     if is_after_hours_service(service_id):
-        next_slot = await get_next_after_hours_slot(barber_id, date, duration)
+        next_slot = next_after_hours_slot(date_obj, duration, busy_periods, now)
         if next_slot is not None:
             slots.append({
                 "time": next_slot.strftime('%H:%M'),
@@ -720,12 +1083,78 @@ async def _compute_slots_for_date(barber_id: str, date: str, service_id: str):
                 "price": AFTER_HOURS_PRICING[service_id]
             })
 
-    return duration, slots
+    return slots
+
+@api_router.get("/barbers/{barber_id}/availability")
+async def get_barber_availability(barber_id: str, date: str, start_time: str, duration: int, request: Request, response: Response):
+    """Check if a barber is available at a specific date and time"""
+    day = datetime.fromisoformat(date).date()
+    etag, not_modified = await _conditional_get(
+        request, [etags.availability_scope(barber_id)], _availability_time_part(day, day, get_romanian_now())
+    )
+    if not_modified:
+        return not_modified
+    response.headers.update(etags.etag_headers(etag))
+    return await singleflight.availability.run(
+        etag, lambda: check_barber_availability(barber_id, date, start_time, duration)
+    )
+
+@traced("availability.check")
+async def check_barber_availability(barber_id: str, date: str, start_time: str, duration: int):
+    """Check if a barber is available at a specific date and time"""
+    appointments_by_date, breaks_by_date = await fetch_barber_bookings(barber_id, date)
+    date_obj = datetime.fromisoformat(date).date()
+    busy = _busy_periods(date_obj, appointments_by_date.get(date, []), breaks_by_date.get(date, []))
+    start_time_obj = datetime.strptime(start_time, '%H:%M').time()
+    return slot_availability(date_obj, start_time_obj, duration, busy, get_romanian_now())
+
+async def get_next_after_hours_slot(barber_id: str, date: str, duration: int):
+    """A legkorábbi szabad, hézag nélküli program utáni időpont (lásd next_after_hours_slot)"""
+    appointments_by_date, breaks_by_date = await fetch_barber_bookings(barber_id, date)
+    date_obj = datetime.fromisoformat(date).date()
+    busy = _busy_periods(date_obj, appointments_by_date.get(date, []), breaks_by_date.get(date, []))
+    return next_after_hours_slot(date_obj, duration, busy, get_romanian_now())
+
+async def _get_service_or_404(service_id: str):
+    service = await db.services.find_one({"id": service_id}, {"_id": 0})
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return service
+
+@traced("availability.compute_slots")
+async def _compute_slots_for_date(barber_id: str, date: str, service_id: str):
+    """
+    Belső segédfüggvény: egy adott napra kiszámolja a duration-t és a slot listát
+    (1 service + 2 foglaltsági lekérdezés, a slotok számításához nincs további DB hívás).
+    """
+    service = await _get_service_or_404(service_id)
+    duration = service["duration"]
+
+    date_obj = datetime.fromisoformat(date).date()
+    if date_obj.weekday() == 6:
+        return duration, []
+
+    appointments_by_date, breaks_by_date = await fetch_barber_bookings(barber_id, date)
+    busy = _busy_periods(date_obj, appointments_by_date.get(date, []), breaks_by_date.get(date, []))
+    return duration, compute_day_slots(service_id, duration, date_obj, busy, get_romanian_now())
 
 @api_router.get("/barbers/{barber_id}/available-slots")
-async def get_available_slots(barber_id: str, date: str, service_id: str):
+async def get_available_slots(barber_id: str, date: str, service_id: str, request: Request, response: Response):
     """Get all available time slots for a barber on a specific date for a specific service"""
-    duration, slots = await _compute_slots_for_date(barber_id, date, service_id)
+    day = datetime.fromisoformat(date).date()
+    # A slotok a service hosszától (katalógus) és a barber foglaltságától függnek
+    etag, not_modified = await _conditional_get(
+        request,
+        [etags.CATALOG, etags.availability_scope(barber_id)],
+        _availability_time_part(day, day, get_romanian_now()),
+    )
+    if not_modified:
+        return not_modified
+    response.headers.update(etags.etag_headers(etag))
+    # Az egyszerre érkező azonos kérések (azonos ETag) egyetlen számítást várnak
+    duration, slots = await singleflight.availability.run(
+        etag, lambda: _compute_slots_for_date(barber_id, date, service_id)
+    )
     return {
         "date": date,
         "barber_id": barber_id,
@@ -734,29 +1163,46 @@ async def get_available_slots(barber_id: str, date: str, service_id: str):
     }
 
 @api_router.get("/barbers/{barber_id}/available-dates")
-async def get_available_dates(barber_id: str, year: int, month: int, service_id: str):
+async def get_available_dates(barber_id: str, year: int, month: int, service_id: str, request: Request, response: Response):
     """
     Egy adott hónapra visszaadja, mely napokon van legalább egy szabad időpont
     (normál nyitvatartási vagy program utáni), hogy a naptárban a teljesen üres
     napok ne legyenek kattinthatók.
     """
+    month_range = (date(year, month, 1), date(year, month, calendar_module.monthrange(year, month)[1]))
+    etag, not_modified = await _conditional_get(
+        request,
+        [etags.CATALOG, etags.availability_scope(barber_id)],
+        _availability_time_part(*month_range, get_romanian_now()),
+    )
+    if not_modified:
+        return not_modified
+    response.headers.update(etags.etag_headers(etag))
+    return await singleflight.availability.run(
+        etag, lambda: _compute_available_dates(barber_id, year, month, service_id)
+    )
+
+@traced("availability.available_dates")
+async def _compute_available_dates(barber_id: str, year: int, month: int, service_id: str):
     # Ellenőrizzük, hogy a service létezik (404, ha nem)
-    service = await db.services.find_one({"id": service_id}, {"_id": 0})
-    if not service:
-        raise HTTPException(status_code=404, detail="Service not found")
+    service = await _get_service_or_404(service_id)
+    duration = service["duration"]
 
     days_in_month = calendar_module.monthrange(year, month)[1]
-    today = get_romanian_today()
+    now = get_romanian_now()
+    today = now.date()
+    first_day = max(date(year, month, 1), today)
+    last_day = date(year, month, days_in_month)
 
     available_dates = []
-    for day in range(1, days_in_month + 1):
-        date_obj = date(year, month, day)
-        if date_obj < today:
-            continue
-        date_str = date_obj.isoformat()
-        _, slots = await _compute_slots_for_date(barber_id, date_str, service_id)
-        if any(s["available"] for s in slots):
-            available_dates.append(date_str)
+    if first_day <= last_day:
+        # A hónap összes foglalása és szünete egyszerre (2 lekérdezés), a napokat már memóriában számoljuk
+        appointments_by_date, breaks_by_date = await fetch_barber_bookings(
+            barber_id, first_day.isoformat(), last_day.isoformat()
+        )
+        available_dates = _available_dates_between(
+            service_id, duration, first_day, last_day, appointments_by_date, breaks_by_date, now
+        )
 
     return {
         "barber_id": barber_id,
@@ -764,21 +1210,119 @@ async def get_available_dates(barber_id: str, year: int, month: int, service_id:
         "available_dates": available_dates
     }
 
+def _available_dates_between(service_id: str, duration: int, first_day: date, last_day: date,
+                             appointments_by_date: dict, breaks_by_date: dict, now: datetime):
+    """A napok (ISO), amelyeken van legalább egy szabad slot - a már lekérdezett foglaltságokból"""
+    available_dates = []
+    date_obj = first_day
+    while date_obj <= last_day:
+        date_str = date_obj.isoformat()
+        busy = _busy_periods(date_obj, appointments_by_date.get(date_str, []), breaks_by_date.get(date_str, []))
+        slots = compute_day_slots(service_id, duration, date_obj, busy, now)
+        if any(s["available"] for s in slots):
+            available_dates.append(date_str)
+        date_obj += timedelta(days=1)
+    return available_dates
+
+# Booking bootstrap: a foglalási folyamat kezdő adatai egyetlen kérésben
+# A katalógus (barberek + áras service-eik) a katalógus verziójához kötve a workerben cache-elve
+CATALOG_SNAPSHOT_TTL_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_TTL_SECONDS', 60))
+_catalog_snapshots = TTLCache(maxsize=2, ttl=CATALOG_SNAPSHOT_TTL_SECONDS)
+
+async def _load_catalog_snapshot():
+    barbers = await db.barbers.find({}, decode_barber.projection).to_list(1000)
+    services_by_barber = {}
+    for barber_service in await _barber_services_with_details():
+        services_by_barber.setdefault(barber_service["barber_id"], []).append(barber_service)
+    return [decode_barber(barber) for barber in barbers], services_by_barber
+
+async def catalog_snapshot():
+    """(barbers, services_by_barber) - a DB-hez csak akkor megy, ha a katalógus verzió változott"""
+    version = (await etags.versions.current(db, [etags.CATALOG]))[etags.CATALOG]
+    snapshot = _catalog_snapshots.get(version)
+    if snapshot is None:
+        snapshot = await singleflight.catalog.run(version, _load_catalog_snapshot)
+        _catalog_snapshots.set(version, snapshot)
+    return snapshot
+
+@api_router.get("/booking/bootstrap")
+async def get_booking_bootstrap(request: Request, response: Response,
+                                barber_id: Optional[str] = None, service_id: Optional[str] = None):
+    """
+    Everything the booking page needs before the first interaction: the barbers, their
+    priced services, and for the selected (or first bookable) barber and service the
+    current month's available dates and today's slots.
+    """
+    barbers, services_by_barber = await catalog_snapshot()
+    if barber_id is None:
+        barber_id = next(
+            (barber["id"] for barber in barbers if barber["is_available"] and services_by_barber.get(barber["id"])),
+            None,
+        )
+    elif not any(barber["id"] == barber_id for barber in barbers):
+        raise HTTPException(status_code=404, detail="Barber not found")
+
+    barber_services = services_by_barber.get(barber_id, [])
+    if service_id is None:
+        selected = barber_services[0] if barber_services else None
+    else:
+        selected = next((item for item in barber_services if item["service_id"] == service_id), None)
+        if selected is None:
+            raise HTTPException(status_code=404, detail="Service not offered by this barber")
+
+    now = get_romanian_now()
+    today = now.date()
+    bootstrap = {
+        "barbers": barbers,
+        "services_by_barber": services_by_barber,
+        "barber_id": barber_id,
+        "service_id": selected["service_id"] if selected else None,
+        "year": today.year,
+        "month": today.month,
+        "available_dates": [],
+        "date": today.isoformat(),
+        "service_duration": selected["duration"] if selected else None,
+        "slots": [],
+    }
+    scopes = [etags.CATALOG] + ([etags.availability_scope(barber_id)] if barber_id else [])
+    # A mai nap mindig a kérdezett tartományban van: percenkénti ETag
+    etag, not_modified = await _conditional_get(request, scopes, now.strftime("%Y-%m-%dT%H:%M"))
+    if not_modified:
+        return not_modified
+    response.headers.update(etags.etag_headers(etag))
+    if selected is None:
+        return bootstrap
+
+    available_dates, slots = await singleflight.availability.run(
+        etag, lambda: _bootstrap_availability(barber_id, selected["service_id"], selected["duration"], now)
+    )
+    bootstrap.update(available_dates=available_dates, slots=slots)
+    return bootstrap
+
+@traced("availability.bootstrap")
+async def _bootstrap_availability(barber_id: str, service_id: str, duration: int, now: datetime):
+    """A hónap hátralévő napjai és a mai slotok ugyanabból a 2 foglaltsági lekérdezésből"""
+    today = now.date()
+    last_day = date(today.year, today.month, calendar_module.monthrange(today.year, today.month)[1])
+    appointments_by_date, breaks_by_date = await fetch_barber_bookings(
+        barber_id, today.isoformat(), last_day.isoformat()
+    )
+    available_dates = _available_dates_between(
+        service_id, duration, today, last_day, appointments_by_date, breaks_by_date, now
+    )
+    busy = _busy_periods(
+        today, appointments_by_date.get(today.isoformat(), []), breaks_by_date.get(today.isoformat(), [])
+    )
+    return available_dates, compute_day_slots(service_id, duration, today, busy, now)
+
 # Appointments endpoints
 @api_router.get("/appointments", response_model=List[Appointment])
 async def get_appointments():
-    appointments = await db.appointments.find({}, {"_id": 0}).to_list(1000)
-    
-    # Parse dates and times from MongoDB
-    for appointment in appointments:
-        appointment = parse_from_mongo(appointment)
-        if isinstance(appointment['created_at'], str):
-            appointment['created_at'] = datetime.fromisoformat(appointment['created_at'])
-    
-    return appointments
+    appointments = await db.appointments.find({}, decode_appointment.projection).to_list(1000)
+    return FastJSONResponse([decode_appointment(appointment) for appointment in appointments])
 
 @api_router.get("/barbers/{barber_id}/appointments", response_model=List[Appointment])
-async def get_barber_appointments(barber_id: str, status: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None, current_barber: dict = Depends(get_current_barber)):
+async def get_barber_appointments(barber_id: str, status: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None, current_barber: dict = Depends(get_current_claims)):
     # Verify barber can only access their own appointments
     # if barber_id != current_barber["id"]:
     #     raise HTTPException(status_code=403, detail="Can only access your own appointments")
@@ -798,18 +1342,11 @@ async def get_barber_appointments(barber_id: str, status: Optional[str] = None,
         if date_filter:
             query_filter["appointment_date"] = date_filter
     
-    appointments = await db.appointments.find(query_filter, {"_id": 0}).sort("appointment_date", 1).to_list(1000)
-    
-    # Parse dates and times from MongoDB
-    for appointment in appointments:
-        appointment = parse_from_mongo(appointment)
-        if isinstance(appointment['created_at'], str):
-            appointment['created_at'] = datetime.fromisoformat(appointment['created_at'])
-    
-    return appointments
+    appointments = await db.appointments.find(query_filter, decode_appointment.projection).sort("appointment_date", 1).to_list(1000)
+    return FastJSONResponse([decode_appointment(appointment) for appointment in appointments])
 
 @api_router.get("/barbers/{barber_id}/appointments/today", response_model=List[Appointment])
-async def get_barber_today_appointments(barber_id: str, current_barber: dict = Depends(get_current_barber)):
+async def get_barber_today_appointments(barber_id: str, current_barber: dict = Depends(get_current_claims)):
     # For all staff view, allow any authenticated barber to see all appointments
     # No restriction on barber_id check for this endpoint
     
@@ -819,63 +1356,57 @@ async def get_barber_today_appointments(barber_id: str, current_barber: dict = D
         "appointment_date": today
     }
     
-    appointments = await db.appointments.find(query_filter, {"_id": 0}).sort("appointment_time", 1).to_list(1000)
-    
-    # Parse dates and times from MongoDB
-    for appointment in appointments:
-        appointment = parse_from_mongo(appointment)
-        if isinstance(appointment['created_at'], str):
-            appointment['created_at'] = datetime.fromisoformat(appointment['created_at'])
-    
-    return appointments
+    appointments = await db.appointments.find(query_filter, decode_appointment.projection).sort("appointment_time", 1).to_list(1000)
+    return FastJSONResponse([decode_appointment(appointment) for appointment in appointments])
 
 @api_router.get("/appointments/today", response_model=List[Appointment])
 async def get_today_appointments():
     today = get_romanian_today().isoformat()
-    appointments = await db.appointments.find({"appointment_date": today}, {"_id": 0}).sort("appointment_time", 1).to_list(1000)
-    
-    # Parse dates and times from MongoDB
-    for appointment in appointments:
-        appointment = parse_from_mongo(appointment)
-        if isinstance(appointment['created_at'], str):
-            appointment['created_at'] = datetime.fromisoformat(appointment['created_at'])
-    
-    return appointments
-
-
-
-EMAIL_FROM = os.getenv("EMAIL_FROM")
-EMAIL_USERNAME = os.getenv("EMAIL_USERNAME")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
-EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
-
-
-async def send_email(to: str, subject: str, body: str):
-    message = EmailMessage()
-    message["From"] = EMAIL_FROM
-    message["To"] = to
-    message["Subject"] = subject
-    message.set_content(body)
-
-    try:
-        await aiosmtplib.send(
-            message,
-            hostname=EMAIL_HOST,
-            port=EMAIL_PORT,
-            start_tls=True,
-            username=EMAIL_USERNAME,
-            password=EMAIL_PASSWORD,
-        )
-        print("Email sent successfully")
-    except Exception as e:
-        print("Email sending failed:", e)
-        raise
+    appointments = await db.appointments.find({"appointment_date": today}, decode_appointment.projection).sort("appointment_time", 1).to_list(1000)
+    return FastJSONResponse([decode_appointment(appointment) for appointment in appointments])
+
+
+
+# E-mail küldés: a végpontok csak az email_outbox kollekcióba írnak, a kézbesítést
+# az OutboxWorker végzi (lásd outbox.py). EMAIL_OUTBOX_WORKER=0 esetén ez a folyamat nem
+# indít workert (pl. ha külön `python outbox.py` process fut).
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "1") == "1"
+outbox_worker: Optional[OutboxWorker] = None
+
+# Emlékeztetők (előző nap + egy órával előtte); csak a lease-t tartó worker küld
+REMINDER_SCHEDULER = os.getenv("REMINDER_SCHEDULER", "1") == "1"
+reminder_scheduler: Optional[ReminderScheduler] = None
+
+def _notify_outbox():
+    if outbox_worker is not None:
+        outbox_worker.notify()
+
+def appointment_after_hours_label(appointment: dict) -> str:
+    """Az after-hours ablak címkéje egy tárolt foglaláshoz (üres, ha normál időpont)"""
+    appointment_date = datetime.fromisoformat(appointment["appointment_date"]).date()
+    appointment_time = datetime.strptime(appointment["appointment_time"][:5], '%H:%M').time()
+    if not is_after_hours_time(appointment_date, appointment_time):
+        return ""
+    return format_after_hours_window(appointment_date)
+
+async def enqueue_appointment_email(kind: str, appointment, after_hours_label: str = "", reminder: str = "day_before"):
+    """Queue a templated e-mail (confirmation / reminder) for an appointment"""
+    if not isinstance(appointment, dict):
+        appointment = appointment.model_dump()
+    await enqueue_template_email(
+        db,
+        kind,
+        to=appointment["customer_email"],
+        context=EmailContext.from_appointment(appointment, after_hours_window=after_hours_label, reminder=reminder),
+        appointment_id=appointment["id"],
+    )
+    _notify_outbox()
 
 
 
 @api_router.post("/appointments", response_model=Appointment)
-async def create_appointment(appointment_data: AppointmentCreate, background_tasks: BackgroundTasks):
+@traced("booking.create_appointment")
+async def create_appointment(appointment_data: AppointmentCreate):
     # Get service duration for availability check
     service = await db.services.find_one({"id": appointment_data.service_id}, {"_id": 0})
     if not service:
@@ -891,15 +1422,21 @@ async def create_appointment(appointment_data: AppointmentCreate, background_tas
     duration = appointment_data.duration if appointment_data.duration else service["duration"]
     is_after_hours_booking = False
 
+    # A nap foglaltságai egyszer lekérve - ebből számol a program utáni és a normál ellenőrzés is
+    appointment_date_str = appointment_data.appointment_date.isoformat()
+    appointments_by_date, breaks_by_date = await fetch_barber_bookings(appointment_data.barber_id, appointment_date_str)
+    busy = _busy_periods(
+        appointment_data.appointment_date,
+        appointments_by_date.get(appointment_date_str, []),
+        breaks_by_date.get(appointment_date_str, []),
+    )
+    now = get_romanian_now()
+
     # Program utáni foglalás: külön ár, csak a kijelölt 2 servicenél és csak a program utáni
     # ablakban (napi bontásban), és csak a ténylegesen soron következő (hézag nélküli) időpontra
     if is_after_hours_service(appointment_data.service_id):
         if is_after_hours_time(appointment_data.appointment_date, appointment_data.appointment_time):
-            next_slot = await get_next_after_hours_slot(
-                appointment_data.barber_id,
-                appointment_data.appointment_date.isoformat(),
-                duration
-            )
+            next_slot = next_after_hours_slot(appointment_data.appointment_date, duration, busy, now)
             if next_slot is None or appointment_data.appointment_time != next_slot:
                 if next_slot:
                     detail = f"This is not the next available after-hours slot (next: {next_slot.strftime('%H:%M')})"
@@ -916,11 +1453,12 @@ async def create_appointment(appointment_data: AppointmentCreate, background_tas
         )
 
     # Check availability
-    availability = await check_barber_availability(
-        appointment_data.barber_id,
-        appointment_data.appointment_date.isoformat(),
-        appointment_data.appointment_time.strftime('%H:%M'),
-        duration
+    availability = slot_availability(
+        appointment_data.appointment_date,
+        appointment_data.appointment_time.replace(second=0, microsecond=0),
+        duration,
+        busy,
+        now
     )
     
     if not availability["available"]:
@@ -942,98 +1480,13 @@ async def create_appointment(appointment_data: AppointmentCreate, background_tas
     doc['created_at'] = doc['created_at'].isoformat()
     
     _ = await db.appointments.insert_one(doc)
-
+    await etags.versions.bump(db, etags.availability_scope(appointment_obj.barber_id))
 
     # Program utáni foglalás jelzése az e-mailben (az ablak a nap szerint eltérő)
-    if is_after_hours_booking:
-        _ah_window = get_after_hours_window(appointment_data.appointment_date.weekday())
-        _ah_label = f"{_ah_window[0].strftime('%H:%M')}-{_ah_window[1].strftime('%H:%M')}" if _ah_window else ""
-    else:
-        _ah_label = ""
-    after_hours_note_ro = f"\n• Notă: Programare în afara programului normal ({_ah_label})" if is_after_hours_booking else ""
-    after_hours_note_hu = f"\n• Megjegyzés: Program utáni időpont ({_ah_label})" if is_after_hours_booking else ""
-    after_hours_note_en = f"\n• Note: After-hours appointment ({_ah_label})" if is_after_hours_booking else ""
-
-    # AUTOMATIKUS EMAIL KÜLDÉS
-    background_tasks.add_task(
-        send_email,
-        to=appointment_obj.customer_email,
-        subject="Confirmare / Visszaigazolás / Confirmation – Oxyss Style",
-        body=f"""
-🇷🇴 Confirmare Programare – Oxyss Style
-
-Dragă {appointment_obj.customer_name},
-
-Îți mulțumim că ai efectuat o programare la Oxyss Style!
-
-Detaliile programării tale:
-
-• Serviciu: {appointment_obj.service_name}
-• Stilist: {appointment_obj.barber_name}
-• Dată: {appointment_obj.appointment_date}
-• Ora: {appointment_obj.appointment_time.strftime("%H:%M")}
-• Durată estimată: {appointment_obj.duration} minute
-• Preț: {appointment_obj.price} RON{after_hours_note_ro}
-
-Dacă dorești să modifici sau să anulezi programarea, ne poți contacta la:
-Telefon: +40 74 116 1016
-
-Te așteptăm cu drag în salonul nostru!
-
-Cu respect,
-{appointment_obj.barber_name} și echipa Oxyss Style
-
-------------------------------------------------------------
-
-🇭🇺 Foglalás visszaigazolása – Oxyss Style
-
-Kedves {appointment_obj.customer_name},
-
-Köszönjük, hogy időpontot foglalt az Oxyss Style szalonba!
-
-Az alábbiakban megtalálod a foglalásod részleteit:
-
-• Szolgáltatás: {appointment_obj.service_name}
-• Fodrász: {appointment_obj.barber_name}
-• Dátum: {appointment_obj.appointment_date}
-• Időpont: {appointment_obj.appointment_time.strftime("%H:%M")}
-• Várható időtartam: {appointment_obj.duration} perc
-• Ár: {appointment_obj.price} RON{after_hours_note_hu}
-
-Amennyiben módosítanád vagy lemondanád az időpontot, kérjük vedd fel velünk a kapcsolatot:
-Telefon: +40 74 116 1016
-
-Várunk szeretettel az Oxyss Style szalonban!
-
-Üdvözlettel,
-{appointment_obj.barber_name} és az Oxyss Style csapat
-
-------------------------------------------------------------
+    after_hours_label = format_after_hours_window(appointment_data.appointment_date) if is_after_hours_booking else ""
 
-🇬🇧 Appointment Confirmation – Oxyss Style
-
-Dear {appointment_obj.customer_name},
-
-Thank you for booking an appointment at Oxyss Style!
-
-Here are the details of your appointment:
-
-• Service: {appointment_obj.service_name}
-• Hair Stylist: {appointment_obj.barber_name}
-• Date: {appointment_obj.appointment_date}
-• Time: {appointment_obj.appointment_time.strftime("%H:%M")}
-• Estimated duration: {appointment_obj.duration} minutes
-• Price: {appointment_obj.price} RON{after_hours_note_en}
-
-If you need to modify or cancel your appointment, feel free to contact us:
-Phone: +40 74 116 1016
-
-We look forward to welcoming you at Oxyss Style!
-
-Best regards,
-{appointment_obj.barber_name} and the Oxyss Style Team
-"""
-    )
+    # AUTOMATIKUS EMAIL KÜLDÉS (outbox-on keresztül, tartósan; a renderelés a workerben történik)
+    await enqueue_appointment_email("confirmation", appointment_obj, after_hours_label)
     # -----------------------------
 
     return appointment_obj
@@ -1050,18 +1503,27 @@ async def get_appointment(appointment_id: str):
     
     return appointment
 
-@api_router.patch("/appointments/{appointment_id}/status")
-async def update_appointment_status(appointment_id: str, status: str):
+async def _set_appointment_status(appointment_id: str, new_status: str):
+    """Update the status, bumping the availability version when a slot is freed or taken"""
     valid_statuses = ["pending", "confirmed", "completed", "cancelled"]
-    if status not in valid_statuses:
+    if new_status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
-        
-    result = await db.appointments.update_one(
+
+    previous = await db.appointments.find_one_and_update(
         {"id": appointment_id},
-        {"$set": {"status": status}}
+        {"$set": {"status": new_status}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
     )
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
+    if (previous.get("status") in ACTIVE_APPOINTMENT_STATUSES) != (new_status in ACTIVE_APPOINTMENT_STATUSES):
+        await etags.versions.bump(db, etags.availability_scope(previous["barber_id"]))
+    return previous
+
+@api_router.patch("/appointments/{appointment_id}/status")
+async def update_appointment_status(appointment_id: str, status: str):
+    await _set_appointment_status(appointment_id, status)
     return {"message": "Appointment status updated successfully", "status": status}
 
 class StatusUpdate(BaseModel):
@@ -1069,16 +1531,7 @@ class StatusUpdate(BaseModel):
 
 @api_router.patch("/appointments/{appointment_id}")
 async def update_appointment_status_body(appointment_id: str, status_update: StatusUpdate):
-    valid_statuses = ["pending", "confirmed", "completed", "cancelled"]
-    if status_update.status not in valid_statuses:
-        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
-        
-    result = await db.appointments.update_one(
-        {"id": appointment_id},
-        {"$set": {"status": status_update.status}}
-    )
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Appointment not found")
+    await _set_appointment_status(appointment_id, status_update.status)
     return {"message": "Appointment status updated successfully", "status": status_update.status}
 
 @api_router.patch("/appointments/{appointment_id}/duration")
@@ -1108,6 +1561,7 @@ async def update_appointment_duration(appointment_id: str, duration_update: dict
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Appointment not found")
+    await etags.versions.bump(db, etags.availability_scope(appointment["barber_id"]))
     
     return {
         "message": "Appointment duration updated successfully", 
@@ -1129,6 +1583,7 @@ async def delete_appointment(appointment_id: str, current_barber: dict = Depends
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Appointment not found")
+    await etags.versions.bump(db, etags.availability_scope(appointment["barber_id"]))
     
     return {
         "message": "Appointment deleted successfully", 
@@ -1151,17 +1606,15 @@ async def create_contact_message(message_data: ContactMessageCreate):
 
 @api_router.get("/contact", response_model=List[ContactMessage])
 async def get_contact_messages():
-    messages = await db.contact_messages.find({}, {"_id": 0}).to_list(1000)
-    
-    for message in messages:
-        if isinstance(message['created_at'], str):
-            message['created_at'] = datetime.fromisoformat(message['created_at'])
-    
-    return messages
+    messages = await db.contact_messages.find({}, decode_contact_message.projection).to_list(1000)
+    return FastJSONResponse([decode_contact_message(message) for message in messages])
 
 # Initialize default barbers and services
 @api_router.post("/init-data")
 async def initialize_data():
+    # Csak ha tényleg beszúrtunk valamit, különben minden oldalbetöltés érvénytelenítené a katalógus ETag-eket
+    inserted = False
+
     # Initialize barbers if not exists
     existing_barbers = await db.barbers.count_documents({})
     if existing_barbers == 0:
@@ -1186,6 +1639,8 @@ async def initialize_data():
             }
         ]
         await db.barbers.insert_many(default_barbers)
+        inserted = True
+        invalidate_barber_cache()
     
     # Initialize services if not exists
     existing_services = await db.services.count_documents({})
@@ -1250,6 +1705,7 @@ async def initialize_data():
             }
         ]
         await db.services.insert_many(default_services)
+        inserted = True
         
         # Store service IDs for barber service assignment
         for service in default_services:
@@ -1305,26 +1761,33 @@ async def initialize_data():
         
         if barber_services_to_create:
             await db.barber_services.insert_many(barber_services_to_create)
+            inserted = True
     
     # Initialize barber authentication if not exists
     existing_auth = await db.barber_auth.count_documents({})
     if existing_auth == 0:
         barbers_data = await db.barbers.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(1000)
         
+        # Default password, hashed in parallel off the event loop
+        password_hashes = await hash_passwords_bulk(["barber123"] * len(barbers_data))
+
         auth_data_to_create = []
-        for barber in barbers_data:
+        for barber, password_hash in zip(barbers_data, password_hashes):
             barber_name = barber["name"].lower()
             auth_data_to_create.append({
                 "id": str(uuid.uuid4()),
                 "barber_id": barber["id"],
                 "email": f"{barber_name}@oxyssbarbershop.com",
-                "password_hash": get_password_hash("barber123"),  # Default password
+                "password_hash": password_hash,
                 "is_active": True
             })
         
         if auth_data_to_create:
             await db.barber_auth.insert_many(auth_data_to_create)
+            inserted = True
     
+    if inserted:
+        await etags.versions.bump(db, etags.CATALOG)
     barber_count = await db.barbers.count_documents({})
     service_count = await db.services.count_documents({})
     barber_service_count = await db.barber_services.count_documents({})
@@ -1354,6 +1817,8 @@ async def migrate_services():
         {"price": {"$exists": True}, "base_price": {"$exists": False}},
         [{"$set": {"base_price": "$price"}}, {"$unset": "price"}]
     )
+    if result.modified_count:
+        await etags.versions.bump(db, etags.CATALOG)
     
     return {
         "message": "Services migrated successfully",
@@ -1370,6 +1835,7 @@ async def migrate_appointments():
     updated_count = 0
     skipped_count = 0
     error_count = 0
+    updated_barbers = set()
     
     # Get all appointments
     appointments = await db.appointments.find({}, {"_id": 0}).to_list(10000)
@@ -1384,7 +1850,10 @@ async def migrate_appointments():
             # Get service information
             service = await db.services.find_one({"id": appointment["service_id"]}, {"_id": 0})
             if not service:
-                print(f"Service not found for appointment {appointment['id']}")
+                logger.warning(
+                    "Migration: service not found for appointment",
+                    extra={"fields": {"appointment_id": appointment["id"], "service_id": appointment["service_id"]}},
+                )
                 error_count += 1
                 continue
             
@@ -1404,10 +1873,16 @@ async def migrate_appointments():
             )
             
             updated_count += 1
+            updated_barbers.add(appointment["barber_id"])
             
-        except Exception as e:
-            print(f"Error migrating appointment {appointment.get('id')}: {str(e)}")
+        except Exception:
+            logger.exception(
+                "Migration: error migrating appointment",
+                extra={"fields": {"appointment_id": appointment.get("id")}},
+            )
             error_count += 1
+    for barber_id in updated_barbers:
+        await etags.versions.bump(db, etags.availability_scope(barber_id))
     
     return {
         "message": "Migration completed",
@@ -1422,7 +1897,10 @@ async def get_google_reviews():
     """Fetch Google Reviews for the barbershop via Places API"""
     if not GOOGLE_API_KEY or not GOOGLE_PLACE_ID:
         raise HTTPException(status_code=500, detail="Google API not configured")
- 
+    # Egyszerre legfeljebb egy Places API hívás, a közben érkezők ugyanazt az eredményt kapják
+    return await singleflight.google_reviews.run("reviews", _fetch_google_reviews)
+
+async def _fetch_google_reviews():
     url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         "place_id": GOOGLE_PLACE_ID,
@@ -1431,13 +1909,17 @@ async def get_google_reviews():
         "key": GOOGLE_API_KEY,
     }
  
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Google API error: {str(e)}")
+    # Az httpx csak itt kell, ezért nem lassítja az indulást
+    import httpx
+
+    with tracing.span("google_reviews.fetch"):
+        async with httpx.AsyncClient() as client:
+            try:
+                response = await client.get(url, params=params, timeout=10.0)
+                response.raise_for_status()
+                data = response.json()
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Google API error: {str(e)}")
  
     result = data.get("result", {})
     reviews_raw = result.get("reviews", [])
@@ -1464,6 +1946,14 @@ async def get_google_reviews():
 # Include the router in the main app
 app.include_router(api_router)
 
+# Kliensenkénti token bucket (IP + route osztály) -> 429 + Retry-After; a CORS-on belül,
+# hogy a 429 is kapjon CORS fejléceket és a böngésző kiolvashassa (limitek: ratelimit.py)
+app.add_middleware(RateLimitMiddleware)
+
+# Túlterheléskor (event loop késés / sok futó kérés) a nem kritikus végpontok azonnal
+# 503-at kapnak, hogy a foglalás és az elérhetőség gyors maradjon (loadshed.py)
+app.add_middleware(LoadSheddingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1472,14 +1962,115 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# gzip / brotli tömörítés a nagyobb JSON válaszokra (küszöb és típuslista: compression.py)
+app.add_middleware(CompressionMiddleware)
+
+def _can_profile(token: str) -> bool:
+    """Only authenticated barbers may request a profile (token checked without the DB)"""
+    try:
+        decode_token(token)
+    except HTTPException:
+        return False
+    return True
+
+# Igény szerinti profilozás: ?__profile=1 (vagy X-Profile fejléc) + barber token
+app.add_middleware(ProfilingMiddleware, authorize=_can_profile)
+
+# Kérésenkénti trace span (csak ha a tracing be van kapcsolva)
+app.add_middleware(tracing.TracingMiddleware)
+
+# Kérésenkénti JSON access log (request_id, route, barber_id, késleltetés, DB hívások);
+# a DBStats middleware-en belül fut, hogy a kérés DB számlálóit lássa
+app.add_middleware(RequestLoggingMiddleware)
+
+# Kérésenkénti DB round-trip számlálás (X-DB-Calls / X-DB-Time fejlécek)
+app.add_middleware(dbstats.DBStatsMiddleware)
+
+# Liveness / readiness probe-ok (Fly, Docker HEALTHCHECK); a /healthz sima Starlette route,
+# nincs dependency feloldás és válasz-serializálás
+app.add_route("/healthz", health.healthz_endpoint, methods=["GET"], include_in_schema=False)
 
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    workers = {}
+    if EMAIL_OUTBOX_WORKER:
+        workers["email_outbox"] = outbox_worker
+    if REMINDER_SCHEDULER:
+        workers["reminders"] = reminder_scheduler
+    return await health.readiness(db, workers, startup_task)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Prometheus metrikák (a legkülső middleware, hogy a teljes kérésidőt mérje)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_api_route("/metrics", metrics.metrics_endpoint, methods=["GET"], include_in_schema=False)
+
+
+startup_task: Optional[asyncio.Task] = None
+
+# Sikertelen index létrehozás után újrapróbálás exponenciális várakozással (plafonig)
+INDEX_RETRY_INITIAL_SECONDS = float(os.environ.get('INDEX_RETRY_INITIAL_SECONDS', 1))
+INDEX_RETRY_MAX_SECONDS = float(os.environ.get('INDEX_RETRY_MAX_SECONDS', 60))
+
+async def _prepare_database() -> bool:
+    """
+    Indexek, majd a (hintelt index-et használó) emlékeztető ütemező - az első kérés után.
+    Egy Mongo kiesés a hidegindításkor nem végleges: addig próbálkozunk, amíg sikerül
+    (a /readyz közben "pending"-et mutat), a shutdown pedig megszakítja.
+    """
+    global reminder_scheduler
+    delay = INDEX_RETRY_INITIAL_SECONDS
+    while True:
+        try:
+            await ensure_outbox_indexes(db)
+            await ensure_reminder_indexes(db)
+            await ensure_auth_indexes(db)
+            break
+        except Exception:
+            logger.exception("Creating indexes failed, retrying", extra={"fields": {"retry_in_s": delay}})
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, INDEX_RETRY_MAX_SECONDS)
+    if REMINDER_SCHEDULER:
+        reminder_scheduler = ReminderScheduler(
+            db,
+            now=get_romanian_now,
+            after_hours_label=appointment_after_hours_label,
+            notify=_notify_outbox,
+        )
+        reminder_scheduler.start()
+    return True
+
+def connect_database():
+    """The Motor client and db, created on first use (tests and the load test may inject `db`)"""
+    global client, db
+    if db is None:
+        client = AsyncIOMotorClient(
+            mongo_url,
+            event_listeners=[dbstats.command_listener, tracing.command_listener, health.pool_listener],
+        )
+        db = client[os.environ['DB_NAME']]
+    return db
+
+async def start_background_workers():
+    global outbox_worker, startup_task
+    connect_database()
+    loop_lag_monitor.start()
+    # Az indexek létrehozása a háttérben fut, hogy ne késleltesse a hidegindítás utáni első választ
+    startup_task = asyncio.create_task(_prepare_database(), name="prepare-database")
+    if EMAIL_OUTBOX_WORKER:
+        outbox_worker = OutboxWorker(db)
+        outbox_worker.start()
+
+async def shutdown_background_workers():
+    if startup_task is not None and not startup_task.done():
+        startup_task.cancel()
+    await loop_lag_monitor.stop()
+    if reminder_scheduler is not None:
+        await reminder_scheduler.stop()
+    if outbox_worker is not None:
+        await outbox_worker.stop()
+    if client is not None:
+        client.close()
+    if export_client is not None:
+        export_client.close()
+    shutdown_hash_pool()
+    tracing.shutdown_tracing()
+    metrics.mark_process_dead()
\ No newline at end of file
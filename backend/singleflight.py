@@ -0,0 +1,54 @@
+"""
+Single-flight request coalescing for expensive reads.
+
+When many clients ask for the same thing at once (a barber posts a link and dozens of
+customers open the same month view), `SingleFlight.run` lets only the first caller for a
+key start the computation; everyone who asks for the same key while it is running
+awaits that same task and gets the same result (or the same exception). Nothing is
+cached: once the task finishes the key is free again and the next caller recomputes.
+
+Keys must include everything the result depends on. For the availability endpoints the
+key is the response's ETag (etags.py), which already covers the path, the query, the
+data versions and the time bucket - so a request that arrives after a booking never
+joins a computation that started before it.
+
+The shared task is shielded: a caller that goes away (client disconnect, timeout) stops
+waiting, but the computation keeps running for the others. Results are shared between
+callers, so they must not be mutated.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+from metrics import SINGLEFLIGHT_CALLS
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable]):
+        task = self._in_flight.get(key)
+        if task is None:
+            SINGLEFLIGHT_CALLS.labels(self.name, "leader").inc()
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            SINGLEFLIGHT_CALLS.labels(self.name, "follower").inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Ha minden hívó elment, a kivételt senki nem olvassa ki - ne legyen "never retrieved" log
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+
+availability = SingleFlight("availability")
+catalog = SingleFlight("catalog")
+google_reviews = SingleFlight("google_reviews")
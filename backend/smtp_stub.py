@@ -0,0 +1,122 @@
+"""
+Local SMTP stand-in for development and tests.
+
+A tiny asyncio SMTP server (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT - no TLS, no
+auth) that keeps every received message in memory. Point the outbox worker at it with
+EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_START_TLS=0 and no EMAIL_USERNAME.
+
+In tests:
+    async with LocalSMTPServer() as smtp:
+        worker = OutboxWorker(db, hostname="127.0.0.1", port=smtp.port, start_tls=False, username=None)
+        ...
+        assert smtp.messages[0]["Subject"] == "..."
+
+Standalone:
+    python smtp_stub.py --port 1025
+"""
+import argparse
+import asyncio
+from email import message_from_bytes, policy
+from typing import List, Optional
+
+
+class LocalSMTPServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reject: Optional[set] = None):
+        self.host = host
+        self.port = port
+        # Ezekre a címekre 550-nel válaszol (végleges hiba szimulálása)
+        self.reject = reject or set()
+        self.messages: List = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        rcpt_to = []
+        await reply("220 localhost smtp-stub ready")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                command, _, argument = raw.decode(errors="replace").strip().partition(" ")
+                command = command.upper()
+                if command == "EHLO":
+                    await reply("250-localhost")
+                    await reply("250 8BITMIME")
+                elif command == "HELO":
+                    await reply("250 localhost")
+                elif command == "MAIL":
+                    rcpt_to = []
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    address = argument.partition(":")[2].strip().strip("<>")
+                    if address in self.reject:
+                        await reply("550 Mailbox unavailable")
+                    else:
+                        rcpt_to.append(address)
+                        await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        line = await reader.readline()
+                        if line in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(line[1:] if line.startswith(b"..") else line)
+                    message = message_from_bytes(b"".join(lines), policy=policy.default)
+                    self.messages.append(message)
+                    await reply("250 OK: queued")
+                elif command == "RSET":
+                    rcpt_to = []
+                    await reply("250 OK")
+                elif command == "NOOP":
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+
+async def _main(host: str, port: int):
+    server = await LocalSMTPServer(host, port).start()
+    print(f"SMTP stub listening on {server.host}:{server.port}")
+    seen = 0
+    try:
+        while True:
+            await asyncio.sleep(0.5)
+            for message in server.messages[seen:]:
+                print(f"--- {message['To']} | {message['Subject']}")
+            seen = len(server.messages)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port))
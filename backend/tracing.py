@@ -0,0 +1,243 @@
+"""
+Lightweight OpenTelemetry tracing for the hot paths.
+
+Off by default. With TRACE_EXPORTER set, spans are recorded for every HTTP request, the
+booking and availability code, each Mongo command (through a pymongo CommandListener),
+every outbox e-mail delivery and the Google reviews fetch:
+
+    TRACE_EXPORTER=file   one JSON span per line in TRACE_FILE (default traces.jsonl)
+    TRACE_EXPORTER=otlp   OTLP/HTTP to a local collector (OTEL_EXPORTER_OTLP_ENDPOINT,
+                          default http://localhost:4318)
+    TRACE_SAMPLE_RATE     fraction of traces kept, 0.0-1.0 (default 1.0); child spans
+                          follow their parent's decision
+
+E-mails are delivered later by the outbox worker, so the W3C trace context of the
+request is stored on the outbox message and the delivery span continues that trace -
+a slow booking and the e-mail it queued show up on one timeline.
+
+The opentelemetry-api / -sdk / -exporter-otlp-proto-http packages are in
+requirements.txt, so tracing can be switched on in a deployed image with an env var.
+They are only imported when TRACE_EXPORTER is set; when tracing is off (or they are
+missing, e.g. a trimmed install) `span()` returns a shared no-op context manager and
+`traced()` leaves the function untouched, so there is no per-call cost.
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from pymongo import monitoring
+
+import metrics
+from jsonlog import get_log_context
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "").lower()
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 1.0))
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "oxyss-backend")
+
+_tracer = None
+_NOOP_SPAN = contextlib.nullcontext()
+
+
+class FileSpanExporter:
+    """SpanExporter writing one JSON object per span (OpenTelemetry's own JSON form)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        lines = "".join(json.dumps(json.loads(span.to_json())) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000):
+        return True
+
+
+def _build_exporter(name: str):
+    if name == "file":
+        return FileSpanExporter(TRACE_FILE)
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown TRACE_EXPORTER: {name}")
+
+
+def configure_tracing(exporter: str = TRACE_EXPORTER, sample_rate: float = TRACE_SAMPLE_RATE) -> bool:
+    """Install the tracer provider; returns False (and stays a no-op) if tracing is off"""
+    global _tracer
+    if not exporter or exporter == "none":
+        return False
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": SERVICE_NAME}),
+            sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+        )
+        provider.add_span_processor(BatchSpanProcessor(_build_exporter(exporter)))
+    except ImportError as exc:
+        logger.warning("Tracing disabled, OpenTelemetry is not installed: %s", exc)
+        return False
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("oxyss")
+    return True
+
+
+def shutdown_tracing():
+    """Flush the spans still queued in the batch processor"""
+    if _tracer is not None:
+        from opentelemetry import trace
+
+        trace.get_tracer_provider().shutdown()
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, context=None, **attributes):
+    """Context manager for a span (a no-op when tracing is off)"""
+    if _tracer is None:
+        return _NOOP_SPAN
+    return _tracer.start_as_current_span(name, context=context, attributes=attributes or None)
+
+
+def traced(name: str):
+    """
+    Decorator wrapping an async function in a span. Tracing must be configured before the
+    decorated module is imported; otherwise the function is returned unchanged.
+    """
+    def decorator(function):
+        if _tracer is None:
+            return function
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with _tracer.start_as_current_span(name):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_context() -> Optional[dict]:
+    """The current W3C trace context ({"traceparent": ...}) to store with deferred work"""
+    if _tracer is None:
+        return None
+    from opentelemetry import propagate
+
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier or None
+
+
+def extract_trace_context(carrier: Optional[dict]):
+    if _tracer is None or not carrier:
+        return None
+    from opentelemetry import propagate
+
+    return propagate.extract(carrier)
+
+
+class MongoTracingListener(monitoring.CommandListener):
+    """One client span per Mongo command, parented to whatever span issued it"""
+
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if _tracer is None:
+            return
+        collection = event.command.get(event.command_name)
+        mongo_span = _tracer.start_span(
+            f"mongodb.{event.command_name}",
+            attributes={
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": collection if isinstance(collection, str) else "",
+            },
+        )
+        with self._lock:
+            self._spans[(event.connection_id, event.request_id)] = mongo_span
+
+    def _finished(self, event, error: Optional[str] = None):
+        with self._lock:
+            mongo_span = self._spans.pop((event.connection_id, event.request_id), None)
+        if mongo_span is None:
+            return
+        if error is not None:
+            from opentelemetry.trace import Status, StatusCode
+
+            mongo_span.set_status(Status(StatusCode.ERROR, error))
+        mongo_span.end()
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event, error=str(event.failure))
+
+
+command_listener = MongoTracingListener()
+
+
+class TracingMiddleware:
+    """Server span per HTTP request, continuing an incoming traceparent if there is one"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        from opentelemetry import propagate
+        from opentelemetry.trace import SpanKind, Status, StatusCode
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers", [])}
+        # A span neve a route template, így nem tartalmaz azonosítókat
+        route = metrics.route_template(scope["app"], scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {route}",
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={
+                "http.request.method": scope["method"],
+                "http.route": route,
+                "url.path": scope["path"],
+                "http.request.id": get_log_context().get("request_id", ""),
+            },
+        ) as request_span:
+            await self.app(scope, receive, send_wrapper)
+            request_span.set_attribute("http.response.status_code", status_code)
+            if status_code >= 500:
+                request_span.set_status(Status(StatusCode.ERROR))
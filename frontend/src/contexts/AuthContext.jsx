@@ -1,4 +1,25 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
+import axios from 'axios';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+// A short-lived access token is renewed with the stored refresh token; concurrent
+// 401s share one refresh request.
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('barber_refresh_token');
+    refreshPromise = (refreshToken
+      ? axios.post(`${API}/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
 
 const AuthContext = createContext();
 
@@ -35,10 +56,36 @@ export const AuthProvider = ({ children }) => {
     setLoading(false);
   }, []);
 
-  const login = (token, barberId, barberName) => {
+  useEffect(() => {
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (error) => {
+        const original = error.config;
+        const isAuthCall = original?.url?.includes('/auth/');
+        if (error.response?.status !== 401 || !original || original._retried || isAuthCall) {
+          return Promise.reject(error);
+        }
+        original._retried = true;
+        try {
+          const { data } = await refreshAccessToken();
+          login(data.access_token, data.barber_id, data.barber_name, data.refresh_token);
+          original.headers = { ...original.headers, Authorization: `Bearer ${data.access_token}` };
+          return axios(original);
+        } catch (refreshError) {
+          return Promise.reject(error);
+        }
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
+  const login = (token, barberId, barberName, refreshToken) => {
     localStorage.setItem('barber_token', token);
     localStorage.setItem('barber_id', barberId);
     localStorage.setItem('barber_name', barberName);
+    if (refreshToken) {
+      localStorage.setItem('barber_refresh_token', refreshToken);
+    }
     
     setIsAuthenticated(true);
     setBarberData({
@@ -49,7 +96,15 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    const token = localStorage.getItem('barber_token');
+    if (token) {
+      // Revoke the refresh token server-side; the local logout does not wait for it
+      axios.post(`${API}/auth/logout`, null, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch(() => {});
+    }
     localStorage.removeItem('barber_token');
+    localStorage.removeItem('barber_refresh_token');
     localStorage.removeItem('barber_id');
     localStorage.removeItem('barber_name');
     
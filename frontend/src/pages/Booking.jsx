@@ -28,6 +28,8 @@ const Booking = () => {
   const selectedService = location.state?.selectedService || null;
 
   const nextStepRef = useRef(null);
+  // A /booking/bootstrap válasza: barberek service-ei, az alapértelmezett barber+service havi napjai és mai slotjai
+  const bootstrapRef = useRef(null);
 
   const [services, setServices] = useState([]);
   const [barbers, setBarbers] = useState([]);
@@ -83,8 +85,10 @@ const Booking = () => {
       setLoading(true);
       await axios.post(`${API}/init-data`);
       
-      const barbersResponse = await axios.get(`${API}/barbers`);
-      setBarbers(barbersResponse.data);
+      // Egyetlen kérés a 4 egymás utáni helyett (barberek, service-ek, napok, mai slotok)
+      const bootstrapResponse = await axios.get(`${API}/booking/bootstrap`);
+      bootstrapRef.current = bootstrapResponse.data;
+      setBarbers(bootstrapResponse.data.barbers);
       
       setServices([]);
     } catch (err) {
@@ -96,6 +100,11 @@ const Booking = () => {
   };
 
   const fetchBarberServices = async (barberId) => {
+    const bootstrapServices = bootstrapRef.current?.services_by_barber?.[barberId];
+    if (bootstrapServices) {
+      setServices(bootstrapServices);
+      return;
+    }
     try {
       const response = await axios.get(`${API}/barbers/${barberId}/services`);
       setServices(response.data);
@@ -106,11 +115,25 @@ const Booking = () => {
     }
   };
 
+  // A bootstrap elérhetőségi adatai, ha ugyanarra a barber+service párra szólnak. Csak az azonnali
+  // megjelenítéshez: a végpontot mindig újrakérjük (ETag + no-cache, változatlan adatnál 304)
+  const bootstrapFor = (barberId, serviceId) => {
+    const bootstrap = bootstrapRef.current;
+    if (!bootstrap || bootstrap.barber_id !== barberId || bootstrap.service_id !== serviceId) return null;
+    return bootstrap;
+  };
+
   const fetchAvailableSlots = async (barberId, date, serviceId) => {
     if (!barberId || !date || !serviceId) return;
-    
-    try {
+
+    const bootstrap = bootstrapFor(barberId, serviceId);
+    if (bootstrap && bootstrap.date === format(date, 'yyyy-MM-dd')) {
+      setAvailableSlots(bootstrap.slots);
+    } else {
       setLoadingSlots(true);
+    }
+
+    try {
       const response = await axios.get(`${API}/barbers/${barberId}/available-slots`, {
         params: {
           date: format(date, 'yyyy-MM-dd'),
@@ -130,8 +153,15 @@ const Booking = () => {
   const fetchAvailableDates = async (barberId, serviceId, month) => {
     if (!barberId || !serviceId) return;
 
-    try {
+    const bootstrap = bootstrapFor(barberId, serviceId);
+    if (bootstrap && bootstrap.year === month.getFullYear() && bootstrap.month === month.getMonth() + 1) {
+      setAvailableDates(new Set(bootstrap.available_dates));
+      setAvailableDatesMonth({ year: month.getFullYear(), month: month.getMonth() });
+    } else {
       setLoadingDates(true);
+    }
+
+    try {
       const response = await axios.get(`${API}/barbers/${barberId}/available-dates`, {
         params: {
           year: month.getFullYear(),
@@ -296,6 +326,8 @@ const Booking = () => {
     } catch (error) {
       console.error('Error booking appointment:', error);
       toast.error('Failed to book appointment. Please try again.');
+      // Pl. közben foglalt slot: a friss foglaltság kell, nem a korábban betöltött
+      fetchAvailableSlots(bookingData.barberId, bookingData.appointmentDate, bookingData.serviceId);
     } finally {
       setSubmitting(false);
     }
@@ -0,0 +1,167 @@
+import os
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017"))
+os.environ.setdefault("DB_NAME", "oxyss_test")
+os.environ.setdefault("EMAIL_OUTBOX_WORKER", "0")
+os.environ.setdefault("REMINDER_SCHEDULER", "0")
+
+import server  # noqa: E402
+import etags  # noqa: E402
+import ratelimit  # noqa: E402
+from passwords import get_password_hash  # noqa: E402
+from tests.db_budget import CountingDatabase  # noqa: E402
+
+BARBER_ID = "test-barber"
+BARBER_EMAIL = "barber@example.com"
+BARBER_PASSWORD = "barber123"
+HAIRCUT_ID = "b5a81fce-8d76-4837-a7df-46d658881e1c"  # program utáni foglalásra is jogosult
+BEARD_ID = "test-beard-trim"
+BOOKING_DAY = "2030-03-04"  # hétfő
+# Minden tesztnap a jövőben van, így a "múltbeli slot" ág nem függ a futtatás idejétől
+PINNED_NOW = server.ROMANIAN_TZ.localize(datetime(2030, 1, 15, 8, 0))
+
+_password_hash = None
+
+
+def _seed_documents():
+    global _password_hash
+    if _password_hash is None:
+        _password_hash = get_password_hash(BARBER_PASSWORD)
+    services = [
+        {"id": HAIRCUT_ID, "name": "Men's Haircut", "duration": 45, "base_price": 70.0},
+        {"id": BEARD_ID, "name": "Beard Trim", "duration": 30, "base_price": 45.0},
+    ]
+    for service in services:
+        service.update({
+            "name_hu": service["name"],
+            "name_ro": service["name"],
+            "description": service["name"],
+            "description_hu": service["name"],
+            "description_ro": service["name"],
+            "category": "Men",
+        })
+    return {
+        "barbers": [{
+            "id": BARBER_ID,
+            "name": "Test Barber",
+            "description": "Test",
+            "description_hu": "Test",
+            "description_ro": "Test",
+            "experience_years": 5,
+            "specialties": ["Fades"],
+            "image_url": None,
+            "is_available": True,
+        }],
+        "services": services,
+        "barber_services": [
+            {"id": str(uuid.uuid4()), "barber_id": BARBER_ID, "service_id": service["id"], "price": 80.0, "is_available": True}
+            for service in services
+        ],
+        "barber_auth": [{
+            "id": "test-auth",
+            "barber_id": BARBER_ID,
+            "email": BARBER_EMAIL,
+            "password_hash": _password_hash,
+            "is_active": True,
+        }],
+        "appointments": [
+            {
+                "id": f"test-appointment-{index}",
+                "customer_name": "Customer",
+                "customer_email": "customer@example.com",
+                "customer_phone": "+40700000000",
+                "service_id": HAIRCUT_ID,
+                "service_name": "Men's Haircut",
+                "barber_id": BARBER_ID,
+                "barber_name": "Test Barber",
+                "appointment_date": day,
+                "appointment_time": start,
+                "duration": 45,
+                "price": 80.0,
+                "status": "confirmed",
+                "created_at": "2030-01-01T10:00:00+00:00",
+            }
+            for index, (day, start) in enumerate([
+                (BOOKING_DAY, "09:00:00"),
+                (BOOKING_DAY, "11:30:00"),
+                (BOOKING_DAY, "19:00:00"),
+                ("2030-03-05", "10:00:00"),
+                ("2030-04-10", "15:00:00"),
+            ])
+        ],
+        "barber_breaks": [{
+            "id": "test-break",
+            "barber_id": BARBER_ID,
+            "break_date": BOOKING_DAY,
+            "start_time": "13:00:00",
+            "end_time": "14:00:00",
+            "title": "Lunch",
+            "created_at": "2030-01-01T10:00:00+00:00",
+        }],
+    }
+
+
+@pytest_asyncio.fixture
+async def app_db(monkeypatch):
+    """
+    The app's database, seeded: a scratch database on the mongod at TEST_MONGO_URL
+    (commands counted by the real CommandListener), or in-memory mongomock-motor.
+    """
+    client = None
+    test_mongo_url = os.environ.get("TEST_MONGO_URL")
+    if test_mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(
+            test_mongo_url,
+            serverSelectionTimeoutMS=2000,
+            event_listeners=[server.dbstats.command_listener],
+        )
+        try:
+            await client.admin.command("ping")
+        except Exception as exc:
+            client.close()
+            pytest.skip(f"TEST_MONGO_URL is not reachable: {exc}")
+        db = client[f"oxyss_test_{uuid.uuid4().hex[:8]}"]
+    else:
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        db = CountingDatabase(mongomock_motor.AsyncMongoMockClient()["oxyss_test"])
+
+    for name, docs in _seed_documents().items():
+        await db[name].insert_many(docs)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "get_romanian_now", lambda: PINNED_NOW)
+    monkeypatch.setattr(server, "get_romanian_today", lambda: PINNED_NOW.date())
+    server.invalidate_barber_cache()
+    server._token_versions.clear()
+    server._catalog_snapshots.clear()
+    etags.versions.clear()
+    ratelimit.buckets.clear()
+    yield db
+    if client is not None:
+        await client.drop_database(db.name)
+        client.close()
+
+
+@pytest_asyncio.fixture
+async def api(app_db):
+    import httpx
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def barber_headers():
+    access_token, _ = server.create_token_pair(BARBER_ID, "Test Barber", "test-auth")
+    return {"Authorization": f"Bearer {access_token}"}
@@ -0,0 +1,82 @@
+"""
+Mongo round-trip budgets for API tests.
+
+`request_within_db_budget` performs a request against the app in-process and fails the
+test when the request issued more Mongo commands than its budget. The count is the one
+DBStatsMiddleware reports in X-DB-Calls, so it covers everything the request did,
+including helpers and dependencies.
+
+Against a real mongod (TEST_MONGO_URL) the count comes from the pymongo
+CommandListener. Against mongomock-motor, which emits no command events, `CountingDatabase`
+wraps the database and records one command per collection operation instead.
+"""
+import functools
+
+import dbstats
+
+# Egy-egy hívás = egy Mongo parancs (a nagy eredmények getMore-jait nem számoljuk)
+COMMAND_METHODS = frozenset({
+    "aggregate",
+    "bulk_write",
+    "command",
+    "count_documents",
+    "create_index",
+    "delete_many",
+    "delete_one",
+    "distinct",
+    "find",
+    "find_one",
+    "find_one_and_delete",
+    "find_one_and_replace",
+    "find_one_and_update",
+    "insert_many",
+    "insert_one",
+    "replace_one",
+    "update_many",
+    "update_one",
+})
+
+
+def _counted(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        stats = dbstats.current_db_stats()
+        if stats is not None:
+            stats.record(0.0)
+        return method(*args, **kwargs)
+    return wrapper
+
+
+class CountingCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        return _counted(attribute) if name in COMMAND_METHODS else attribute
+
+
+class CountingDatabase:
+    """Counts collection operations into the current request's DB stats (for mongomock)"""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        if name in COMMAND_METHODS:
+            return _counted(getattr(self._db, name))
+        return CountingCollection(self._db[name])
+
+    def __getitem__(self, name):
+        return CountingCollection(self._db[name])
+
+
+async def request_within_db_budget(client, method: str, url: str, max_calls: int, **kwargs):
+    """Send a request and assert it issued at most `max_calls` Mongo commands"""
+    response = await client.request(method, url, **kwargs)
+    calls = int(response.headers["X-DB-Calls"])
+    assert calls <= max_calls, (
+        f"{method} {url} issued {calls} Mongo commands, budget is {max_calls} "
+        f"(status {response.status_code})"
+    )
+    return response
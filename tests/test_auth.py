@@ -0,0 +1,136 @@
+import json
+import logging
+
+import pytest
+
+import passwords
+import server
+from jsonlog import JSONFormatter
+from tests.conftest import BARBER_EMAIL, BARBER_ID, BARBER_PASSWORD
+
+pytestmark = pytest.mark.asyncio
+
+TODAY_URL = f"/api/barbers/{BARBER_ID}/appointments/today"
+
+
+def _account(index: int) -> dict:
+    return {"barber_id": BARBER_ID, "email": f"staff{index}@example.com", "password": "secret123"}
+
+
+async def test_bulk_create_requires_authentication(api, app_db):
+    response = await api.post(
+        "/api/auth/bulk-create", json=[_account(0)], headers={"Authorization": "Bearer not-a-token"}
+    )
+    assert response.status_code == 401
+    # Fejléc nélkül a HTTPBearer már a dependency-ben elutasít
+    assert (await api.post("/api/auth/bulk-create", json=[_account(0)])).status_code == 403
+    assert await app_db.barber_auth.count_documents({"email": "staff0@example.com"}) == 0
+
+
+async def test_bulk_create_rejects_oversized_batches(api, barber_headers, app_db):
+    accounts = [_account(index) for index in range(server.BULK_CREATE_MAX_ACCOUNTS + 1)]
+    response = await api.post("/api/auth/bulk-create", json=accounts, headers=barber_headers)
+    assert response.status_code == 413
+    assert await app_db.barber_auth.count_documents({"email": "staff0@example.com"}) == 0
+
+
+async def test_bulk_create_hashes_in_the_pool_and_hides_the_hashes(api, barber_headers, app_db):
+    accounts = [_account(index) for index in range(3)]
+    response = await api.post("/api/auth/bulk-create", json=accounts, headers=barber_headers)
+    assert response.status_code == 200
+    created = response.json()
+    assert [account["email"] for account in created] == [account["email"] for account in accounts]
+    assert all(set(account) == {"id", "barber_id", "email", "is_active"} for account in created)
+    assert "password_hash" not in response.text
+
+    # A hash-ek a (spawn-olt) process poolban készültek
+    assert passwords._bulk_hash_pool is not None
+    stored = await app_db.barber_auth.find({"email": {"$regex": "^staff"}}).to_list(10)
+    assert len(stored) == 3
+    assert all(doc["password_hash"].startswith("$2") for doc in stored)
+    for account in accounts:
+        login = await api.post("/api/auth/login", json={"email": account["email"], "password": account["password"]})
+        assert login.status_code == 200
+
+
+async def _login(api) -> dict:
+    response = await api.post("/api/auth/login", json={"email": BARBER_EMAIL, "password": BARBER_PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+async def test_refresh_rotates_the_refresh_token(api):
+    tokens = await _login(api)
+    response = await api.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert (await api.get(TODAY_URL, headers=_bearer(rotated))).status_code == 200
+
+    again = await api.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert again.status_code == 200
+
+
+async def test_replayed_refresh_token_revokes_the_session(api, app_db):
+    tokens = await _login(api)
+    rotated = (await api.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+
+    replay = await api.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    # A lopott token újrahasználata az egész sessiont visszavonja, a legutóbbi tokent is
+    assert (await api.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]})).status_code == 401
+    assert await app_db[server.REFRESH_SESSIONS_COLLECTION].count_documents({}) == 0
+
+
+async def test_refresh_token_without_session_is_rejected(api):
+    _, legacy_refresh = server.create_token_pair(BARBER_ID, "Test Barber", "test-auth")
+    response = await api.post("/api/auth/refresh", json={"refresh_token": legacy_refresh})
+    assert response.status_code == 401
+
+
+async def test_logout_revokes_access_and_refresh_tokens(api):
+    tokens = await _login(api)
+    assert (await api.post("/api/auth/logout", headers=_bearer(tokens))).status_code == 200
+
+    assert (await api.get(TODAY_URL, headers=_bearer(tokens))).status_code == 401
+    response = await api.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+async def test_logout_is_enforced_by_workers_that_did_not_see_it(api):
+    tokens = await _login(api)
+    assert (await api.post("/api/auth/logout", headers=_bearer(tokens))).status_code == 200
+    # Egy másik worker: üres token verzió és identitás cache - a verziót a DB-ből tölti
+    server._token_versions.clear()
+    server.invalidate_barber_cache()
+
+    # Claim-alapú (DB nélküli) és DB-s identitás egyaránt
+    assert (await api.get(TODAY_URL, headers=_bearer(tokens))).status_code == 401
+    assert (await api.delete("/api/breaks/missing", headers=_bearer(tokens))).status_code == 401
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(JSONFormatter())
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+async def test_cached_identity_still_binds_the_barber_to_the_access_log(api, barber_headers):
+    handler = _Collect()
+    access_logger = logging.getLogger("oxyss.access")
+    access_logger.addHandler(handler)
+    try:
+        for _ in range(2):  # második kérés: _barber_token_cache találat
+            assert (await api.delete("/api/breaks/missing", headers=barber_headers)).status_code == 404
+    finally:
+        access_logger.removeHandler(handler)
+
+    assert [line.get("barber_id") for line in handler.lines] == [BARBER_ID, BARBER_ID]
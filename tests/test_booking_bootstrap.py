@@ -0,0 +1,63 @@
+import pytest
+
+import server
+
+from tests.conftest import BARBER_ID, BEARD_ID, HAIRCUT_ID, PINNED_NOW
+from tests.db_budget import request_within_db_budget
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_bootstrap_matches_the_funnel_endpoints(api):
+    # adatverziók (2) + barberek + barber service-ek ($lookup) + a hónap foglalásai + szünetei
+    bootstrap = await request_within_db_budget(api, "GET", "/api/booking/bootstrap", max_calls=6)
+    assert bootstrap.status_code == 200
+    body = bootstrap.json()
+
+    assert body["barbers"] == (await api.get("/api/barbers")).json()
+    assert body["services_by_barber"][BARBER_ID] == (await api.get(f"/api/barbers/{BARBER_ID}/services")).json()
+    assert body["barber_id"] == BARBER_ID
+    assert body["service_id"] == HAIRCUT_ID
+    assert (body["year"], body["month"], body["date"]) == (2030, 1, PINNED_NOW.date().isoformat())
+
+    dates = await api.get(
+        f"/api/barbers/{BARBER_ID}/available-dates", params={"year": 2030, "month": 1, "service_id": HAIRCUT_ID}
+    )
+    assert body["available_dates"] == dates.json()["available_dates"]
+    slots = await api.get(
+        f"/api/barbers/{BARBER_ID}/available-slots", params={"date": body["date"], "service_id": HAIRCUT_ID}
+    )
+    assert body["slots"] == slots.json()["slots"]
+    assert body["service_duration"] == slots.json()["service_duration"]
+
+
+async def test_bootstrap_reuses_the_cached_catalog(api):
+    first = await api.get("/api/booking/bootstrap", params={"service_id": BEARD_ID})
+    assert first.json()["service_id"] == BEARD_ID
+    # A katalógus és az adatverziók cache-ből jönnek, csak a foglaltság számolódik újra
+    second = await request_within_db_budget(
+        api, "GET", "/api/booking/bootstrap", max_calls=2, params={"barber_id": BARBER_ID}
+    )
+    assert second.status_code == 200
+    not_modified = await request_within_db_budget(
+        api, "GET", "/api/booking/bootstrap", max_calls=0,
+        params={"barber_id": BARBER_ID}, headers={"If-None-Match": second.headers["etag"]},
+    )
+    assert not_modified.status_code == 304
+
+
+async def test_bootstrap_unknown_barber(api):
+    response = await api.get("/api/booking/bootstrap", params={"barber_id": "missing"})
+    assert response.status_code == 404
+
+
+async def test_bootstrap_on_a_sunday_has_no_slots(api, monkeypatch):
+    sunday = PINNED_NOW.replace(day=20)
+    assert sunday.weekday() == 6
+    monkeypatch.setattr(server, "get_romanian_now", lambda: sunday)
+    monkeypatch.setattr(server, "get_romanian_today", lambda: sunday.date())
+
+    body = (await api.get("/api/booking/bootstrap")).json()
+    assert body["date"] == sunday.date().isoformat()
+    assert body["slots"] == []
+    assert sunday.date().isoformat() not in body["available_dates"]
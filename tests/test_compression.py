@@ -0,0 +1,39 @@
+import pytest
+
+from compression import accepted_encoding
+from tests.conftest import BARBER_ID, BOOKING_DAY, HAIRCUT_ID
+
+SLOTS_URL = f"/api/barbers/{BARBER_ID}/available-slots"
+SLOTS_PARAMS = {"date": BOOKING_DAY, "service_id": HAIRCUT_ID}
+
+
+@pytest.mark.parametrize("header, brotli_available, expected", [
+    ("gzip, deflate, br", True, "br"),
+    ("gzip, deflate, br", False, "gzip"),
+    ("br;q=0, gzip;q=0.8", True, "gzip"),
+    ("gzip;q=0", True, None),
+    ("identity", True, None),
+    ("*", False, "gzip"),
+    ("", True, None),
+])
+def test_accepted_encoding(header, brotli_available, expected):
+    assert accepted_encoding(header, brotli_available=brotli_available) == expected
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped(api):
+    plain = await api.get(SLOTS_URL, params=SLOTS_PARAMS, headers={"Accept-Encoding": "identity"})
+    response = await api.get(SLOTS_URL, params=SLOTS_PARAMS, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(plain.content) / 2
+    # Az httpx a gzip-et automatikusan kicsomagolja
+    assert response.content == plain.content
+    assert "content-encoding" not in plain.headers
+
+
+@pytest.mark.asyncio
+async def test_small_response_is_not_compressed(api):
+    response = await api.get("/api/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"message": "Oxy'ss Barbershop API"}
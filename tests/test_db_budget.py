@@ -0,0 +1,137 @@
+"""
+Mongo round-trip budgets for the hot endpoints.
+
+Each budget is the number of commands the endpoint needs by design; a change that
+brings back per-slot or per-day queries (or an N+1 anywhere else) fails here. The
+conditional GETs include one data version read (etags.py) and the writes one bump.
+"""
+import pytest
+
+from tests.conftest import BARBER_EMAIL, BARBER_ID, BARBER_PASSWORD, BEARD_ID, BOOKING_DAY, HAIRCUT_ID
+from tests.db_budget import request_within_db_budget
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_list_barbers(api):
+    response = await request_within_db_budget(api, "GET", "/api/barbers", max_calls=2)
+    assert response.status_code == 200
+
+
+async def test_list_services(api):
+    response = await request_within_db_budget(api, "GET", "/api/services", max_calls=2)
+    assert response.status_code == 200
+
+
+async def test_services_by_barber(api):
+    response = await request_within_db_budget(api, "GET", f"/api/services/by-barber/{BARBER_ID}", max_calls=2)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+@pytest.mark.parametrize("service_id", [HAIRCUT_ID, BEARD_ID])
+async def test_available_slots(api, service_id):
+    # adatverziók + service + a nap foglalásai + a nap szünetei
+    response = await request_within_db_budget(
+        api, "GET", f"/api/barbers/{BARBER_ID}/available-slots",
+        max_calls=4,
+        params={"date": BOOKING_DAY, "service_id": service_id},
+    )
+    assert response.status_code == 200
+    slots = {slot["time"]: slot for slot in response.json()["slots"]}
+    assert not slots["09:00"]["available"]
+    assert not slots["13:00"]["available"]
+    assert slots["10:00"]["available"]
+    if service_id == HAIRCUT_ID:
+        # A 19:00-s program utáni foglalás után a következő hézag nélküli hely
+        assert [slot["time"] for slot in slots.values() if slot["after_hours"]] == ["19:45"]
+
+
+@pytest.mark.parametrize("year, month", [(2030, 2), (2030, 3), (2030, 4), (2030, 12)])
+async def test_available_dates_regardless_of_month_length(api, year, month):
+    response = await request_within_db_budget(
+        api, "GET", f"/api/barbers/{BARBER_ID}/available-dates",
+        # adatverziók + service + a hónap foglalásai + szünetei, a hónap hosszától függetlenül
+        max_calls=4,
+        params={"year": year, "month": month, "service_id": HAIRCUT_ID},
+    )
+    assert response.status_code == 200
+    # Vasárnap zárva, minden más jövőbeli nap foglalható
+    assert response.json()["available_dates"]
+    assert all(not day.endswith("-03-03") for day in response.json()["available_dates"])
+
+
+async def test_availability_check(api):
+    response = await request_within_db_budget(
+        api, "GET", f"/api/barbers/{BARBER_ID}/availability",
+        max_calls=3,
+        params={"date": BOOKING_DAY, "start_time": "11:45", "duration": 30},
+    )
+    assert response.json()["available"] is False
+
+
+@pytest.mark.parametrize("appointment_time, service_id", [("10:00:00", BEARD_ID), ("19:45:00", HAIRCUT_ID)])
+async def test_create_appointment(api, appointment_time, service_id):
+    # service + barber ár + a nap foglalásai + szünetei + insert + verzió bump + outbox insert
+    response = await request_within_db_budget(
+        api, "POST", "/api/appointments",
+        max_calls=7,
+        json={
+            "customer_name": "New Customer",
+            "customer_email": "new@example.com",
+            "customer_phone": "+40700000001",
+            "service_id": service_id,
+            "service_name": "Service",
+            "barber_id": BARBER_ID,
+            "barber_name": "Test Barber",
+            "appointment_date": BOOKING_DAY,
+            "appointment_time": appointment_time,
+        },
+    )
+    assert response.status_code == 200, response.text
+
+
+async def test_create_appointment_conflict(api):
+    response = await request_within_db_budget(
+        api, "POST", "/api/appointments",
+        max_calls=4,
+        json={
+            "customer_name": "New Customer",
+            "customer_email": "new@example.com",
+            "customer_phone": "+40700000001",
+            "service_id": BEARD_ID,
+            "service_name": "Beard Trim",
+            "barber_id": BARBER_ID,
+            "barber_name": "Test Barber",
+            "appointment_date": BOOKING_DAY,
+            "appointment_time": "09:15:00",
+        },
+    )
+    assert response.status_code == 400
+
+
+async def test_barber_appointments(api, barber_headers):
+    # Az első kérés betölti a barber token verzióját, utána az csak a cache-ből jön
+    await request_within_db_budget(api, "GET", f"/api/barbers/{BARBER_ID}/appointments", max_calls=2, headers=barber_headers)
+    response = await request_within_db_budget(
+        api, "GET", f"/api/barbers/{BARBER_ID}/appointments", max_calls=1, headers=barber_headers
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+
+async def test_barber_today_appointments(api, barber_headers):
+    # Az első kérés betölti a barber token verzióját, utána az csak a cache-ből jön
+    await request_within_db_budget(api, "GET", f"/api/barbers/{BARBER_ID}/appointments/today", max_calls=2, headers=barber_headers)
+    response = await request_within_db_budget(
+        api, "GET", f"/api/barbers/{BARBER_ID}/appointments/today", max_calls=1, headers=barber_headers
+    )
+    assert response.status_code == 200
+
+
+async def test_login(api):
+    response = await request_within_db_budget(
+        api, "POST", "/api/auth/login", max_calls=3,
+        json={"email": BARBER_EMAIL, "password": BARBER_PASSWORD},
+    )
+    assert response.status_code == 200
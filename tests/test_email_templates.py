@@ -0,0 +1,94 @@
+from datetime import date, time
+
+import pytest
+
+from email_templates import TEMPLATES, EmailContext, EmailTemplate, render_email
+
+AFTER_HOURS_NOTES = [
+    "Notă: Programare în afara programului normal (19:00-21:00)",
+    "Megjegyzés: Program utáni időpont (19:00-21:00)",
+    "Note: After-hours appointment (19:00-21:00)",
+]
+
+
+def _context(**overrides) -> EmailContext:
+    values = {
+        "customer_name": "Anna Kovács",
+        "service_name": "Men's Haircut",
+        "barber_name": "Test Barber",
+        "appointment_date": date(2030, 3, 4),
+        "appointment_time": time(19, 30),
+        "duration": 45,
+        "price": 80.0,
+    }
+    values.update(overrides)
+    return EmailContext(**values)
+
+
+@pytest.mark.parametrize("kind", sorted(TEMPLATES))
+def test_html_variant_escapes_context_values(kind):
+    rendered = render_email(kind, _context(customer_name='<script>alert("x")</script> & Co'))
+
+    assert "<script>" not in rendered.html
+    assert "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; Co" in rendered.html
+    # A sima szöveges változat változatlanul tartalmazza
+    assert '<script>alert("x")</script> & Co' in rendered.text
+
+
+def test_html_variant_escapes_the_template_text():
+    rendered = render_email("confirmation", _context(service_name="Cut & Style"))
+    assert "<li>Serviciu: Cut &amp; Style</li>" in rendered.html
+
+
+def test_all_templates_are_precompiled():
+    assert sorted(TEMPLATES) == ["cancellation", "confirmation", "reminder"]
+
+
+@pytest.mark.parametrize("kind", ["confirmation", "reminder"])
+def test_after_hours_line_only_for_after_hours_bookings(kind):
+    regular = render_email(kind, _context())
+    after_hours = render_email(kind, _context(after_hours_window="19:00-21:00"))
+
+    for note in AFTER_HOURS_NOTES:
+        assert note not in regular.text
+        assert note not in regular.html
+        assert f"• {note}" in after_hours.text
+        assert f"<li>{note}</li>" in after_hours.html
+    assert len(after_hours.text.splitlines()) == len(regular.text.splitlines()) + len(AFTER_HOURS_NOTES)
+
+
+def test_values_are_formatted_for_display():
+    rendered = render_email("confirmation", _context(appointment_time="09:15:00"))
+    assert "• Ora: 09:15" in rendered.text
+    assert "• Dată: 2030-03-04" in rendered.text
+    assert "• Preț: 80.0 RON" in rendered.text
+
+
+def test_reminder_names_its_kind_in_every_language():
+    hour_before = render_email("reminder", _context(reminder="hour_before")).text
+    assert "în aproximativ o oră" in hour_before
+    assert "körülbelül egy óra múlva" in hour_before
+    assert "in about an hour" in hour_before
+    assert "tomorrow" in render_email("reminder", _context()).text
+
+
+def test_cancellation_lists_the_appointment_in_every_language():
+    rendered = render_email("cancellation", _context(after_hours_window="19:00-21:00"))
+    assert rendered.subject == "Anulare / Lemondás / Cancellation – Oxyss Style"
+    for line in ["• Serviciu: Men's Haircut", "• Fodrász: Test Barber", "• Date: 2030-03-04", "• Time: 19:30"]:
+        assert line in rendered.text
+    assert "<li>Időpont: 19:30</li>" in rendered.html
+    # A lemondott időpontnál nincs program utáni megjegyzés
+    assert not any(note in rendered.text for note in AFTER_HOURS_NOTES)
+
+
+def test_stored_context_renders_the_same():
+    context = _context(after_hours_window="19:00-21:00")
+    assert render_email("confirmation", EmailContext(**context.to_document())) == render_email("confirmation", context)
+
+
+def test_unknown_placeholder_fails_at_compile_time():
+    with pytest.raises(ValueError, match="unknown field"):
+        EmailTemplate("broken", "Subject", "Hello {customer_nmae}\n")
+    with pytest.raises(ValueError, match="unknown condition"):
+        EmailTemplate("broken", "Subject", "@vip Welcome back\n")
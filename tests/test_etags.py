@@ -0,0 +1,94 @@
+import pytest
+
+from etags import matches
+from tests.conftest import BARBER_ID, BEARD_ID, BOOKING_DAY, HAIRCUT_ID
+from tests.db_budget import request_within_db_budget
+
+SLOTS_URL = f"/api/barbers/{BARBER_ID}/available-slots"
+SLOTS_PARAMS = {"date": BOOKING_DAY, "service_id": HAIRCUT_ID}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"abc-gzip"', True),
+    ('"other", "abc-br"', True),
+    ("*", True),
+    ('"abcd"', False),
+    (None, False),
+])
+def test_matches(header, expected):
+    assert matches(header, '"abc"') is expected
+
+
+@pytest.mark.asyncio
+async def test_unchanged_catalog_is_not_modified(api):
+    first = await api.get("/api/services")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    # A verzió a folyamaton belüli cache-ből jön: egyetlen lekérdezés sem fut
+    second = await request_within_db_budget(api, "GET", "/api/services", max_calls=0, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+
+
+@pytest.mark.asyncio
+async def test_booking_changes_the_availability_etag(api):
+    before = await api.get(SLOTS_URL, params=SLOTS_PARAMS)
+    etag = before.headers["etag"]
+    other_day = await api.get(SLOTS_URL, params={**SLOTS_PARAMS, "date": "2030-03-05"})
+    assert other_day.headers["etag"] != etag
+
+    response = await api.post("/api/appointments", json={
+        "customer_name": "New Customer",
+        "customer_email": "new@example.com",
+        "customer_phone": "+40700000001",
+        "service_id": BEARD_ID,
+        "service_name": "Beard Trim",
+        "barber_id": BARBER_ID,
+        "barber_name": "Test Barber",
+        "appointment_date": BOOKING_DAY,
+        "appointment_time": "10:00:00",
+    })
+    assert response.status_code == 200, response.text
+
+    after = await api.get(SLOTS_URL, params=SLOTS_PARAMS, headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["etag"] != etag
+    assert not {slot["time"]: slot for slot in after.json()["slots"]}["10:00"]["available"]
+
+
+@pytest.mark.asyncio
+async def test_gzipped_etag_revalidates(api):
+    first = await api.get(SLOTS_URL, params=SLOTS_PARAMS, headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"].endswith('-gzip"')
+
+    second = await api.get(
+        SLOTS_URL, params=SLOTS_PARAMS, headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]}
+    )
+    assert second.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_init_data_without_inserts_keeps_the_catalog_etag(api):
+    # A Booking.jsx minden oldalbetöltéskor meghívja
+    assert (await api.post("/api/init-data")).status_code == 200
+    etag = (await api.get("/api/barbers")).headers["etag"]
+
+    assert (await api.post("/api/init-data")).status_code == 200
+    response = await api.get("/api/barbers", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_init_data_that_inserts_changes_the_catalog_etag(api, app_db):
+    etag = (await api.get("/api/barbers")).headers["etag"]
+    await app_db.barber_auth.delete_many({})
+
+    assert (await api.post("/api/init-data")).status_code == 200
+    response = await api.get("/api/barbers", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
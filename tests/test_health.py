@@ -0,0 +1,58 @@
+import pytest
+
+import health
+import server
+from tests.db_budget import request_within_db_budget
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def fresh_ping():
+    health.mongo_ping.clear()
+    yield
+    health.mongo_ping.clear()
+
+
+async def test_healthz_does_no_io(api):
+    response = await request_within_db_budget(api, "GET", "/healthz", max_calls=0)
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+async def test_readyz_pings_once_per_ttl(api):
+    response = await request_within_db_budget(api, "GET", "/readyz", max_calls=1)
+    assert response.status_code == 200
+    assert response.json()["mongo"]["ok"] is True
+    # A második probe a gyorsítótárazott ping eredményt kapja
+    await request_within_db_budget(api, "GET", "/readyz", max_calls=0)
+
+
+async def test_readyz_unavailable_when_ping_fails(api, monkeypatch):
+    class UnreachableDatabase:
+        async def command(self, name):
+            raise ConnectionError("no primary")
+
+    monkeypatch.setattr(server, "db", UnreachableDatabase())
+    response = await api.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+    assert "no primary" in response.json()["mongo"]["error"]
+
+
+async def test_index_creation_retries_until_mongo_is_back(app_db, monkeypatch):
+    attempts = 0
+    real_ensure = server.ensure_outbox_indexes
+
+    async def flaky_ensure(db):
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ConnectionError("no primary")
+        await real_ensure(db)
+
+    monkeypatch.setattr(server, "ensure_outbox_indexes", flaky_ensure)
+    monkeypatch.setattr(server, "INDEX_RETRY_INITIAL_SECONDS", 0.001)
+    monkeypatch.setattr(server, "REMINDER_SCHEDULER", False)
+    assert await server._prepare_database() is True
+    assert attempts == 3
@@ -0,0 +1,41 @@
+import pytest
+
+import loadshed
+from loadshed import LoadSheddingMiddleware, LoopLagMonitor
+from tests.conftest import BARBER_ID, BOOKING_DAY, HAIRCUT_ID
+
+
+def test_lag_rises_at_once_and_decays_slowly():
+    monitor = LoopLagMonitor(decay=0.5)
+    monitor.record(0.4)
+    assert monitor.lag == pytest.approx(0.4)
+    monitor.record(0.0)
+    assert monitor.lag == pytest.approx(0.2)
+    monitor.record(0.3)
+    assert monitor.lag == pytest.approx(0.3)
+
+
+def test_in_flight_requests_signal_overload():
+    middleware = LoadSheddingMiddleware(None, monitor=LoopLagMonitor(), lag_threshold=0.1, max_in_flight=2)
+    assert middleware.overload_reason() is None
+    middleware.in_flight = 2
+    assert middleware.overload_reason() == "in_flight"
+    middleware.monitor.record(0.5)
+    assert middleware.overload_reason() == "loop_lag"
+
+
+@pytest.mark.asyncio
+async def test_overload_sheds_only_non_critical_routes(api, monkeypatch):
+    monkeypatch.setattr(loadshed.loop_lag_monitor, "lag", 1.0)
+
+    shed = await api.get("/api/contact")
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+
+    slots = await api.get(
+        f"/api/barbers/{BARBER_ID}/available-slots", params={"date": BOOKING_DAY, "service_id": HAIRCUT_ID}
+    )
+    assert slots.status_code == 200
+
+    monkeypatch.setattr(loadshed.loop_lag_monitor, "lag", 0.0)
+    assert (await api.get("/api/contact")).status_code == 200
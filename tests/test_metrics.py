@@ -0,0 +1,75 @@
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+from starlette.routing import Route
+
+import metrics
+import server
+from tests.conftest import BARBER_ID, HAIRCUT_ID
+
+DATES_ROUTE = "/api/barbers/{barber_id}/available-dates"
+
+
+def _requests_total(method: str, route: str, status: str) -> float:
+    labels = {"method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+
+class _CountingRoute(Route):
+    calls = 0
+
+    def matches(self, scope):
+        _CountingRoute.calls += 1
+        return super().matches(scope)
+
+
+class _App:
+    def __init__(self, routes):
+        self.router = type("Router", (), {"routes": routes})()
+
+
+def test_route_template_is_matched_once_per_request():
+    _CountingRoute.calls = 0
+    app = _App([_CountingRoute("/api/barbers/{barber_id}", lambda request: None)])
+    scope = {"type": "http", "method": "GET", "path": "/api/barbers/b1", "root_path": ""}
+
+    assert metrics.route_template(app, scope) == "/api/barbers/{barber_id}"
+    assert metrics.route_template(app, scope) == "/api/barbers/{barber_id}"
+    assert _CountingRoute.calls == 1
+    assert scope[metrics.ROUTE_TEMPLATE_SCOPE_KEY] == "/api/barbers/{barber_id}"
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template(api):
+    before = _requests_total("GET", DATES_ROUTE, "200")
+    response = await api.get(
+        f"/api/barbers/{BARBER_ID}/available-dates", params={"year": 2030, "month": 3, "service_id": HAIRCUT_ID}
+    )
+    assert response.status_code == 200
+    assert _requests_total("GET", DATES_ROUTE, "200") == before + 1
+    # A nyers útvonal (azonosítóval) sosem lesz címke
+    assert _requests_total("GET", f"/api/barbers/{BARBER_ID}/available-dates", "200") == 0
+
+    before = _requests_total("GET", metrics.UNMATCHED_ROUTE, "404")
+    assert (await api.get("/no/such/page")).status_code == 404
+    assert _requests_total("GET", metrics.UNMATCHED_ROUTE, "404") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_need_the_token_when_configured(api, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape-secret")
+    assert (await api.get("/metrics")).status_code == 403
+    assert (await api.get("/metrics", headers={"Authorization": "Bearer wrong"})).status_code == 403
+
+    response = await api.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_without_token_are_loopback_only(app_db, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    for client, expected in [(("127.0.0.1", 5000), 200), (("172.16.0.2", 5000), 403)]:
+        transport = httpx.ASGITransport(app=server.app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as remote:
+            assert (await remote.get("/metrics")).status_code == expected
@@ -0,0 +1,171 @@
+import logging
+import socket
+from datetime import datetime, timedelta, timezone
+
+import aiosmtplib
+import pytest
+import pytest_asyncio
+
+from outbox import (
+    EMAIL_OUTBOX_COLLECTION,
+    STATUS_DEAD,
+    STATUS_PENDING,
+    STATUS_SENT,
+    OutboxWorker,
+    describe_error,
+    enqueue_email,
+    ensure_outbox_indexes,
+    retry_delay,
+)
+from smtp_stub import LocalSMTPServer
+
+def _worker(db, port):
+    return OutboxWorker(db, hostname="127.0.0.1", port=port, start_tls=False, username=None, password=None)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # A mongomock naiv (UTC) datetime-ot ad vissza, a valódi Mongo időzónásat
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest_asyncio.fixture
+async def outbox_db(app_db):
+    await ensure_outbox_indexes(app_db)
+    return app_db
+
+
+async def _enqueue(db, to="customer@example.com", subject="Hello"):
+    return await enqueue_email(db, to=to, subject=subject, body="Body")
+
+
+@pytest.mark.asyncio
+async def test_delivers_pending_messages(outbox_db):
+    message_id = await _enqueue(outbox_db, subject="Booking confirmed")
+    async with LocalSMTPServer() as smtp:
+        assert await _worker(outbox_db, smtp.port).process_once() == 1
+
+    assert [message["Subject"] for message in smtp.messages] == ["Booking confirmed"]
+    assert smtp.messages[0]["To"] == "customer@example.com"
+    doc = await outbox_db[EMAIL_OUTBOX_COLLECTION].find_one({"id": message_id})
+    assert doc["status"] == STATUS_SENT
+    assert doc["attempts"] == 1
+    assert doc["sent_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_connection_failure_is_retried_with_backoff(outbox_db):
+    message_id = await _enqueue(outbox_db)
+    worker = _worker(outbox_db, _closed_port())
+    before = datetime.now(timezone.utc)
+    await worker.process_once()
+
+    doc = await outbox_db[EMAIL_OUTBOX_COLLECTION].find_one({"id": message_id})
+    assert doc["status"] == STATUS_PENDING
+    assert doc["attempts"] == 1
+    assert doc["last_error"]
+    assert _as_utc(doc["next_attempt_at"]) >= before + retry_delay(1) - timedelta(seconds=1)
+    # A várakozási idő alatt nem kerül újra sorra
+    assert await worker.claim_batch() == []
+    assert retry_delay(2) == 2 * retry_delay(1)
+
+
+@pytest.mark.asyncio
+async def test_rejected_recipient_is_dead_lettered(outbox_db):
+    rejected_id = await _enqueue(outbox_db, to="gone@example.com")
+    delivered_id = await _enqueue(outbox_db)
+    async with LocalSMTPServer(reject={"gone@example.com"}) as smtp:
+        assert await _worker(outbox_db, smtp.port).process_once() == 2
+
+    collection = outbox_db[EMAIL_OUTBOX_COLLECTION]
+    rejected = await collection.find_one({"id": rejected_id})
+    assert rejected["status"] == STATUS_DEAD
+    assert rejected["attempts"] == 1
+    assert "SMTPRecipientsRefused" in rejected["last_error"]
+    assert (await collection.find_one({"id": delivered_id}))["status"] == STATUS_SENT
+    assert len(smtp.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed_by_another_worker(outbox_db):
+    message_id = await _enqueue(outbox_db)
+    collection = outbox_db[EMAIL_OUTBOX_COLLECTION]
+    crashed = _worker(outbox_db, _closed_port())
+    assert [doc["id"] for doc in await crashed.claim_batch()] == [message_id]
+
+    async with LocalSMTPServer() as smtp:
+        worker = _worker(outbox_db, smtp.port)
+        # Élő lease: a másik worker nem nyúlhat hozzá
+        assert await worker.process_once() == 0
+        await collection.update_one(
+            {"id": message_id},
+            {"$set": {"locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)}},
+        )
+        assert await worker.process_once() == 1
+
+    doc = await collection.find_one({"id": message_id})
+    assert doc["status"] == STATUS_SENT
+    assert doc["worker"] == worker.worker_id
+    assert len(smtp.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_reconnect_releases_the_rest_of_the_batch(outbox_db, monkeypatch):
+    first_id = await _enqueue(outbox_db, subject="First")
+    rest_ids = [await _enqueue(outbox_db, subject=f"Rest {index}") for index in range(2)]
+    connect = aiosmtplib.SMTP.connect
+    connects = []
+
+    async def flaky_connect(self, *args, **kwargs):
+        connects.append(self)
+        if len(connects) > 1:
+            raise aiosmtplib.SMTPConnectError("connection refused")
+        return await connect(self, *args, **kwargs)
+
+    async def dropped_send(self, message, *args, **kwargs):
+        self.close()
+        raise aiosmtplib.SMTPServerDisconnected("connection lost")
+
+    monkeypatch.setattr(aiosmtplib.SMTP, "connect", flaky_connect)
+    monkeypatch.setattr(aiosmtplib.SMTP, "send_message", dropped_send)
+    async with LocalSMTPServer() as smtp:
+        worker = _worker(outbox_db, smtp.port)
+        assert await worker.process_once() == 3
+
+    collection = outbox_db[EMAIL_OUTBOX_COLLECTION]
+    first = await collection.find_one({"id": first_id})
+    assert (first["status"], first["attempts"]) == (STATUS_PENDING, 1)
+    for message_id in rest_ids:
+        doc = await collection.find_one({"id": message_id})
+        # Nem próbálkozott velük: azonnal újra felvehetők, a próbálkozásszám nem nő
+        assert (doc["status"], doc["attempts"], doc["locked_until"]) == (STATUS_PENDING, 0, None)
+    assert sorted(doc["id"] for doc in await worker.claim_batch()) == sorted(rest_ids)
+
+
+@pytest.mark.asyncio
+async def test_rejected_recipient_address_is_not_logged(outbox_db, caplog):
+    await _enqueue(outbox_db, to="gone@example.com")
+    caplog.set_level(logging.INFO, logger="outbox")
+    async with LocalSMTPServer(reject={"gone@example.com"}) as smtp:
+        await _worker(outbox_db, smtp.port).process_once()
+
+    assert "dead-lettered" in caplog.text
+    assert "SMTPRecipientsRefused: 550" in caplog.text
+    assert "gone@example.com" not in caplog.text
+    doc = await outbox_db[EMAIL_OUTBOX_COLLECTION].find_one({"to": "gone@example.com"})
+    assert "gone@example.com" not in doc["last_error"]
+
+
+def test_describe_error_redacts_addresses_quoted_by_the_server():
+    refused = aiosmtplib.SMTPRecipientsRefused([
+        aiosmtplib.SMTPRecipientRefused(550, "5.1.1 <gone@example.com>: user unknown", "gone@example.com"),
+    ])
+    assert describe_error(refused) == "SMTPRecipientsRefused: 550 5.1.1 <<redacted>>: user unknown"
+    sender = aiosmtplib.SMTPSenderRefused(553, "sender noreply@oxyss.ro rejected", "noreply@oxyss.ro")
+    assert describe_error(sender) == "SMTPSenderRefused: 553 sender <redacted> rejected"
+    assert describe_error(ConnectionRefusedError("refused")) == "ConnectionRefusedError: refused"
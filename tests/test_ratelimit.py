@@ -0,0 +1,76 @@
+import pytest
+
+import ratelimit
+from ratelimit import Limit, TokenBuckets, client_ip, parse_limits
+from tests.conftest import BARBER_ID, BOOKING_DAY, HAIRCUT_ID
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_the_configured_rate():
+    clock = FakeClock()
+    buckets = TokenBuckets({"availability": Limit(60, 2)}, clock=clock)
+    assert buckets.take("1.2.3.4", "availability") == 0
+    assert buckets.take("1.2.3.4", "availability") == 0
+    assert buckets.take("1.2.3.4", "availability") == pytest.approx(1.0)
+    # Más kliens saját bucket-et kap
+    assert buckets.take("5.6.7.8", "availability") == 0
+    clock.now += 0.5
+    assert buckets.take("1.2.3.4", "availability") == pytest.approx(0.5)
+    clock.now += 0.5
+    assert buckets.take("1.2.3.4", "availability") == 0
+
+
+def test_least_recently_used_clients_are_evicted():
+    buckets = TokenBuckets({"default": Limit(60, 1)}, max_clients=2, clock=FakeClock())
+    for client in ("a", "b", "c"):
+        buckets.take(client, "default")
+    assert len(buckets) == 2
+    # Az "a" kiesett, így újra teli bucket-tel indul
+    assert buckets.take("a", "default") == 0
+
+
+def test_parse_limits_overrides_defaults():
+    limits = parse_limits("availability=120/40, reviews=5")
+    assert limits["availability"] == Limit(120, 40)
+    assert limits["reviews"] == Limit(5, 5)
+    assert limits["catalog"] == ratelimit.DEFAULT_LIMITS["catalog"]
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ([(b"fly-client-ip", b"203.0.113.7"), (b"x-forwarded-for", b"10.0.0.1")], "203.0.113.7"),
+    ([(b"x-forwarded-for", b"198.51.100.1, 203.0.113.9")], "203.0.113.9"),
+    ([], "127.0.0.1"),
+])
+def test_client_ip(headers, expected):
+    assert client_ip({"headers": headers, "client": ("127.0.0.1", 5000)}) == expected
+
+
+@pytest.mark.asyncio
+async def test_scraper_gets_429_while_other_clients_and_routes_are_served(api, monkeypatch):
+    monkeypatch.setitem(ratelimit.buckets.limits, "availability", Limit(60, 3))
+    url = f"/api/barbers/{BARBER_ID}/available-dates"
+    params = {"year": 2030, "month": 3, "service_id": HAIRCUT_ID}
+    scraper = {"Fly-Client-IP": "203.0.113.7"}
+
+    statuses = [(await api.get(url, params=params, headers=scraper)).status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    limited = await api.get(url, params=params, headers=scraper)
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+
+    customer = await api.get(url, params=params, headers={"Fly-Client-IP": "198.51.100.1"})
+    assert customer.status_code == 200
+    # A catalog osztálynak saját (nagyobb) keretje van
+    assert (await api.get("/api/services", headers=scraper)).status_code == 200
+    assert (await api.get(
+        f"/api/barbers/{BARBER_ID}/available-slots", params={"date": BOOKING_DAY, "service_id": HAIRCUT_ID},
+        headers=scraper,
+    )).status_code == 429
+    assert (await api.get("/healthz", headers=scraper)).status_code == 200
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+
+from outbox import EMAIL_OUTBOX_COLLECTION, ensure_outbox_indexes
+from reminders import (
+    DAY_BEFORE,
+    LEASE_COLLECTION,
+    LEASE_NAME,
+    ReminderScheduler,
+    ensure_reminder_indexes,
+    window_filter,
+)
+from tests.conftest import BOOKING_DAY
+
+pytestmark = pytest.mark.asyncio
+
+# A BOOKING_DAY előtti nap: a "holnapi" emlékeztetők a seed 3 foglalására szólnak
+DAY_BEFORE_BOOKING = datetime(2030, 3, 3, 10, 0)
+
+
+def _scheduler(db, now=DAY_BEFORE_BOOKING):
+    return ReminderScheduler(db, now=lambda: now, after_hours_label=lambda appointment: "")
+
+
+@pytest_asyncio.fixture
+async def reminder_db(app_db):
+    await ensure_outbox_indexes(app_db)
+    await ensure_reminder_indexes(app_db)
+    return app_db
+
+
+async def test_window_filter_splits_at_midnight(reminder_db):
+    for index, (day, start) in enumerate([
+        ("2030-03-04", "23:00:00"),  # az ablak előtt
+        ("2030-03-04", "23:45:00"),
+        ("2030-03-05", "00:15:00"),
+        ("2030-03-05", "00:45:00"),  # az ablak után
+    ]):
+        await reminder_db.midnight.insert_one({"id": f"m{index}", "appointment_date": day, "appointment_time": start})
+
+    query = window_filter(datetime(2030, 3, 4, 23, 30), datetime(2030, 3, 5, 0, 30))
+    assert "$or" in query
+    found = await reminder_db.midnight.find(query, {"_id": 0, "id": 1}).to_list(None)
+    assert sorted(doc["id"] for doc in found) == ["m1", "m2"]
+
+
+async def test_poison_appointment_does_not_block_later_reminders(reminder_db):
+    # Időrendben az első, és nincs e-mail címe
+    await reminder_db.appointments.insert_one({
+        "id": "poison",
+        "customer_name": "Broken",
+        "service_name": "Men's Haircut",
+        "barber_name": "Test Barber",
+        "appointment_date": BOOKING_DAY,
+        "appointment_time": "08:00:00",
+        "status": "confirmed",
+    })
+    scheduler = _scheduler(reminder_db)
+
+    assert await scheduler.run_once() == 3
+    poison = await reminder_db.appointments.find_one({"id": "poison"})
+    assert "KeyError" in poison["reminder_failures"][DAY_BEFORE]["error"]
+    assert await reminder_db[EMAIL_OUTBOX_COLLECTION].count_documents({"kind": "reminder"}) == 3
+
+    # A hibás foglalás kiesett a szűrőből, a következő kör nem próbálja újra
+    assert await scheduler.run_once() == 0
+
+
+async def test_lease_hands_over_on_release_and_expiry(reminder_db):
+    first, second = _scheduler(reminder_db), _scheduler(reminder_db)
+
+    assert await first.acquire_lease() is True
+    assert await second.acquire_lease() is False
+    # A tartó megújíthatja
+    assert await first.acquire_lease() is True
+
+    await first.release_lease()
+    assert await second.acquire_lease() is True
+    assert await first.acquire_lease() is False
+
+    # Egy összeomlott tartó lejárt lease-ét a másik átveszi
+    await reminder_db[LEASE_COLLECTION].update_one(
+        {"_id": LEASE_NAME}, {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+    )
+    assert await first.acquire_lease() is True
+    assert (await reminder_db[LEASE_COLLECTION].find_one({"_id": LEASE_NAME}))["holder"] == first.holder
@@ -0,0 +1,20 @@
+import re
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def _packages(name: str) -> set:
+    packages = set()
+    for line in (BACKEND_DIR / name).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line and not line.startswith("-"):
+            packages.add(re.split(r"[<>=!~\[; ]", line, 1)[0].lower().replace("_", "-"))
+    return packages
+
+
+def test_dev_tools_stay_out_of_the_production_image():
+    # A Docker image csak a requirements.txt-t telepíti
+    dev, production = _packages("requirements-dev.txt"), _packages("requirements.txt")
+    assert {"pytest", "pytest-benchmark", "pytest-asyncio", "mongomock-motor"} <= dev
+    assert not dev & production
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from singleflight import SingleFlight
+from tests.conftest import BARBER_ID, HAIRCUT_ID
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"calls": calls}
+
+    results = await asyncio.gather(*(flight.run("key", compute) for _ in range(10)))
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+    # Nincs cache: a következő kérés újraszámol
+    await flight.run("key", compute)
+    assert calls == 2
+
+
+async def test_exception_reaches_every_caller():
+    flight = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    results = await asyncio.gather(*(flight.run("key", compute) for _ in range(3)), return_exceptions=True)
+    assert [result.status_code for result in results] == [404, 404, 404]
+
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def compute():
+        await release.wait()
+        return "done"
+
+    leader = asyncio.create_task(flight.run("key", compute))
+    follower = asyncio.create_task(flight.run("key", compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+    assert await follower == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_concurrent_month_views_query_once(api, app_db):
+    url = f"/api/barbers/{BARBER_ID}/available-dates"
+    params = {"year": 2030, "month": 3, "service_id": HAIRCUT_ID}
+    responses = await asyncio.gather(*(api.get(url, params=params) for _ in range(5)))
+    assert len({response.content for response in responses}) == 1
+    # Egy számítás (service + foglalások + szünetek), a többi kérés csak az adatverziót olvassa
+    assert sum(int(response.headers["X-DB-Calls"]) for response in responses) <= 3 + 5